@@ -19,8 +19,11 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from src.utils.logger import configurar_logger
 from src.parsers.plmxml_parser_basico import PLMXMLParserBasico
 from src.parsers.plmxml_parser_avancado import PLMXMLParserAvancado
+from src.parsers.registros_compactos import serializar_registro
+from src.utils.escritor_json import gravar_json
 from src.transformers.json_para_xml import JSONParaXMLConverter
-from src.transformers.aplicar_xslt import XSLTProcessor
+from src.transformers.aplicar_xslt import ARQUIVO_XSLT_PADRAO, XSLTProcessor
+from src.utils.prazo import Prazo
 
 class PLMXMLReporterGUI:
     def __init__(self, root):
@@ -174,6 +177,12 @@ Para mais informações, consulte a documentação.
                                   variable=self.gerar_html_var)
         chk_html.grid(row=0, column=2, padx=(20, 0))
         
+        # JSON intermediário (a conversão para XML usa os dados em memória)
+        self.salvar_json_var = tk.BooleanVar(value=False)
+        chk_json = ttk.Checkbutton(frame, text="Salvar JSON",
+                                  variable=self.salvar_json_var)
+        chk_json.grid(row=0, column=3, padx=(20, 0))
+        
         # Pasta de saída
         ttk.Label(frame, text="Pasta de Saída:").grid(row=1, column=0, sticky=tk.W, pady=(10, 0))
         self.pasta_saida_var = tk.StringVar(value="data\\output")
@@ -339,28 +348,39 @@ Para mais informações, consulte a documentação.
     def processar_arquivo_individual(self, arquivo):
         """Processa um arquivo individual"""
         try:
-            # Seleciona parser baseado na configuração
+            # Um único prazo para parsing, conversão e XSLT do arquivo
+            prazo = Prazo(self.parser_avancado.config['timeout_processamento'])
+            
+            # Processa arquivo com o parser da configuração (o JSON, se pedido,
+            # é gravado uma vez só, abaixo)
             if self.parser_var.get() == "basico":
-                parser = self.parser_basico
+                dados = self.parser_basico.processar_arquivo_completo(arquivo, salvar_json=False)
             else:
-                parser = self.parser_avancado
-                
-            # Processa arquivo
-            dados = parser.processar_arquivo_completo(arquivo)
+                dados = self.parser_avancado.processar_arquivo_completo(arquivo, salvar_json=False, prazo=prazo)
             
             if not dados:
-                return {'arquivo': arquivo, 'sucesso': False, 'erro': 'Falha no parsing'}
+                return {'arquivo': arquivo, 'sucesso': False, 'erro': self.erro_etapa(prazo, 'parsing', 'Falha no parsing')}
                 
+            base_saida = self.base_saida(arquivo)
+            
             # Salva JSON
-            arquivo_json = self.salvar_json(dados, arquivo)
+            arquivo_json = None
+            if self.salvar_json_var.get():
+                arquivo_json = self.salvar_json(dados, f"{base_saida}.json")
+            
+            # Converte para XML direto dos dados em memória
+            arquivo_xml = self.conversor.converter_dados(dados, f"{base_saida}_para_xslt.xml", prazo=prazo)
             
-            # Converte para XML
-            arquivo_xml = self.conversor.converter_arquivo_json(arquivo_json)
+            if not arquivo_xml:
+                return {'arquivo': arquivo, 'sucesso': False,
+                        'erro': self.erro_etapa(prazo, 'conversão para XML', 'Falha na conversão para XML')}
             
             # Gera HTML se solicitado
             arquivo_html = None
             if self.gerar_html_var.get():
-                arquivo_html = self.xslt_processor.aplicar_xslt(arquivo_xml)
+                arquivo_html = self.xslt_processor.aplicar_xslt(arquivo_xml, ARQUIVO_XSLT_PADRAO, prazo=prazo)
+                if not arquivo_html and prazo.esgotado:
+                    return {'arquivo': arquivo, 'sucesso': False, 'erro': prazo.descrever('transformação XSLT')}
                 
             return {
                 'arquivo': arquivo,
@@ -373,20 +393,27 @@ Para mais informações, consulte a documentação.
         except Exception as e:
             return {'arquivo': arquivo, 'sucesso': False, 'erro': str(e)}
             
-    def salvar_json(self, dados, arquivo_original):
+    def erro_etapa(self, prazo, etapa, erro_padrao):
+        """Mensagem de falha de uma etapa, indicando se o prazo acabou"""
+        if prazo.esgotado:
+            return prazo.descrever(etapa)
+        return erro_padrao
+        
+    def base_saida(self, arquivo_original):
+        """Caminho base (sem extensão) dos arquivos gerados para um arquivo"""
+        pasta_output = self.pasta_saida_var.get()
+        if not os.path.exists(pasta_output):
+            os.makedirs(pasta_output)
+            
+        nome_base = os.path.splitext(os.path.basename(arquivo_original))[0]
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return os.path.join(pasta_output, f"{nome_base}_dados_{timestamp}")
+        
+    def salvar_json(self, dados, arquivo_json):
         """Salva dados em JSON"""
         try:
-            pasta_output = self.pasta_saida_var.get()
-            if not os.path.exists(pasta_output):
-                os.makedirs(pasta_output)
-                
-            nome_base = os.path.splitext(os.path.basename(arquivo_original))[0]
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            arquivo_json = os.path.join(pasta_output, f"{nome_base}_dados_{timestamp}.json")
-            
-            import json
-            with open(arquivo_json, 'w', encoding='utf-8') as f:
-                json.dump(dados, f, indent=2, ensure_ascii=False)
+            gravar_json(dados, arquivo_json, compacto=self.parser_avancado.config['json_compacto'],
+                        default=serializar_registro)
                 
             return arquivo_json
         except Exception as e:
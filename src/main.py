@@ -1,45 +1,67 @@
 # -*- coding: utf-8 -*-
 """
 Script Principal - PLMXML Reporter
-Integra todo o fluxo de processamento: Parser -> JSON -> XML -> XSLT -> HTML
+Integra todo o fluxo de processamento: Parser -> XML -> XSLT -> HTML
+(o JSON do parser é gravado só quando pedido)
 """
 
+import argparse
+import copy
 import os
 import sys
+import tempfile
 import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 # Adiciona path para imports
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from src.utils.logger import configurar_logger
-from src.parsers.plmxml_parser_avancado import PLMXMLParserAvancado
+from src.parsers.indice_onde_usado import IndiceOndeUsado
+from src.parsers.plmxml_parser_avancado import ESTATISTICAS_PICO, PLMXMLParserAvancado, combinar_estatisticas_pico
+from src.parsers.triagem_plmxml import triar_arquivo
+from src.parsers.backend_xml import ERROS_PARSING
 from src.transformers.json_para_xml import JSONParaXMLConverter
-from src.transformers.aplicar_xslt import XSLTProcessor
+from src.transformers.aplicar_xslt import ARQUIVO_XSLT_PADRAO, XSLTProcessor
+from src.utils.prazo import Prazo
 
 class PLMXMLReporter:
-    def __init__(self):
+    def __init__(self, usar_cache=False, salvar_json=False, arquivo_xslt=ARQUIVO_XSLT_PADRAO):
         """
         Inicializa o sistema completo de relatórios PLMXML
+        
+        Args:
+            usar_cache (bool): Se o parser deve usar o cache de resultados em disco
+            salvar_json (bool): Se o resultado do parser também é gravado em
+                JSON (as etapas seguintes recebem os dados em memória)
+            arquivo_xslt (str): Template XSLT aplicado ao XML para gerar o HTML
         """
         self.logger = configurar_logger()
         self.logger.info("🚀 PLMXML Reporter inicializado")
         
         # Inicializa componentes
         self.parser = PLMXMLParserAvancado()
+        self.parser.config['usar_cache'] = usar_cache
+        self.salvar_json = salvar_json
+        self.arquivo_xslt = arquivo_xslt
         self.conversor = JSONParaXMLConverter()
         self.xslt_processor = XSLTProcessor()
         
         # Estatísticas do processamento
         self.stats = {
             'arquivos_processados': 0,
-            'tempo_total': 0,
+            'tempo_total': 0,  # Tempo decorrido (no modo paralelo, do lote inteiro)
+            'tempo_somado_workers': 0,  # Soma dos tempos por arquivo no modo paralelo
             'erros': 0
         }
     
     def processar_arquivo_completo(self, arquivo_plmxml, gerar_html=True):
         """
-        Processa um arquivo PLMXML completo: Parser -> JSON -> XML -> HTML
+        Processa um arquivo PLMXML completo: Parser -> XML -> HTML
+        
+        O resultado do parser passa em memória para a conversão; o JSON só é
+        gravado se salvar_json estiver ativo.
         
         Args:
             arquivo_plmxml (str): Caminho do arquivo PLMXML
@@ -55,40 +77,47 @@ class PLMXMLReporter:
             'arquivo_entrada': arquivo_plmxml,
             'arquivos_gerados': {},
             'erros': [],
-            'tempo_processamento': 0
+            'tempo_processamento': 0,
+            'tempo_esgotado': False
         }
         
+        # Um único prazo para todas as etapas do arquivo; cada etapa o verifica
+        # e aborta ao fim do tempo, liberando o processo para o próximo arquivo
+        prazo = Prazo(self.parser.config['timeout_processamento'])
+        
         try:
-            # Etapa 1: Parser PLMXML -> JSON
+            # Etapa 1: Parser PLMXML -> dados em memória (e JSON, se pedido)
             self.logger.info("📊 Etapa 1: Parsing PLMXML...")
-            dados_json = self.parser.processar_arquivo_completo(arquivo_plmxml)
+            dados_json = self.parser.processar_arquivo_completo(
+                arquivo_plmxml, salvar_json=self.salvar_json, prazo=prazo)
             
             if not dados_json:
-                erro = "Falha no parsing PLMXML"
+                erro = self._erro_etapa(resultados, prazo, "parsing PLMXML", "Falha no parsing PLMXML")
                 self.logger.error(erro)
                 resultados['erros'].append(erro)
                 return resultados
             
-            # Encontra arquivo JSON gerado
-            pasta_output = "data\\output"
-            arquivos_json = [f for f in os.listdir(pasta_output) 
-                           if f.endswith('.json') and 'avancado' in f]
-            
-            if not arquivos_json:
-                erro = "Arquivo JSON não encontrado"
-                self.logger.error(erro)
-                resultados['erros'].append(erro)
-                return resultados
-            
-            arquivo_json = os.path.join(pasta_output, arquivos_json[-1])  # Mais recente
-            resultados['arquivos_gerados']['json'] = arquivo_json
+            # O XML fica ao lado do JSON (ou da pasta JSON Lines) gravado
+            arquivo_saida = self.parser.arquivo_saida
+            if arquivo_saida:
+                tipo_saida = 'jsonl' if self.parser.config['formato_saida'] == 'jsonl' else 'json'
+                resultados['arquivos_gerados'][tipo_saida] = arquivo_saida
+                base_saida = os.path.splitext(arquivo_saida)[0] if tipo_saida == 'json' else arquivo_saida
+            else:
+                if self.salvar_json:
+                    erro = "Falha ao salvar o JSON do parser"
+                    self.logger.warning(erro)
+                    resultados['erros'].append(erro)
+                nome_base = os.path.splitext(os.path.basename(arquivo_plmxml))[0]
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                base_saida = os.path.join("data\\output", f"{nome_base}_avancado_{timestamp}")
             
-            # Etapa 2: JSON -> XML
-            self.logger.info("🔄 Etapa 2: Conversão JSON -> XML...")
-            arquivo_xml = self.conversor.converter_arquivo_json(arquivo_json)
+            # Etapa 2: dados -> XML
+            self.logger.info("🔄 Etapa 2: Conversão para XML...")
+            arquivo_xml = self.conversor.converter_dados(dados_json, f"{base_saida}_para_xslt.xml", prazo=prazo)
             
             if not arquivo_xml:
-                erro = "Falha na conversão JSON -> XML"
+                erro = self._erro_etapa(resultados, prazo, "conversão para XML", "Falha na conversão para XML")
                 self.logger.error(erro)
                 resultados['erros'].append(erro)
                 return resultados
@@ -98,12 +127,12 @@ class PLMXMLReporter:
             # Etapa 3: XML -> HTML (se solicitado)
             if gerar_html:
                 self.logger.info("📄 Etapa 3: Transformação XSLT -> HTML...")
-                arquivo_html = self.xslt_processor.aplicar_xslt(arquivo_xml)
+                arquivo_html = self.xslt_processor.aplicar_xslt(arquivo_xml, self.arquivo_xslt, prazo=prazo)
                 
                 if arquivo_html:
                     resultados['arquivos_gerados']['html'] = arquivo_html
                 else:
-                    erro = "Falha na transformação XSLT"
+                    erro = self._erro_etapa(resultados, prazo, "transformação XSLT", "Falha na transformação XSLT")
                     self.logger.warning(erro)
                     resultados['erros'].append(erro)
             
@@ -122,13 +151,25 @@ class PLMXMLReporter:
         
         return resultados
     
-    def processar_pasta_completa(self, pasta_entrada="data\\input", gerar_html=True):
+    @staticmethod
+    def _erro_etapa(resultados, prazo, etapa, erro_padrao):
+        """
+        Mensagem de falha de uma etapa; se o prazo acabou, marca o arquivo
+        como abortado por tempo limite
+        """
+        if prazo.esgotado:
+            resultados['tempo_esgotado'] = True
+            return prazo.descrever(etapa)
+        return erro_padrao
+    
+    def processar_pasta_completa(self, pasta_entrada="data\\input", gerar_html=True, workers=1):
         """
         Processa todos os arquivos PLMXML em uma pasta
         
         Args:
             pasta_entrada (str): Pasta com arquivos PLMXML
             gerar_html (bool): Se deve gerar relatórios HTML
+            workers (int): Número de processos em paralelo (1 = sequencial)
         
         Returns:
             list: Lista de resultados
@@ -149,6 +190,10 @@ class PLMXMLReporter:
         
         self.logger.info(f"📂 Encontrados {len(arquivos_plmxml)} arquivo(s) PLMXML")
         
+        if workers > 1 and len(arquivos_plmxml) > 1:
+            caminhos = [os.path.join(pasta_entrada, arquivo) for arquivo in arquivos_plmxml]
+            return self._processar_em_paralelo(caminhos, gerar_html, workers)
+        
         resultados = []
         
         for arquivo in arquivos_plmxml:
@@ -160,6 +205,189 @@ class PLMXMLReporter:
         
         return resultados
     
+    def indexar_onde_usado(self, pasta_entrada="data\\input"):
+        """
+        Monta o índice onde-usado de todas as exportações de uma pasta
+        
+        Só o parser é executado (sem JSON, XML ou HTML); com o cache ativo,
+        arquivos já processados não são relidos.
+        
+        Args:
+            pasta_entrada (str): Pasta com arquivos PLMXML
+        
+        Returns:
+            IndiceOndeUsado: Índice com um arquivo por exportação
+        """
+        indice = IndiceOndeUsado()
+        
+        if not os.path.exists(pasta_entrada):
+            self.logger.error(f"Pasta não encontrada: {pasta_entrada}")
+            return indice
+        
+        arquivos_plmxml = [f for f in os.listdir(pasta_entrada)
+                          if f.lower().endswith(('.xml', '.plmxml'))]
+        
+        for arquivo in arquivos_plmxml:
+            caminho_completo = os.path.join(pasta_entrada, arquivo)
+            dados = self.parser.processar_arquivo_completo(
+                caminho_completo, salvar_json=False, incluir_estatisticas=False)
+            if dados is None or self.parser.arvore_ocorrencias is None:
+                self.logger.warning(f"⚠️  {arquivo} não entrou no índice onde-usado")
+                continue
+            indice.adicionar(arquivo, self.parser.arvore_ocorrencias, self.parser.resolver)
+        
+        self.logger.info(f"🔎 Índice onde-usado: {len(indice)} item(ns) em {len(indice.arquivos)} arquivo(s)")
+        return indice
+    
+    @staticmethod
+    def imprimir_onde_usado(indice, item_id):
+        """
+        Imprime as montagens que usam um item e a cadeia de pais de cada uso
+        """
+        usos = indice.onde_usado(item_id)
+        
+        print("\n" + "="*60)
+        print(f"🔎 ONDE É USADO: {item_id}")
+        print("="*60)
+        
+        if not usos:
+            print("⚠️  Item não encontrado em nenhuma estrutura")
+            return
+        
+        for uso in usos:
+            cadeia = " > ".join(pai['item_id'] or pai['revisao'] for pai in uso['cadeia_pais']) or "(raiz)"
+            print(f"   📂 {uso['arquivo']} | {uso['ocorrencia']} | nível {uso['profundidade']} | "
+                  f"qtd {uso['quantidade_efetiva']:g}")
+            print(f"      ↳ {cadeia}")
+        
+        print(f"\n🏭 Montagens diretas: {', '.join(indice.montagens_diretas(item_id)) or 'nenhuma'}")
+        print("="*60)
+    
+    def triar_pasta(self, pasta_entrada="data\\input"):
+        """
+        Triagem rápida dos arquivos de uma pasta: Header, data/autor e contagem
+        aproximada de elementos, sem parsing completo (para decidir como e
+        onde processar cada arquivo)
+        
+        Args:
+            pasta_entrada (str): Pasta com arquivos PLMXML
+        
+        Returns:
+            list: Um resultado de triagem_plmxml.triar_arquivo por arquivo legível
+        """
+        triagens = []
+        
+        if not os.path.exists(pasta_entrada):
+            self.logger.error(f"Pasta não encontrada: {pasta_entrada}")
+            return triagens
+        
+        arquivos_plmxml = [f for f in os.listdir(pasta_entrada)
+                          if f.lower().endswith(('.xml', '.plmxml'))]
+        
+        for arquivo in arquivos_plmxml:
+            caminho_completo = os.path.join(pasta_entrada, arquivo)
+            try:
+                triagens.append(triar_arquivo(caminho_completo, self.parser.config['backend_xml']))
+            except (OSError,) + ERROS_PARSING as e:
+                self.logger.error(f"❌ Triagem de {arquivo} falhou: {str(e)}")
+        
+        return triagens
+    
+    @staticmethod
+    def imprimir_triagem(triagens):
+        """
+        Imprime o resultado da triagem de cada arquivo
+        """
+        print("\n" + "="*60)
+        print("🔎 TRIAGEM RÁPIDA")
+        print("="*60)
+        
+        if not triagens:
+            print("⚠️  Nenhum arquivo PLMXML encontrado")
+        
+        for triagem in triagens:
+            estimado = " (estimado)" if triagem['contagem_estimada'] else ""
+            principais = ", ".join(f"{tag}: {total}" for tag, total in
+                                   list((triagem['contagem_tags'] or {}).items())[:5])
+            print(f"   📂 {triagem['nome_arquivo']} | {triagem['tamanho_bytes'] / (1024 * 1024):.1f} MB | "
+                  f"{triagem['tempo_triagem'] * 1000:.1f} ms")
+            print(f"      📅 {triagem['data_exportacao']} | 👤 {triagem['autor']}")
+            print(f"      🌳 Raízes: {', '.join(triagem['traverse_root_refs']) or 'nenhuma'} | "
+                  f"Contexto: {triagem['transfer_context']}")
+            if triagem['contagem_tags'] is None:
+                print("      ⚠️  Contagem indisponível (encoding não compatível com ASCII)")
+            else:
+                print(f"      🧮 {triagem['total_elementos']} elementos{estimado} ({principais})")
+        
+        print("="*60)
+    
+    def _processar_em_paralelo(self, caminhos, gerar_html, workers):
+        """
+        Distribui os arquivos em um ProcessPoolExecutor
+        
+        Cada processo recebe um PLMXMLReporter próprio (com a mesma configuração
+        do parser deste reporter) no inicializador e o reaproveita para todos
+        os arquivos que processar. Resultados voltam na ordem dos arquivos e
+        as estatísticas de cada worker são somadas às deste reporter.
+        """
+        workers = min(workers, len(caminhos))
+        self.logger.info(f"⚡ Processamento paralelo com {workers} worker(s)")
+        
+        resultados = []
+        inicio = time.time()
+        tempo_antes = self.stats['tempo_total']
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                                 initargs=(dict(self.parser.config), self.salvar_json,
+                                           self.arquivo_xslt)) as executor:
+            futuros = [executor.submit(_processar_arquivo_worker, caminho, gerar_html)
+                       for caminho in caminhos]
+            
+            for caminho, futuro in zip(caminhos, futuros):
+                try:
+                    resultado, delta_stats, delta_parser = futuro.result()
+                except Exception as e:
+                    erro = f"Falha no worker: {str(e)}"
+                    self.logger.error(f"{os.path.basename(caminho)}: {erro}")
+                    self.stats['erros'] += 1
+                    resultados.append({
+                        'arquivo_entrada': caminho,
+                        'arquivos_gerados': {},
+                        'erros': [erro],
+                        'tempo_processamento': 0,
+                        'tempo_esgotado': False
+                    })
+                    continue
+                
+                self._somar_estatisticas(self.stats, delta_stats)
+                self._somar_estatisticas(self.parser.stats, delta_parser)
+                resultados.append(resultado)
+                self.logger.info(f"✅ Concluído: {os.path.basename(caminho)}")
+        
+        # Os workers somaram o tempo de cada arquivo, que roda em paralelo: o
+        # tempo total é o decorrido e a soma fica à parte
+        self.stats['tempo_somado_workers'] += self.stats['tempo_total'] - tempo_antes
+        self.stats['tempo_total'] = tempo_antes + time.time() - inicio
+        
+        return resultados
+    
+    @staticmethod
+    def _somar_estatisticas(destino, delta):
+        """
+        Soma estatísticas numéricas vindas de um worker (inclusive as agrupadas
+        em dicionários, como o tempo por fase)
+        """
+        for chave, valor in delta.items():
+            if chave in ESTATISTICAS_PICO:
+                continue
+            if isinstance(valor, dict):
+                PLMXMLReporter._somar_estatisticas(destino.setdefault(chave, {}), valor)
+            elif isinstance(valor, (int, float)):
+                destino[chave] = destino.get(chave, 0) + valor
+        
+        # Picos de memória não se somam: vale o maior entre os workers
+        combinar_estatisticas_pico(destino, delta)
+    
     def imprimir_relatorio_final(self, resultados):
         """
         Imprime relatório final do processamento
@@ -175,7 +403,13 @@ class PLMXMLReporter:
         print(f"📁 Total de arquivos processados: {total_arquivos}")
         print(f"✅ Processamentos com sucesso: {sucessos}")
         print(f"❌ Processamentos com erro: {erros}")
+        
+        abortados = sum(1 for r in resultados if r.get('tempo_esgotado'))
+        if abortados:
+            print(f"⏱️  Abortados por tempo limite: {abortados}")
         print(f"⏱️  Tempo total: {self.stats['tempo_total']:.2f} segundos")
+        if self.stats['tempo_somado_workers']:
+            print(f"⏱️  Tempo de processamento somado entre os workers: {self.stats['tempo_somado_workers']:.2f} segundos")
         
         if resultados:
             tempo_medio = sum(r['tempo_processamento'] for r in resultados) / len(resultados)
@@ -198,14 +432,101 @@ class PLMXMLReporter:
         
         print("="*60)
 
+# Reporter do processo worker, criado uma única vez por _inicializar_worker
+_reporter_worker = None
+
+def _inicializar_worker(config_parser, salvar_json, arquivo_xslt):
+    """
+    Inicializador do ProcessPoolExecutor: cria o reporter (parser, conversor
+    e processador XSLT) que o processo reaproveita para todos os arquivos
+    
+    Args:
+        config_parser (dict): Configuração do parser do processo principal
+        salvar_json (bool): salvar_json do reporter do processo principal
+        arquivo_xslt (str): Template XSLT do reporter do processo principal
+    """
+    global _reporter_worker
+    _reporter_worker = PLMXMLReporter(salvar_json=salvar_json, arquivo_xslt=arquivo_xslt)
+    _reporter_worker.parser.config.update(config_parser)
+
+def _diferenca_estatisticas(depois, antes):
+    """
+    Calcula o quanto as estatísticas numéricas variaram; as de pico vão como estão
+    """
+    diferenca = {}
+    for chave, valor in depois.items():
+        if chave in ESTATISTICAS_PICO:
+            continue
+        if isinstance(valor, dict):
+            diferenca[chave] = _diferenca_estatisticas(valor, antes.get(chave, {}))
+        elif isinstance(valor, (int, float)):
+            diferenca[chave] = valor - antes.get(chave, 0)
+    diferenca.update({chave: depois[chave] for chave in ESTATISTICAS_PICO if chave in depois})
+    return diferenca
+
+def _processar_arquivo_worker(caminho_arquivo, gerar_html):
+    """
+    Processa um arquivo no worker
+    
+    Returns:
+        tuple: (resultado, variação de stats do reporter, variação de stats do parser)
+    """
+    stats_antes = copy.deepcopy(_reporter_worker.stats)
+    parser_antes = copy.deepcopy(_reporter_worker.parser.stats)
+    
+    resultado = _reporter_worker.processar_arquivo_completo(caminho_arquivo, gerar_html)
+    
+    return (
+        resultado,
+        _diferenca_estatisticas(_reporter_worker.stats, stats_antes),
+        _diferenca_estatisticas(_reporter_worker.parser.stats, parser_antes)
+    )
+
 # Função principal
-def main():
+def main(argv=None):
     """
     Função principal do PLMXML Reporter
     """
+    argumentos = argparse.ArgumentParser(description="PLMXML Reporter - PLMXML -> XML -> HTML")
+    argumentos.add_argument('--pasta', default="data\\input", help="Pasta com arquivos PLMXML")
+    argumentos.add_argument('--workers', type=int, default=1,
+                            help="Processos em paralelo para processar a pasta (padrão: 1)")
+    argumentos.add_argument('--processos-por-arquivo', type=int, default=1,
+                            help="Divide cada arquivo grande entre N processos (padrão: 1)")
+    argumentos.add_argument('--motor-expat', action='store_true',
+                            help="Extrai os registros direto dos eventos do expat, sem montar a árvore XML")
+    argumentos.add_argument('--json-compacto', action='store_true',
+                            help="Grava o JSON do parser sem indentação (menor e mais rápido)")
+    argumentos.add_argument('--salvar-json', action='store_true',
+                            help="Também grava o resultado do parser em JSON (o XML é gerado direto da memória)")
+    argumentos.add_argument('--jsonl', action='store_true',
+                            help="Grava itens, BOM e relacionamentos em JSON Lines (um registro por linha) "
+                                 "com um manifesto, em vez de um único JSON (implica --salvar-json)")
+    argumentos.add_argument('--xslt', default=ARQUIVO_XSLT_PADRAO,
+                            help=f"Template XSLT do relatório HTML (padrão: {ARQUIVO_XSLT_PADRAO})")
+    argumentos.add_argument('--cache', action='store_true',
+                            help="Reaproveita resultados de parsing de arquivos inalterados")
+    argumentos.add_argument('--limpar-cache', action='store_true',
+                            help="Remove todas as entradas do cache de parsing antes de processar")
+    argumentos.add_argument('--timeout', type=float, default=None,
+                            help="Tempo máximo por arquivo em segundos (padrão: timeout_processamento do parser)")
+    argumentos.add_argument('--medir-memoria', action='store_true',
+                            help="Mede o pico de alocações por fase com tracemalloc (mais lento)")
+    argumentos.add_argument('--onde-usado', metavar='ITEM_ID',
+                            help="Lista as montagens que usam o item (productId/itemId) nas exportações da pasta")
+    argumentos.add_argument('--triagem', action='store_true',
+                            help="Só lê o Header e estima as contagens de elementos de cada arquivo (sem processar)")
+    argumentos.add_argument('--teste', action='store_true',
+                            help="Executa os testes do pipeline (sem processar a pasta)")
+    args = argumentos.parse_args(argv)
+    
+    if args.teste:
+        teste_prazo_xslt()
+        return
+    
     print("🚀 PLMXML REPORTER - SISTEMA COMPLETO")
     print("=" * 60)
-    print("📋 Fluxo: PLMXML -> JSON -> XML -> HTML")
+    print("📋 Fluxo: PLMXML -> XML -> HTML")
     print("=" * 60)
     
     # Cria pastas necessárias
@@ -215,17 +536,98 @@ def main():
             print(f"📁 Pasta criada: {pasta}")
     
     # Inicializa sistema
-    reporter = PLMXMLReporter()
+    reporter = PLMXMLReporter(usar_cache=args.cache, salvar_json=args.salvar_json or args.jsonl,
+                              arquivo_xslt=args.xslt)
+    
+    if args.limpar_cache:
+        reporter.parser.invalidar_cache()
+    
+    reporter.parser.config['medir_alocacoes'] = args.medir_memoria
+    reporter.parser.config['processos_por_arquivo'] = args.processos_por_arquivo
+    reporter.parser.config['motor_expat'] = args.motor_expat
+    reporter.parser.config['json_compacto'] = args.json_compacto
+    if args.jsonl:
+        reporter.parser.config['formato_saida'] = 'jsonl'
+    if args.timeout is not None:
+        reporter.parser.config['timeout_processamento'] = args.timeout
+    
+    if args.triagem:
+        reporter.imprimir_triagem(reporter.triar_pasta(args.pasta))
+        return
+    
+    if args.onde_usado:
+        indice = reporter.indexar_onde_usado(args.pasta)
+        reporter.imprimir_onde_usado(indice, args.onde_usado)
+        return
     
     # Processa arquivos
-    resultados = reporter.processar_pasta_completa()
+    resultados = reporter.processar_pasta_completa(args.pasta, workers=args.workers)
     
     # Imprime relatório final
     reporter.imprimir_relatorio_final(resultados)
     
+    # Tempo por fase sempre; as alocações (tracemalloc) só com --medir-memoria
+    reporter.parser.imprimir_estatisticas_avancadas()
+    
     print("\n🎉 PROCESSAMENTO CONCLUÍDO!")
     print("📄 Verifique os resultados na pasta 'data\\output'")
     print("📋 Logs salvos na pasta 'logs'")
 
+# PLMXML e XSLT mínimos de teste_prazo_xslt
+PLMXML_TESTE = """<?xml version="1.0" encoding="utf-8"?>
+<PLMXML xmlns="http://www.plmxml.org/Schemas/PLMXMLSchema" schemaVersion="6">
+  <ProductRevision id="id1" name="PECA TESTE" subType="ItemRevision" revision="A"/>
+</PLMXML>
+"""
+
+XSLT_TESTE = """<?xml version="1.0" encoding="utf-8"?>
+<xsl:stylesheet version="1.0" xmlns:xsl="http://www.w3.org/1999/XSL/Transform">
+  <xsl:template match="/">
+    <html><body><xsl:value-of select="count(//Item)"/> item(ns)</body></html>
+  </xsl:template>
+</xsl:stylesheet>
+"""
+
+# Teste do prazo na etapa XSLT
+def teste_prazo_xslt():
+    """
+    Processa um PLMXML mínimo pelo PLMXMLReporter: sem limite de tempo o HTML
+    é gerado com o template informado; com o prazo já esgotado (cancelado),
+    o processador XSLT do reporter não gera o HTML
+    """
+    print("🧪 TESTE DO PRAZO NA ETAPA XSLT")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo_plmxml = os.path.join(pasta, "prazo.plmxml")
+        arquivo_xslt = os.path.join(pasta, "relatorio.xslt")
+        with open(arquivo_plmxml, 'w', encoding='utf-8') as f:
+            f.write(PLMXML_TESTE)
+        with open(arquivo_xslt, 'w', encoding='utf-8') as f:
+            f.write(XSLT_TESTE)
+        
+        reporter = PLMXMLReporter(arquivo_xslt=arquivo_xslt)
+        
+        # Sem limite: o template chega ao processador XSLT
+        reporter.parser.config['timeout_processamento'] = None
+        resultado = reporter.processar_arquivo_completo(arquivo_plmxml)
+        gerados = resultado['arquivos_gerados']
+        assert not resultado['erros'], resultado['erros']
+        assert 'html' in gerados and not resultado['tempo_esgotado'], resultado
+        print(f"✅ Sem limite: {os.path.basename(gerados['html'])}")
+        
+        # Prazo esgotado: a transformação é abortada antes de gerar o HTML
+        prazo = Prazo()
+        prazo.cancelar()
+        arquivo_html = os.path.join(pasta, "abortado.html")
+        assert reporter.xslt_processor.aplicar_xslt(gerados['xml'], arquivo_xslt, arquivo_html, prazo=prazo) is None
+        assert not os.path.exists(arquivo_html)
+        print(f"✅ Prazo esgotado: {prazo.descrever('transformação XSLT')}")
+        
+        # Os arquivos gerados ficam na pasta de saída padrão
+        for arquivo in gerados.values():
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+Árvore de Ocorrências do PLMXML
+Monta a estrutura ProductView (rootRefs) -> Occurrence (occurrenceRefs) a
+partir das linhas BOM extraídas, com cada nó resolvido para a revisão
+(ProductRevision/DesignRevision) que instancia, e consolida as quantidades
+efetivas de cada revisão em todos os níveis
+"""
+
+from array import array
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Tipos em que a resolução de instancedRef termina
+TIPOS_REVISAO = ('ProductRevision', 'DesignRevision')
+
+# Limite de saltos instancedRef (Occurrence -> Instance -> ... -> Revision)
+MAX_SALTOS_INSTANCIA = 8
+
+
+class ArvoreOcorrencias:
+    """
+    Árvore de ocorrências com nós inteiros numerados em pré-ordem
+
+    Como a numeração é a da travessia em profundidade, percorrer os nós de
+    0 a len(arvore) - 1 já é o BOM indentado, sem recursão. Para cada nó:
+        pais[no]           nó pai (-1 nas raízes)
+        profundidades[no]  0 nas raízes
+        ocorrencias[no]    ID da Occurrence
+        linhas[no]         linha BOM da Occurrence
+        revisoes[no]       item resolvido pelo instancedRef ou None
+    Os filhos ficam em formato CSR: filhos[inicio_filhos[no]:inicio_filhos[no + 1]]
+    """
+
+    def __init__(self):
+        self.ocorrencias: List[str] = []
+        self.linhas: List[Any] = []
+        self.revisoes: List[Optional[Any]] = []
+        self.pais = array('i')
+        self.profundidades = array('i')
+        self.inicio_filhos = array('i', [0])
+        self.filhos = array('i')
+        self.indice_nos: Dict[str, int] = {}
+        self.referencias_ignoradas = 0
+        self.quantidades_invalidas = 0
+        self._efetivas = None
+
+    @classmethod
+    def construir(cls, linhas_bom: List[Any], itens: List[Any],
+                  resolver: Callable[[str], Optional[Any]],
+                  normalizar: Callable[[str], Optional[str]]) -> 'ArvoreOcorrencias':
+        """
+        Monta a árvore em uma passada pelas linhas BOM e uma travessia
+
+        Args:
+            linhas_bom: Linhas BOM extraídas (dict ou registros compactos)
+            itens: Itens extraídos, onde estão as ProductView
+            resolver: Função ref -> item (PLMXMLParserAvancado.resolver)
+            normalizar: Função ref -> ID puro ou None
+
+        Returns:
+            ArvoreOcorrencias
+        """
+        arvore = cls()
+
+        # Occurrences por ID e seus filhos declarados em occurrenceRefs
+        ocorrencias = {}
+        filhos_declarados = {}
+        referenciadas = set()
+
+        for linha in linhas_bom:
+            if linha['tipo_elemento'] != 'Occurrence' or linha['id'] in ocorrencias:
+                continue
+            ocorrencias[linha['id']] = linha
+
+            refs = linha['atributos'].get('occurrenceRefs')
+            if refs:
+                filhos = [id_ref for id_ref in map(normalizar, refs.split()) if id_ref]
+                filhos_declarados[linha['id']] = filhos
+                referenciadas.update(filhos)
+
+        # Occurrences sem occurrenceRefs no pai entram pelo parentRef
+        for id_ocorrencia, linha in ocorrencias.items():
+            if id_ocorrencia in referenciadas:
+                continue
+            id_pai = normalizar(linha['pai']) if linha['pai'] != 'N/A' else None
+            if id_pai in ocorrencias:
+                filhos_declarados.setdefault(id_pai, []).append(id_ocorrencia)
+                referenciadas.add(id_ocorrencia)
+
+        raizes = arvore._raizes_product_view(itens, normalizar)
+        if not raizes:
+            raizes = [id_ocorrencia for id_ocorrencia in ocorrencias if id_ocorrencia not in referenciadas]
+
+        # Travessia em pré-ordem com pilha explícita
+        pilha = [(id_raiz, -1, 0) for id_raiz in reversed(raizes)]
+        while pilha:
+            id_ocorrencia, pai, profundidade = pilha.pop()
+
+            # Referência inexistente ou repetida (evita ciclos)
+            if id_ocorrencia not in ocorrencias or id_ocorrencia in arvore.indice_nos:
+                arvore.referencias_ignoradas += 1
+                continue
+
+            no = len(arvore.ocorrencias)
+            linha = ocorrencias[id_ocorrencia]
+            arvore.indice_nos[id_ocorrencia] = no
+            arvore.ocorrencias.append(id_ocorrencia)
+            arvore.linhas.append(linha)
+            arvore.revisoes.append(cls._resolver_revisao(linha, resolver))
+            arvore.pais.append(pai)
+            arvore.profundidades.append(profundidade)
+
+            for id_filho in reversed(filhos_declarados.get(id_ocorrencia, ())):
+                pilha.append((id_filho, no, profundidade + 1))
+
+        arvore._montar_filhos()
+        return arvore
+
+    @staticmethod
+    def _raizes_product_view(itens: List[Any], normalizar: Callable[[str], Optional[str]]) -> List[str]:
+        """
+        IDs das Occurrences raiz declaradas em ProductView rootRefs
+        """
+        raizes = []
+        for item in itens:
+            if item['tipo_elemento'] != 'ProductView':
+                continue
+            refs = item['atributos_basicos'].get('rootRefs', '')
+            raizes.extend(id_ref for id_ref in map(normalizar, refs.split()) if id_ref)
+        return raizes
+
+    @staticmethod
+    def _resolver_revisao(linha: Any, resolver: Callable[[str], Optional[Any]]) -> Optional[Any]:
+        """
+        Segue instancedRef até uma ProductRevision/DesignRevision
+
+        Returns:
+            A revisão, o último item alcançado se não houver revisão, ou None
+        """
+        registro = resolver(linha['filho'])
+        saltos = 0
+
+        while registro is not None and registro['tipo_elemento'] not in TIPOS_REVISAO:
+            proximo_ref = registro['atributos_basicos'].get('instancedRef')
+            if not proximo_ref or saltos >= MAX_SALTOS_INSTANCIA:
+                break
+            proximo = resolver(proximo_ref)
+            if proximo is None:
+                break
+            registro = proximo
+            saltos += 1
+
+        return registro
+
+    def _montar_filhos(self):
+        """
+        Monta a adjacência pai -> filhos (CSR) a partir de pais, em tempo linear
+        """
+        total = len(self.ocorrencias)
+        contagem = array('i', bytes(4 * (total + 1)))
+        for pai in self.pais:
+            if pai >= 0:
+                contagem[pai + 1] += 1
+
+        for no in range(total):
+            contagem[no + 1] += contagem[no]
+        self.inicio_filhos = array('i', contagem)
+
+        # Em pré-ordem os filhos aparecem na ordem de occurrenceRefs
+        self.filhos = array('i', bytes(4 * contagem[total]))
+        proxima_vaga = array('i', contagem)
+        for no, pai in enumerate(self.pais):
+            if pai >= 0:
+                self.filhos[proxima_vaga[pai]] = no
+                proxima_vaga[pai] += 1
+
+    def __len__(self) -> int:
+        return len(self.ocorrencias)
+
+    def __iter__(self) -> Iterator[int]:
+        """
+        Nós em profundidade (pré-ordem)
+        """
+        return iter(range(len(self.ocorrencias)))
+
+    def raizes(self) -> List[int]:
+        return [no for no, pai in enumerate(self.pais) if pai < 0]
+
+    def filhos_de(self, no: int) -> array:
+        return self.filhos[self.inicio_filhos[no]:self.inicio_filhos[no + 1]]
+
+    def subarvore(self, no: int) -> Iterator[int]:
+        """
+        Nós da subárvore de no (incluindo no) em pré-ordem: como a numeração é
+        em pré-ordem, é o intervalo contíguo até a profundidade voltar à de no
+        """
+        yield no
+        profundidade = self.profundidades[no]
+        for seguinte in range(no + 1, len(self.ocorrencias)):
+            if self.profundidades[seguinte] <= profundidade:
+                break
+            yield seguinte
+
+    def caminho(self, no: int) -> List[str]:
+        """
+        IDs das Occurrences da raiz até no
+        """
+        caminho = []
+        while no >= 0:
+            caminho.append(self.ocorrencias[no])
+            no = self.pais[no]
+        caminho.reverse()
+        return caminho
+
+    def no_da_ocorrencia(self, ref: str) -> Optional[int]:
+        """
+        Nó de uma Occurrence pelo ID ('id10' ou '#id10')
+        """
+        return self.indice_nos.get(ref.strip().lstrip('#'))
+
+    def profundidade_maxima(self) -> int:
+        return max(self.profundidades) if self.profundidades else 0
+
+    @staticmethod
+    def _converter_quantidade(texto: str) -> Optional[float]:
+        """
+        Converte o atributo quantity ('2', '2.5' ou '2,5'); None se inválido
+        """
+        try:
+            return float(str(texto).replace(',', '.'))
+        except ValueError:
+            return None
+
+    def quantidades_efetivas(self) -> array:
+        """
+        Quantidade efetiva de cada nó: produto das quantidades do caminho
+        desde a raiz. Em pré-ordem o pai sempre vem antes do filho, então
+        uma única passada basta.
+
+        Returns:
+            array('d') indexado pelo nó
+        """
+        if self._efetivas is not None:
+            return self._efetivas
+
+        efetivas = array('d', bytes(8 * len(self.ocorrencias)))
+        self.quantidades_invalidas = 0
+
+        for no, linha in enumerate(self.linhas):
+            quantidade = self._converter_quantidade(linha['quantidade'])
+            if quantidade is None:
+                # Quantidade ilegível conta como 1, como a ausência do atributo
+                self.quantidades_invalidas += 1
+                quantidade = 1.0
+
+            pai = self.pais[no]
+            efetivas[no] = quantidade * efetivas[pai] if pai >= 0 else quantidade
+
+        self._efetivas = efetivas
+        return efetivas
+
+    def consolidar_quantidades(self) -> List[Dict[str, Any]]:
+        """
+        Quantidade total de cada revisão somada em todos os níveis
+
+        Nós sem revisão resolvida são agrupados pelo próprio instancedRef.
+
+        Returns:
+            Lista na ordem da primeira ocorrência na árvore com revisao, nome,
+            tipo_revisao, quantidade_total, ocorrencias e níveis mínimo/máximo
+        """
+        efetivas = self.quantidades_efetivas()
+
+        indice_chaves = {}
+        chaves = []
+        revisoes = []
+        totais = array('d')
+        contagens = array('i')
+        niveis_minimos = array('i')
+        niveis_maximos = array('i')
+
+        for no in range(len(self.ocorrencias)):
+            revisao = self.revisoes[no]
+            chave = revisao['id'] if revisao is not None else self.linhas[no]['filho']
+            profundidade = self.profundidades[no]
+
+            indice = indice_chaves.get(chave)
+            if indice is None:
+                indice = indice_chaves[chave] = len(chaves)
+                chaves.append(chave)
+                revisoes.append(revisao)
+                totais.append(0.0)
+                contagens.append(0)
+                niveis_minimos.append(profundidade)
+                niveis_maximos.append(profundidade)
+
+            totais[indice] += efetivas[no]
+            contagens[indice] += 1
+            if profundidade < niveis_minimos[indice]:
+                niveis_minimos[indice] = profundidade
+            elif profundidade > niveis_maximos[indice]:
+                niveis_maximos[indice] = profundidade
+
+        return [
+            {
+                'revisao': chave,
+                'resolvida': revisao is not None,
+                'nome': revisao['nome'] if revisao is not None else None,
+                'tipo_revisao': revisao['tipo_elemento'] if revisao is not None else None,
+                'quantidade_total': totais[indice],
+                'ocorrencias': contagens[indice],
+                'nivel_minimo': niveis_minimos[indice],
+                'nivel_maximo': niveis_maximos[indice]
+            }
+            for indice, (chave, revisao) in enumerate(zip(chaves, revisoes))
+        ]
+
+    def para_lista(self) -> List[Dict[str, Any]]:
+        """
+        Nós em pré-ordem no formato do JSON de saída
+        """
+        efetivas = self.quantidades_efetivas()
+        nos = []
+        caminhos = []
+
+        for no in range(len(self.ocorrencias)):
+            pai = self.pais[no]
+            caminho = self.ocorrencias[no] if pai < 0 else f"{caminhos[pai]}/{self.ocorrencias[no]}"
+            caminhos.append(caminho)
+
+            linha = self.linhas[no]
+            revisao = self.revisoes[no]
+            nos.append({
+                'no': no,
+                'pai': pai,
+                'profundidade': self.profundidades[no],
+                'caminho': caminho,
+                'ocorrencia': self.ocorrencias[no],
+                'quantidade': linha['quantidade'],
+                'quantidade_efetiva': efetivas[no],
+                'revisao': revisao['id'] if revisao is not None else None,
+                'tipo_revisao': revisao['tipo_elemento'] if revisao is not None else None,
+                'nome': revisao['nome'] if revisao is not None else None,
+                'total_filhos': self.inicio_filhos[no + 1] - self.inicio_filhos[no]
+            })
+
+        return nos
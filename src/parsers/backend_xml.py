@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Backend de Árvore XML para os Parsers PLMXML
+Usa lxml (parsing em C, XPath pré-compilado e getparent()) quando disponível
+e xml.etree.ElementTree caso contrário, com a mesma interface
+"""
+
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+try:
+    from lxml import etree as LET
+    LXML_DISPONIVEL = True
+except ImportError:
+    LET = None
+    LXML_DISPONIVEL = False
+
+# Exceções de parsing de qualquer backend, para uso em cláusulas except
+ERROS_PARSING = (ET.ParseError,) + ((LET.XMLSyntaxError,) if LXML_DISPONIVEL else ())
+
+class BackendElementTree:
+    """
+    Backend da biblioteca padrão (xml.etree.ElementTree)
+    """
+    nome = 'etree'
+    tem_getparent = False
+
+    def parse(self, origem, encoding=None):
+        """
+        Faz o parsing de um caminho ou arquivo binário
+
+        Args:
+            origem: Caminho do arquivo ou arquivo aberto em modo binário
+            encoding: Encoding a forçar (None = BOM/declaração XML)
+
+        Returns:
+            Árvore com getroot()
+        """
+        return ET.parse(origem, parser=ET.XMLParser(encoding=encoding))
+
+    def iterparse(self, origem, events=('end',), encoding=None):
+        """
+        Parsing incremental com eventos ('start', 'end')
+        """
+        return ET.iterparse(origem, events=events, parser=ET.XMLParser(encoding=encoding))
+
+    def compilar_xpath(self, expressao, namespaces=None):
+        """
+        Prepara uma busca; no ElementTree equivale a elem.findall(expressao)
+
+        Returns:
+            Função que recebe o elemento de contexto e retorna a lista encontrada
+        """
+        def buscar(elemento):
+            return elemento.findall(expressao, namespaces)
+        return buscar
+
+    def getparent(self, elemento):
+        """
+        ElementTree não guarda o elemento pai
+        """
+        return None
+
+class BackendLxml:
+    """
+    Backend lxml: comentários e instruções de processamento são descartados
+    para que a árvore tenha a mesma forma da gerada pelo ElementTree
+    """
+    nome = 'lxml'
+    tem_getparent = True
+
+    def _criar_parser(self, encoding=None):
+        return LET.XMLParser(encoding=encoding, remove_comments=True, remove_pis=True,
+                             huge_tree=True, resolve_entities=False)
+
+    def parse(self, origem, encoding=None):
+        return LET.parse(origem, parser=self._criar_parser(encoding))
+
+    def iterparse(self, origem, events=('end',), encoding=None):
+        return LET.iterparse(origem, events=events, encoding=encoding, remove_comments=True,
+                             remove_pis=True, huge_tree=True, resolve_entities=False)
+
+    def compilar_xpath(self, expressao, namespaces=None):
+        """
+        Compila a expressão uma única vez em um etree.XPath (executado em C)
+        """
+        return LET.XPath(expressao, namespaces=namespaces)
+
+    def getparent(self, elemento):
+        return elemento.getparent()
+
+_BACKENDS = {'etree': BackendElementTree()}
+if LXML_DISPONIVEL:
+    _BACKENDS['lxml'] = BackendLxml()
+
+def obter_backend(preferencia='auto'):
+    """
+    Retorna o backend XML
+
+    Args:
+        preferencia (str): 'auto' (lxml se instalado), 'lxml' ou 'etree'.
+            Se 'lxml' for pedido sem estar instalado, usa ElementTree.
+    """
+    if preferencia == 'auto':
+        preferencia = 'lxml' if LXML_DISPONIVEL else 'etree'
+    return _BACKENDS.get(preferencia, _BACKENDS['etree'])
+
+# Teste de paridade entre backends
+def teste_paridade_backends():
+    """
+    Processa os arquivos de data\\input com os dois backends e confere se os
+    parsers básico e avançado produzem exatamente o mesmo resultado
+    """
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+    from src.parsers.plmxml_parser_avancado import PLMXMLParserAvancado
+    from src.parsers.plmxml_parser_basico import PLMXMLParserBasico
+
+    print("🧪 TESTE DE PARIDADE ENTRE BACKENDS XML")
+    print("=" * 60)
+
+    if not LXML_DISPONIVEL:
+        print("⚠️  lxml não instalado - apenas o backend ElementTree está disponível")
+        return
+
+    pasta_entrada = "data\\input"
+    if not os.path.exists(pasta_entrada):
+        print(f"⚠️  Pasta de entrada não encontrada: {pasta_entrada}")
+        return
+
+    def sem_campos_variaveis(dados):
+        if dados is None:
+            return None
+        # Datas de processamento mudam a cada execução
+        dados.pop('estatisticas', None)
+        dados.get('metadados', {}).get('xml', {}).pop('data_processamento', None)
+        dados.get('info_arquivo', {}).pop('data_processamento', None)
+        dados.get('resumo', {}).pop('tempo_processamento', None)
+        return dados
+
+    falhas = 0
+
+    for arquivo in os.listdir(pasta_entrada):
+        if not arquivo.lower().endswith(('.xml', '.plmxml')):
+            continue
+
+        caminho = os.path.join(pasta_entrada, arquivo)
+        print(f"\n📂 {arquivo}")
+
+        for modo_streaming in (False, True):
+            resultados = {}
+            for backend in ('etree', 'lxml'):
+                parser = PLMXMLParserAvancado(modo_verbose=False)
+                parser.config['backend_xml'] = backend
+                parser.config['modo_streaming'] = modo_streaming
+                resultados[backend] = sem_campos_variaveis(
+                    parser.processar_arquivo_completo(caminho, salvar_json=False))
+
+            iguais = resultados['etree'] == resultados['lxml']
+            falhas += not iguais
+            print(f"   {'✅' if iguais else '❌'} Parser avançado (streaming={modo_streaming})")
+
+        resultados = {}
+        for backend in ('etree', 'lxml'):
+            parser = PLMXMLParserBasico(backend_xml=backend)
+            resultados[backend] = sem_campos_variaveis(parser.ler_arquivo_plmxml(caminho))
+
+        iguais = resultados['etree'] == resultados['lxml']
+        falhas += not iguais
+        print(f"   {'✅' if iguais else '❌'} Parser básico")
+
+    print("\n" + "=" * 60)
+    if falhas:
+        print(f"❌ {falhas} divergência(s) entre os backends")
+    else:
+        print("🎉 Backends produzem resultados idênticos")
+
+if __name__ == "__main__":
+    teste_paridade_backends()
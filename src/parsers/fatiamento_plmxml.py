@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Fatiamento de Arquivos PLMXML para Parsing em Paralelo
+Divide um arquivo nas fronteiras (em bytes) entre os filhos do elemento raiz
+(Product, ProductRevision, Form, ProductView...), que são independentes entre
+si. Cada fatia é lida como um documento próprio: o prólogo e a tag de
+abertura da raiz originais, os elementos da fatia e o fechamento da raiz.
+
+A varredura que acha as fronteiras não faz parsing: usa mmap e buscas em C
+(bytes.find e regex) e só executa código Python uma vez por filho da raiz.
+"""
+
+import codecs
+import io
+import mmap
+import re
+from typing import List, Optional, Tuple
+
+# Tag de abertura completa; valores entre aspas podem conter '>'
+RE_TAG_ABERTURA = re.compile(
+    rb'<([^\s/>!?]+)(?:\s+[^\s=/>]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*\s*(/?)>')
+
+# Início de arquivos em que '<' e '>' não são o byte ASCII correspondente (UTF-16)
+BOMS_NAO_ASCII = (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE, b'<\x00?\x00', b'\x00<\x00?')
+
+
+class PlanoFatias:
+    """
+    Resultado do fatiamento: prólogo comum e intervalos [inicio, fim) de cada fatia
+    """
+
+    def __init__(self, caminho: str, prologo: bytes, fechamento_raiz: bytes,
+                 intervalos: List[Tuple[int, int]]):
+        self.caminho = caminho
+        self.prologo = prologo
+        self.fechamento_raiz = fechamento_raiz
+        self.intervalos = intervalos
+
+    def __len__(self) -> int:
+        return len(self.intervalos)
+
+
+class LeitorFatia(io.RawIOBase):
+    """
+    Arquivo somente leitura com prólogo + bytes [inicio, fim) do original +
+    fechamento da raiz, lido sob demanda (a fatia não é carregada inteira)
+    """
+
+    def __init__(self, plano: PlanoFatias, indice: int):
+        super().__init__()
+        inicio, fim = plano.intervalos[indice]
+        self._arquivo = open(plano.caminho, 'rb')
+        self._arquivo.seek(inicio)
+        self._restante_fatia = fim - inicio
+        self._prologo = plano.prologo
+        self._fechamento = plano.fechamento_raiz
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._prologo:
+            bloco = self._prologo[:len(buffer)]
+            self._prologo = self._prologo[len(bloco):]
+        elif self._restante_fatia:
+            bloco = self._arquivo.read(min(len(buffer), self._restante_fatia))
+            self._restante_fatia -= len(bloco)
+            if not bloco:
+                self._restante_fatia = 0
+        else:
+            bloco = self._fechamento[:len(buffer)]
+            self._fechamento = self._fechamento[len(bloco):]
+
+        buffer[:len(bloco)] = bloco
+        return len(bloco)
+
+    def close(self):
+        self._arquivo.close()
+        super().close()
+
+
+def _pular_nao_elementos(dados, posicao: int, limite: int) -> int:
+    """
+    Avança sobre espaços, comentários e instruções de processamento até o
+    próximo '<' de elemento (ou de tag de fechamento)
+    """
+    while True:
+        posicao = dados.find(b'<', posicao, limite)
+        if posicao < 0:
+            return -1
+        if dados[posicao:posicao + 4] == b'<!--':
+            posicao = dados.find(b'-->', posicao) + 3
+        elif dados[posicao:posicao + 2] == b'<?':
+            posicao = dados.find(b'?>', posicao) + 2
+        else:
+            return posicao
+        if posicao < 3:
+            return -1
+
+
+def fim_elemento(dados, inicio: int, padroes_nome: dict, abertura=None) -> int:
+    """
+    Posição logo após o fechamento do elemento que começa em inicio
+
+    Só as tags com o mesmo nome do elemento são examinadas, então filhos de
+    outros tipos (a grande maioria) são pulados pela busca em C.
+
+    Args:
+        abertura: Match de RE_TAG_ABERTURA em inicio, se já calculado
+    """
+    if abertura is None:
+        abertura = RE_TAG_ABERTURA.match(dados, inicio)
+    if abertura is None:
+        raise ValueError(f"Tag de abertura inválida na posição {inicio}")
+    if abertura.group(2):
+        return abertura.end()
+
+    nome = abertura.group(1)
+    padrao = padroes_nome.get(nome)
+    if padrao is None:
+        padrao = padroes_nome[nome] = re.compile(rb'<(/?)' + re.escape(nome) + rb'(?=[\s/>])')
+
+    profundidade = 1
+    posicao = abertura.end()
+    while True:
+        tag = padrao.search(dados, posicao)
+        if tag is None:
+            raise ValueError(f"Elemento {nome!r} iniciado na posição {inicio} não é fechado")
+        if tag.group(1):
+            posicao = dados.find(b'>', tag.end()) + 1
+            profundidade -= 1
+            if profundidade == 0:
+                return posicao
+        else:
+            interna = RE_TAG_ABERTURA.match(dados, tag.start())
+            if interna is None:
+                raise ValueError(f"Tag de abertura inválida na posição {tag.start()}")
+            if not interna.group(2):
+                profundidade += 1
+            posicao = interna.end()
+
+
+def dividir_em_fatias(caminho: str, total_fatias: int) -> Optional[PlanoFatias]:
+    """
+    Planeja a divisão do arquivo em até total_fatias fatias de tamanho parecido
+
+    Args:
+        caminho: Arquivo PLMXML
+        total_fatias: Número desejado de fatias
+
+    Returns:
+        PlanoFatias, ou None se o arquivo não puder ser fatiado (UTF-16,
+        DOCTYPE com subconjunto interno, raiz vazia ou estrutura inesperada)
+    """
+    with open(caminho, 'rb') as arquivo:
+        if not arquivo.seek(0, io.SEEK_END):
+            return None
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+            if dados[:4].startswith(BOMS_NAO_ASCII):
+                return None
+
+            tamanho = len(dados)
+            posicao = len(codecs.BOM_UTF8) if dados[:3] == codecs.BOM_UTF8 else 0
+
+            # Prólogo: declaração XML, comentários, PIs e DOCTYPE
+            while True:
+                posicao = _pular_nao_elementos(dados, posicao, tamanho)
+                if posicao < 0:
+                    return None
+                if dados[posicao:posicao + 2] != b'<!':
+                    break
+                fim_declaracao = dados.find(b'>', posicao)
+                if fim_declaracao < 0 or b'[' in dados[posicao:fim_declaracao]:
+                    return None
+                posicao = fim_declaracao + 1
+
+            raiz = RE_TAG_ABERTURA.match(dados, posicao)
+            if raiz is None or raiz.group(2):
+                return None
+
+            inicio_conteudo = raiz.end()
+            fim_conteudo = dados.rfind(b'</' + raiz.group(1), inicio_conteudo)
+            if fim_conteudo < 0:
+                return None
+
+            prologo = dados[:inicio_conteudo]
+            fechamento_raiz = b'</' + raiz.group(1) + b'>'
+
+            # Cortes no início do primeiro filho da raiz após cada alvo
+            tamanho_conteudo = fim_conteudo - inicio_conteudo
+            alvos = [inicio_conteudo + tamanho_conteudo * i // total_fatias for i in range(1, total_fatias)]
+            cortes = [inicio_conteudo]
+            padroes_nome = {}
+            posicao = inicio_conteudo
+
+            try:
+                while alvos:
+                    inicio_elemento = _pular_nao_elementos(dados, posicao, fim_conteudo)
+                    if inicio_elemento < 0 or dados[inicio_elemento:inicio_elemento + 2] == b'</':
+                        break
+                    if inicio_elemento >= alvos[0] and inicio_elemento > cortes[-1]:
+                        cortes.append(inicio_elemento)
+                        while alvos and alvos[0] <= inicio_elemento:
+                            alvos.pop(0)
+                    posicao = fim_elemento(dados, inicio_elemento, padroes_nome)
+            except ValueError:
+                return None
+
+            cortes.append(fim_conteudo)
+            intervalos = list(zip(cortes[:-1], cortes[1:]))
+
+    return PlanoFatias(caminho, prologo, fechamento_raiz, intervalos)
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de Posições dos Elementos PLMXML (arquivo auxiliar .idx.json)
+Varre o arquivo com mmap, sem montar árvore, e registra tag, posição e
+tamanho em bytes de cada elemento com atributo id. O índice é gravado ao
+lado do .plmxml para que ferramentas posteriores leiam e façam o parsing
+só do trecho de que precisam.
+"""
+
+import json
+import logging
+import mmap
+import os
+import re
+import sys
+from array import array
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+# Adiciona path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.parsers.backend_xml import obter_backend
+from src.parsers.fatiamento_plmxml import RE_TAG_ABERTURA, dividir_em_fatias, fim_elemento
+
+logger = logging.getLogger(__name__)
+
+# Altere quando o formato do arquivo auxiliar mudar
+VERSAO_INDICE = 1
+
+EXTENSAO_INDICE = '.idx.json'
+
+# Candidato a atributo id (o espaço antes exclui nomes como 'formId='); também
+# casa ' id="x"' dentro do valor de outro atributo, por isso cada candidato é
+# confirmado pelos atributos da tag (ver _valor_id)
+_RE_ID = re.compile(rb'\sid\s*=\s*(?:"[^"]*"|\'[^\']*\')')
+
+# Um atributo nome="valor" da tag de abertura, a partir do fim do anterior
+_RE_ATRIBUTO = re.compile(rb'\s+([^\s=/>]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+# Blocos cujo conteúdo não é marcação: (abertura, fechamento)
+_BLOCOS_OPACOS = ((b'<!--', b'-->'), (b'<![CDATA[', b']]>'))
+
+
+def _proximo_bloco_opaco(dados, posicao: int, limite: int) -> tuple:
+    """
+    (início, fim) do próximo comentário ou CDATA, ou (limite, limite) se não houver
+    """
+    proximo = (limite, limite)
+    for abertura, fechamento in _BLOCOS_OPACOS:
+        inicio = dados.find(abertura, posicao, proximo[0])
+        if inicio >= 0:
+            fim = dados.find(fechamento, inicio + len(abertura))
+            proximo = (inicio, limite if fim < 0 else fim + len(fechamento))
+    return proximo
+
+
+def _valor_id(dados, abertura) -> Optional[bytes]:
+    """
+    Valor do atributo id da tag de abertura (match de RE_TAG_ABERTURA),
+    percorrendo os atributos um a um; None se a tag não tiver id
+    """
+    posicao = abertura.end(1)
+    casar_atributo = _RE_ATRIBUTO.match
+    while True:
+        atributo = casar_atributo(dados, posicao, abertura.end())
+        if atributo is None:
+            return None
+        if atributo.group(1) == b'id':
+            valor = atributo.group(2)
+            return atributo.group(3) if valor is None else valor
+        posicao = atributo.end()
+
+
+class IndiceOffsets:
+    """
+    Posição (offset) e tamanho em bytes de cada elemento com id de um arquivo
+
+    As posições ficam em array('q') e as tags em uma tabela de nomes
+    distintos, o que mantém o índice pequeno mesmo com milhões de elementos.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.tamanho_arquivo = 0
+        self.data_modificacao_ns = 0
+        # Prólogo (declaração e tag de abertura da raiz) e fechamento da raiz,
+        # usados para parsear um trecho com os namespaces e o encoding originais
+        self.prologo = b''
+        self.fechamento_raiz = b''
+        self.ids: List[str] = []
+        self.tags: List[str] = []
+        self.indices_tags = array('i')
+        self.posicoes = array('q')
+        self.tamanhos = array('q')
+        self._indice_ids: Dict[str, int] = {}
+
+    @staticmethod
+    def caminho_indice(caminho: str) -> str:
+        """
+        Arquivo auxiliar do índice: 'exportacao.plmxml' -> 'exportacao.plmxml.idx.json'
+        """
+        return caminho + EXTENSAO_INDICE
+
+    @classmethod
+    def construir(cls, caminho: str) -> 'IndiceOffsets':
+        """
+        Varre o arquivo e monta o índice
+
+        Os atributos id são achados por busca em C; só eles passam por código
+        Python. O fim de cada elemento é achado pela busca da tag de fechamento
+        com o mesmo nome (ver fim_elemento).
+
+        Raises:
+            ValueError: Arquivo que não pode ser varrido byte a byte (ex.: UTF-16)
+                ou com elemento não fechado
+        """
+        plano = dividir_em_fatias(caminho, 1)
+        if plano is None:
+            raise ValueError(f"Arquivo não pode ser indexado por posição: {caminho}")
+
+        indice = cls(caminho)
+        indice.prologo = plano.prologo
+        indice.fechamento_raiz = plano.fechamento_raiz
+        estado = os.stat(caminho)
+        indice.tamanho_arquivo = estado.st_size
+        indice.data_modificacao_ns = estado.st_mtime_ns
+
+        indices_por_tag = {}
+        padroes_nome = {}
+        inicio, fim = plano.intervalos[0]
+        buscar_id = _RE_ID.search
+        casar_tag = RE_TAG_ABERTURA.match
+        adicionar_id = indice.ids.append
+        adicionar_tag = indice.indices_tags.append
+        adicionar_posicao = indice.posicoes.append
+        adicionar_tamanho = indice.tamanhos.append
+
+        with open(caminho, 'rb') as arquivo:
+            with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+                proximo_opaco, fim_opaco = _proximo_bloco_opaco(dados, inicio, fim)
+                posicao = inicio
+                while True:
+                    atributo_id = buscar_id(dados, posicao, fim)
+                    if atributo_id is None:
+                        break
+                    inicio_id, posicao = atributo_id.span()
+
+                    # id= dentro de comentário/CDATA: continua depois do bloco
+                    while inicio_id >= fim_opaco and fim_opaco < fim:
+                        proximo_opaco, fim_opaco = _proximo_bloco_opaco(dados, fim_opaco, fim)
+                    if proximo_opaco <= inicio_id < fim_opaco:
+                        posicao = fim_opaco
+                        continue
+
+                    # A tag começa no '<' anterior ('<' não aparece sem escape em atributos)
+                    inicio_tag = dados.rfind(b'<', inicio, inicio_id)
+                    abertura = casar_tag(dados, inicio_tag)
+                    if abertura is None or abertura.end() < posicao:
+                        # Texto com 'id=' fora de uma tag
+                        continue
+
+                    # ' id=' dentro do valor de outro atributo (ex.: value de um
+                    # UserValue) não é o id do elemento
+                    valor = _valor_id(dados, abertura)
+                    if valor is None:
+                        posicao = abertura.end()
+                        continue
+
+                    tag = abertura.group(1)
+                    indice_tag = indices_por_tag.get(tag)
+                    if indice_tag is None:
+                        indice_tag = indices_por_tag[tag] = len(indice.tags)
+                        indice.tags.append(tag.decode('ascii', 'replace'))
+
+                    if abertura.group(2):
+                        fim_tag = posicao = abertura.end()
+                    else:
+                        fim_tag = fim_elemento(dados, inicio_tag, padroes_nome, abertura)
+                        posicao = abertura.end()
+
+                    adicionar_id(valor.decode('utf-8', 'replace'))
+                    adicionar_tag(indice_tag)
+                    adicionar_posicao(inicio_tag)
+                    adicionar_tamanho(fim_tag - inicio_tag)
+
+        indice._indexar_ids()
+        return indice
+
+    def _indexar_ids(self):
+        """
+        ID -> posição nas listas (o primeiro, se houver IDs repetidos)
+        """
+        self._indice_ids = {}
+        for posicao, id_elemento in enumerate(self.ids):
+            self._indice_ids.setdefault(id_elemento, posicao)
+
+    def salvar(self, caminho_indice: str = None) -> str:
+        """
+        Grava o índice no arquivo auxiliar
+
+        Returns:
+            Caminho do arquivo auxiliar
+        """
+        caminho_indice = caminho_indice or self.caminho_indice(self.caminho)
+        conteudo = {
+            'versao': VERSAO_INDICE,
+            'arquivo': os.path.basename(self.caminho),
+            'tamanho_arquivo': self.tamanho_arquivo,
+            'data_modificacao_ns': self.data_modificacao_ns,
+            # latin-1 preserva os bytes originais em uma string JSON
+            'prologo': self.prologo.decode('latin-1'),
+            'fechamento_raiz': self.fechamento_raiz.decode('latin-1'),
+            'tags': self.tags,
+            'ids': self.ids,
+            'indices_tags': self.indices_tags.tolist(),
+            'posicoes': self.posicoes.tolist(),
+            'tamanhos': self.tamanhos.tolist()
+        }
+
+        caminho_temporario = caminho_indice + '.tmp'
+        with open(caminho_temporario, 'w', encoding='utf-8') as f:
+            json.dump(conteudo, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(caminho_temporario, caminho_indice)
+        return caminho_indice
+
+    @classmethod
+    def carregar(cls, caminho: str) -> Optional['IndiceOffsets']:
+        """
+        Lê o arquivo auxiliar do .plmxml
+
+        Returns:
+            O índice, ou None se não existir, for de outra versão ou estiver
+            desatualizado (tamanho ou data de modificação do .plmxml mudaram)
+        """
+        caminho_indice = cls.caminho_indice(caminho)
+        if not os.path.exists(caminho_indice):
+            return None
+
+        try:
+            with open(caminho_indice, 'r', encoding='utf-8') as f:
+                conteudo = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        estado = os.stat(caminho)
+        if (conteudo.get('versao') != VERSAO_INDICE or
+                conteudo['tamanho_arquivo'] != estado.st_size or
+                conteudo['data_modificacao_ns'] != estado.st_mtime_ns):
+            return None
+
+        indice = cls(caminho)
+        indice.tamanho_arquivo = conteudo['tamanho_arquivo']
+        indice.data_modificacao_ns = conteudo['data_modificacao_ns']
+        indice.prologo = conteudo['prologo'].encode('latin-1')
+        indice.fechamento_raiz = conteudo['fechamento_raiz'].encode('latin-1')
+        indice.tags = conteudo['tags']
+        indice.ids = conteudo['ids']
+        indice.indices_tags = array('i', conteudo['indices_tags'])
+        indice.posicoes = array('q', conteudo['posicoes'])
+        indice.tamanhos = array('q', conteudo['tamanhos'])
+        indice._indexar_ids()
+        return indice
+
+    @classmethod
+    def obter(cls, caminho: str, salvar: bool = True) -> 'IndiceOffsets':
+        """
+        Carrega o arquivo auxiliar válido ou varre o .plmxml (e grava o auxiliar)
+
+        Se o auxiliar não puder ser gravado (pasta somente leitura), o índice
+        varrido é usado só em memória.
+        """
+        indice = cls.carregar(caminho)
+        if indice is None:
+            indice = cls.construir(caminho)
+            if salvar:
+                try:
+                    indice.salvar()
+                except OSError as e:
+                    logger.warning(f"⚠️  Índice de posições não gravado, usando só em memória: {str(e)}")
+        return indice
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, ref: str) -> bool:
+        return ref.strip().lstrip('#') in self._indice_ids
+
+    def localizar(self, ref: str) -> Optional[Tuple[str, int, int]]:
+        """
+        Tag, posição e tamanho em bytes do elemento ('id13' ou '#id13')
+        """
+        posicao = self._indice_ids.get(ref.strip().lstrip('#'))
+        if posicao is None:
+            return None
+        return self.tags[self.indices_tags[posicao]], self.posicoes[posicao], self.tamanhos[posicao]
+
+    def ler_trecho(self, ref: str) -> Optional[bytes]:
+        """
+        Bytes do elemento no arquivo original, lidos com um único seek
+        """
+        localizacao = self.localizar(ref)
+        if localizacao is None:
+            return None
+
+        _, posicao, tamanho = localizacao
+        with open(self.caminho, 'rb') as arquivo:
+            arquivo.seek(posicao)
+            return arquivo.read(tamanho)
+
+    def parsear_elemento(self, ref: str, backend_xml: str = 'auto'):
+        """
+        Faz o parsing só do trecho do elemento
+
+        O trecho é envolvido pelo prólogo e pela raiz originais, então
+        namespaces e encoding são os do arquivo.
+
+        Returns:
+            O elemento (sem o pai) ou None se o ID não estiver no índice
+        """
+        trecho = self.ler_trecho(ref)
+        if trecho is None:
+            return None
+
+        documento = BytesIO(self.prologo + trecho + self.fechamento_raiz)
+        raiz = obter_backend(backend_xml).parse(documento).getroot()
+        return raiz[0]
+
+
+# Teste do índice de posições
+def teste_indice_offsets():
+    """
+    Indexa os arquivos de data\\input e confere se o trecho de cada elemento
+    parseado isoladamente tem o ID esperado
+    """
+    print("🧪 TESTE DO ÍNDICE DE POSIÇÕES")
+    print("=" * 60)
+
+    pasta_entrada = "data\\input"
+    if not os.path.exists(pasta_entrada):
+        print(f"⚠️  Pasta de entrada não encontrada: {pasta_entrada}")
+        return
+
+    for arquivo in os.listdir(pasta_entrada):
+        if not arquivo.lower().endswith(('.xml', '.plmxml')):
+            continue
+
+        caminho = os.path.join(pasta_entrada, arquivo)
+        indice = IndiceOffsets.construir(caminho)
+        divergencias = sum(1 for id_elemento in indice.ids
+                           if indice.parsear_elemento(id_elemento).get('id') != id_elemento)
+
+        print(f"\n📂 {arquivo}: {len(indice)} elementos com id, {len(indice.tags)} tags")
+        print(f"   {'✅' if not divergencias else '❌'} {divergencias} trecho(s) divergente(s)")
+
+
+if __name__ == "__main__":
+    teste_indice_offsets()
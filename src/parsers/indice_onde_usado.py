@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Índice Onde-Usado (where-used) do PLMXML
+Índice reverso revisão -> ocorrências que a instanciam, montado a partir da
+árvore de ocorrências de um ou mais arquivos. Responde em quais montagens
+(e por qual cadeia de pais) um item é usado com uma consulta a dicionário
+seguida de uma subida pelos pais, sem varrer as Occurrences de novo.
+"""
+
+from array import array
+from typing import Any, Callable, Dict, List, Optional
+
+from src.parsers.arvore_ocorrencias import ArvoreOcorrencias
+
+# Atributos do item mestre (masterRef) com o identificador estável do item,
+# o mesmo em todas as exportações (os IDs 'id13' valem só dentro do arquivo)
+ATRIBUTOS_ID_ITEM = ('productId', 'itemId', 'designId', 'partId')
+
+
+class IndiceOndeUsado:
+    """
+    Índice onde-usado de um arquivo ou de um conjunto de exportações
+
+    Cada arquivo adicionado guarda só o necessário para responder consultas:
+    pais dos nós (array('i')), ocorrência, item e revisão de cada nó e as
+    quantidades efetivas. As chaves são o identificador do item
+    (productId/itemId do mestre) e, dentro de cada arquivo, o ID local da
+    revisão.
+    """
+
+    def __init__(self):
+        self.arquivos: List[str] = []
+        self._pais: List[array] = []
+        self._ocorrencias: List[List[str]] = []
+        self._itens: List[List[Optional[str]]] = []
+        self._revisoes: List[List[Optional[str]]] = []
+        self._rotulos: List[List[Optional[str]]] = []
+        self._nomes: List[List[Optional[str]]] = []
+        self._quantidades: List[array] = []
+        # Identificador do item -> [(arquivo, nó)]
+        self._usos: Dict[str, List[tuple]] = {}
+        # Por arquivo: ID local da revisão -> [nó]
+        self._usos_locais: List[Dict[str, List[int]]] = []
+
+    @staticmethod
+    def identificar_item(revisao: Any, resolver: Callable[[str], Optional[Any]]) -> str:
+        """
+        Identificador estável do item de uma revisão: productId/itemId do
+        item mestre, da própria revisão ou, na falta deles, o ID local
+        """
+        atributos = revisao['atributos_basicos']
+        mestre = resolver(atributos['masterRef']) if atributos.get('masterRef') else None
+
+        for registro in (mestre, revisao):
+            if registro is None:
+                continue
+            for atributo in ATRIBUTOS_ID_ITEM:
+                valor = registro['atributos_basicos'].get(atributo)
+                if valor:
+                    return valor
+        return revisao['id']
+
+    def adicionar(self, arquivo: str, arvore: ArvoreOcorrencias,
+                  resolver: Callable[[str], Optional[Any]]) -> int:
+        """
+        Indexa a árvore de ocorrências de um arquivo em uma passada
+
+        Args:
+            arquivo: Nome do arquivo de origem
+            arvore: Árvore de ocorrências do arquivo
+            resolver: Função ref -> item do mesmo arquivo (PLMXMLParserAvancado.resolver)
+
+        Returns:
+            Número de nós indexados
+        """
+        indice_arquivo = len(self.arquivos)
+        itens = []
+        revisoes = []
+        rotulos = []
+        nomes = []
+        usos_locais = {}
+        itens_por_revisao = {}
+
+        for no in arvore:
+            revisao = arvore.revisoes[no]
+            if revisao is None:
+                # Sem revisão resolvida: indexa pelo próprio instancedRef
+                id_revisao = arvore.linhas[no]['filho'].strip().lstrip('#')
+                item = rotulo = nome = None
+            else:
+                id_revisao = revisao['id']
+                item = itens_por_revisao.get(id_revisao)
+                if item is None:
+                    item = itens_por_revisao[id_revisao] = self.identificar_item(revisao, resolver)
+                rotulo = revisao['atributos_basicos'].get('revision')
+                nome = revisao['nome']
+
+            itens.append(item)
+            revisoes.append(id_revisao)
+            rotulos.append(rotulo)
+            nomes.append(nome)
+
+            if id_revisao:
+                usos_locais.setdefault(id_revisao, []).append(no)
+            if item is not None:
+                self._usos.setdefault(item, []).append((indice_arquivo, no))
+
+        self.arquivos.append(arquivo)
+        self._pais.append(array('i', arvore.pais))
+        self._ocorrencias.append(list(arvore.ocorrencias))
+        self._itens.append(itens)
+        self._revisoes.append(revisoes)
+        self._rotulos.append(rotulos)
+        self._nomes.append(nomes)
+        self._quantidades.append(array('d', arvore.quantidades_efetivas()))
+        self._usos_locais.append(usos_locais)
+
+        return len(itens)
+
+    def __len__(self) -> int:
+        """
+        Número de itens distintos indexados
+        """
+        return len(self._usos)
+
+    def __contains__(self, item_id: str) -> bool:
+        return bool(self._localizar(item_id))
+
+    def itens(self) -> List[str]:
+        return list(self._usos)
+
+    def _localizar(self, item_id: str, arquivo: Optional[str] = None) -> List[tuple]:
+        """
+        Usos [(arquivo, nó)] pelo identificador do item ou, se não houver,
+        pelo ID local da revisão ('id13' ou '#id13')
+        """
+        chave = item_id.strip()
+        usos = self._usos.get(chave)
+        if usos is None:
+            chave = chave.lstrip('#')
+            usos = [
+                (indice_arquivo, no)
+                for indice_arquivo, locais in enumerate(self._usos_locais)
+                for no in locais.get(chave, ())
+            ]
+
+        if arquivo is not None:
+            usos = [uso for uso in usos if self.arquivos[uso[0]] == arquivo]
+        return usos
+
+    def _descrever_no(self, indice_arquivo: int, no: int) -> Dict[str, Any]:
+        return {
+            'ocorrencia': self._ocorrencias[indice_arquivo][no],
+            'item_id': self._itens[indice_arquivo][no],
+            'revisao': self._revisoes[indice_arquivo][no],
+            'revisao_item': self._rotulos[indice_arquivo][no],
+            'nome': self._nomes[indice_arquivo][no]
+        }
+
+    def onde_usado(self, item_id: str, arquivo: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Onde um item é usado
+
+        Args:
+            item_id: productId/itemId do item ou ID local da revisão ('#id13')
+            arquivo: Restringe a um arquivo do conjunto (None = todos)
+
+        Returns:
+            Um registro por ocorrência que instancia o item, com arquivo,
+            ocorrência, revisão, profundidade, quantidade efetiva, montagem
+            (item pai direto, None na raiz) e cadeia de pais da raiz até a
+            montagem
+        """
+        resultados = []
+
+        for indice_arquivo, no in self._localizar(item_id, arquivo):
+            pais = self._pais[indice_arquivo]
+            cadeia = []
+            pai = pais[no]
+            while pai >= 0:
+                cadeia.append(self._descrever_no(indice_arquivo, pai))
+                pai = pais[pai]
+            cadeia.reverse()
+
+            registro = self._descrever_no(indice_arquivo, no)
+            registro.update({
+                'arquivo': self.arquivos[indice_arquivo],
+                'profundidade': len(cadeia),
+                'quantidade_efetiva': self._quantidades[indice_arquivo][no],
+                'montagem': cadeia[-1]['item_id'] if cadeia else None,
+                'cadeia_pais': cadeia
+            })
+            resultados.append(registro)
+
+        return resultados
+
+    def montagens_diretas(self, item_id: str, arquivo: Optional[str] = None) -> List[str]:
+        """
+        Itens que usam o item diretamente (um nível acima), sem repetição
+        """
+        montagens = {}
+        for indice_arquivo, no in self._localizar(item_id, arquivo):
+            pai = self._pais[indice_arquivo][no]
+            if pai >= 0:
+                montagem = self._itens[indice_arquivo][pai] or self._revisoes[indice_arquivo][pai]
+                montagens.setdefault(montagem, None)
+        return list(montagens)
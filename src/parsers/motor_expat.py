@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de Extração Expat (estilo SAX) para o Parser PLMXML Avançado
+Cria os registros de itens, BOM e relacionamentos direto dos eventos de
+início e fim do xml.parsers.expat, sem montar Elements.
+
+Só ganham objeto (ElementoLeve, com __slots__) os elementos que viram
+registro, os UserData (índice de UserValues), os <Transform> (se
+extrair_transformacoes) e os filhos diretos desses, que os construtores de
+registros examinam. ApplicationRef, UserList, DailyTime e os demais só são
+contabilizados nos metadados. O resultado é o mesmo de
+_coletar_registros_streaming, então a consolidação é compartilhada.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+import xml.parsers.expat as expat
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+# Adiciona path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.utils.medidor_fases import pico_rss_mb
+
+# Bytes entregues ao expat por chamada; o prazo é verificado entre blocos
+TAMANHO_BLOCO = 1024 * 1024
+
+
+class ElementoLeve:
+    """
+    Elemento mínimo com a interface usada pelos construtores de registros:
+    tag, attrib, text, get(), len() e iteração pelos filhos guardados
+    """
+    __slots__ = ('tag', 'attrib', 'text', 'filhos', 'total_filhos', 'get')
+
+    def __init__(self, tag: str, attrib: Dict[str, str], guardar_filhos: bool):
+        self.tag = tag
+        self.attrib = attrib
+        self.text = None
+        # Só elementos completos guardam os filhos; os demais só os contam
+        self.filhos = [] if guardar_filhos else None
+        self.total_filhos = 0
+        # get() do próprio dict: os construtores o chamam várias vezes por registro
+        self.get = attrib.get
+
+    def __len__(self) -> int:
+        return self.total_filhos
+
+    def __iter__(self):
+        return iter(self.filhos or ())
+
+
+def _erro_parsing(erro: expat.ExpatError) -> ET.ParseError:
+    """
+    Converte o erro do expat no ParseError do ElementTree (o mesmo tipo e
+    mensagem que o backend etree lança), tratado por ERROS_PARSING
+    """
+    convertido = ET.ParseError(f"{expat.ErrorString(erro.code)}: line {erro.lineno}, column {erro.offset}")
+    convertido.code = erro.code
+    convertido.position = (erro.lineno, erro.offset)
+    return convertido
+
+
+class ColetorExpat:
+    """
+    Coleta registros e metadados de um documento com o expat
+
+    Usa a tabela de roteamento, os construtores de registros e o acumulador
+    de metadados do parser, de modo que a saída é idêntica à dos modos DOM e
+    streaming.
+    """
+
+    def __init__(self, parser):
+        """
+        Args:
+            parser: PLMXMLParserAvancado com a configuração e o prazo do arquivo
+        """
+        self.parser = parser
+
+    def coletar(self, arquivo, encoding_forcado: Optional[str]) -> tuple:
+        """
+        Percorre o documento criando os registros de cada padrão de busca, na
+        ordem do documento, ainda sem IDs ausentes e posições
+
+        Args:
+            arquivo: Arquivo binário (o original ou uma fatia, ver LeitorFatia)
+            encoding_forcado: Encoding a forçar no expat (ver _detectar_encoding)
+
+        Returns:
+            Tupla (registros por grupo e tipo de busca, acumulador de metadados,
+            raiz como ElementoLeve sem filhos)
+
+        Raises:
+            xml.etree.ElementTree.ParseError: XML inválido
+        """
+        parser = self.parser
+        uri_plm = parser.namespace['plm']
+        prefixo_ns = '{' + uri_plm + '}'
+        grupos, rotear = parser._criar_roteador()
+        construtores = parser._construtores_registros()
+        acumular_user_values = parser._acumular_user_values
+        tag_user_data = prefixo_ns + 'UserData'
+        tag_transform = prefixo_ns + 'Transform' if parser.config['extrair_transformacoes'] else None
+
+        registros = {
+            grupo: {tipo_busca: [] for tipo_busca, _, _ in padroes}
+            for grupo, padroes in grupos.items()
+        }
+        acumulador = parser._novo_acumulador_metadados()
+        tipos_elementos = acumulador['tipos_elementos']
+        atributos_unicos = acumulador['atributos_unicos']
+        transformacoes = acumulador['transformacoes']
+
+        # Nome do expat ('uri}Tag') -> (tag '{uri}Tag', tipo, tag local no
+        # namespace PLMXML ou None, contém 'Application', objeto obrigatório)
+        info_tags = {}
+        # Nomes de atributo sem namespace, para evitar reescrever o attrib
+        atributos_simples = set()
+
+        # Pilhas paralelas dos elementos abertos (evitam uma tupla por elemento)
+        pilha_objetos = []
+        pilha_atributos = []
+        pilha_vagas = []
+        total_elementos = 0
+        profundidade_maxima = 0
+        raiz = None
+
+        def descrever_tag(nome: str) -> tuple:
+            tag = '{' + nome if '}' in nome else nome
+            tipo = tag.replace(prefixo_ns, '')
+            tag_local = tag[len(prefixo_ns):] if tag.startswith(prefixo_ns) else None
+            obrigatorio = tag == tag_user_data or tag == tag_transform
+            info = info_tags[nome] = (tag, tipo, tag_local, 'Application' in tag, obrigatorio)
+            return info
+
+        def inicio(nome: str, attrib: Dict[str, str]):
+            nonlocal total_elementos, profundidade_maxima, raiz
+            info = info_tags.get(nome)
+            if info is None:
+                info = descrever_tag(nome)
+            tag, tipo, tag_local, eh_aplicacao, obrigatorio = info
+
+            if attrib and not atributos_simples.issuperset(attrib):
+                # Atributos com namespace chegam como 'uri}nome'
+                attrib = {('{' + chave if '}' in chave else chave): valor for chave, valor in attrib.items()}
+                atributos_simples.update(chave for chave in attrib if '}' not in chave)
+
+            # Metadados: mesma contabilização de _acumular_metadados
+            profundidade = len(pilha_objetos)
+            total_elementos += 1
+            if profundidade > profundidade_maxima:
+                profundidade_maxima = profundidade
+            tipos_elementos[tipo] = tipos_elementos.get(tipo, 0) + 1
+            for chave in attrib:
+                atributos_unicos[chave] = atributos_unicos.get(chave, 0) + 1
+            if eh_aplicacao and acumulador['aplicacao'] is None:
+                acumulador['aplicacao'] = dict(attrib)
+
+            if not profundidade:
+                acumulador['elemento_raiz'] = tag
+                raiz = ElementoLeve(tag, attrib, False)
+                pilha_objetos.append(raiz)
+                pilha_atributos.append(attrib)
+                pilha_vagas.append(None)
+                return
+
+            # './/' não inclui a raiz: só os demais elementos são roteados
+            vagas = None
+            if tag_local is not None:
+                destinos = rotear(tag_local, attrib)
+                if destinos:
+                    vagas = []
+                    for grupo, tipo_busca in destinos:
+                        lista = registros[grupo][tipo_busca]
+                        vagas.append((grupo, tipo_busca, lista, len(lista)))
+                        lista.append(None)
+
+            pai = pilha_objetos[-1]
+            objeto = None
+            if vagas is not None or obrigatorio:
+                objeto = ElementoLeve(tag, attrib, True)
+            elif pai is not None and pai.filhos is not None:
+                # Filho direto de um elemento completo: só tag, atributos e texto
+                objeto = ElementoLeve(tag, attrib, False)
+
+            if pai is not None:
+                pai.total_filhos += 1
+                if pai.filhos is not None and objeto is not None:
+                    pai.filhos.append(objeto)
+
+            pilha_objetos.append(objeto)
+            pilha_atributos.append(attrib)
+            pilha_vagas.append(vagas)
+
+        def fim(nome: str):
+            objeto = pilha_objetos.pop()
+            pilha_atributos.pop()
+            vagas = pilha_vagas.pop()
+            if objeto is None or not pilha_objetos:
+                return
+
+            # O dono de UserData/Transform é o elemento aberto acima
+            tag = objeto.tag
+            if tag == tag_user_data:
+                acumular_user_values(acumulador, objeto, pilha_atributos[-1])
+            elif tag == tag_transform:
+                transformacoes[pilha_atributos[-1].get('id')] = objeto.text or ''
+
+            if vagas:
+                # IDs ausentes e posições são preenchidos na consolidação
+                ids_registro = {
+                    'itens': objeto.get('id', objeto.get('itemId')),
+                    'bom': objeto.get('id'),
+                    'relacionamentos': objeto.get('id')
+                }
+                for grupo, tipo_busca, lista, indice in vagas:
+                    lista[indice] = construtores[grupo](objeto, tipo_busca, ids_registro[grupo], None)
+
+            # Os filhos já foram consumidos pelos registros deste elemento
+            if objeto.filhos:
+                del objeto.filhos[:]
+
+        def texto(dados: str):
+            # Como no ElementTree, text é só o que vem antes do primeiro filho
+            objeto = pilha_objetos[-1]
+            if objeto is not None and not objeto.total_filhos:
+                objeto.text = dados if objeto.text is None else objeto.text + dados
+
+        leitor = expat.ParserCreate(encoding_forcado, '}')
+        leitor.buffer_text = True
+        # Como ElementTree e lxml, sem os atributos com valor padrão do DTD
+        leitor.specified_attributes = True
+        leitor.StartElementHandler = inicio
+        leitor.EndElementHandler = fim
+        leitor.CharacterDataHandler = texto
+
+        verificar_prazo = parser._prazo.verificar
+        try:
+            while True:
+                bloco = arquivo.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                leitor.Parse(bloco, False)
+                verificar_prazo('parsing')
+            leitor.Parse(b'', True)
+        except expat.ExpatError as e:
+            raise _erro_parsing(e) from None
+
+        acumulador['total_elementos'] = total_elementos
+        acumulador['profundidade_maxima'] = profundidade_maxima
+        return registros, acumulador, raiz
+
+
+def _medir_motor(caminho: str, motor: str, backend_xml: str) -> Dict[str, Any]:
+    """
+    Processa o arquivo com um motor em um processo novo e mede tempo e pico
+    de RSS (o pico de um processo só cresce, por isso um processo por medição)
+    """
+    from src.parsers.plmxml_parser_avancado import PLMXMLParserAvancado
+
+    parser = PLMXMLParserAvancado(modo_verbose=False)
+    parser.config.update({
+        'backend_xml': backend_xml,
+        'modo_streaming': motor == 'iterparse',
+        'motor_expat': motor == 'expat',
+        'timeout_processamento': None
+    })
+
+    rss_inicial = pico_rss_mb()
+    inicio = time.perf_counter()
+    dados = parser.processar_arquivo_completo(caminho, salvar_json=False, incluir_estatisticas=False)
+    segundos = time.perf_counter() - inicio
+    if dados is None:
+        return None
+
+    # Resumo da saída sem os campos que mudam a cada execução
+    dados['metadados']['xml'].pop('data_processamento', None)
+    conteudo = json.dumps(dados, sort_keys=True, ensure_ascii=False, default=str)
+
+    return {
+        'segundos': segundos,
+        'pico_rss_mb': pico_rss_mb(),
+        'rss_inicial_mb': rss_inicial,
+        'elementos': dados['metadados']['xml']['total_elementos'],
+        'resumo_saida': hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+    }
+
+
+def comparar_motores(caminho: str, backend_xml: str = 'auto',
+                     motores: tuple = ('dom', 'iterparse', 'expat')) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Benchmark do motor expat contra o caminho DOM (e o iterparse)
+
+    Returns:
+        Motor -> {'segundos', 'mb_por_segundo', 'elementos_por_segundo',
+        'pico_rss_mb', 'rss_inicial_mb', 'elementos', 'saida_identica'} ou
+        None se o motor falhou. saida_identica compara com o DOM.
+    """
+    tamanho_mb = os.path.getsize(caminho) / (1024 * 1024)
+    resultados = {}
+
+    for motor in motores:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            medicao = executor.submit(_medir_motor, caminho, motor, backend_xml).result()
+        if medicao is not None:
+            medicao['mb_por_segundo'] = tamanho_mb / medicao['segundos']
+            medicao['elementos_por_segundo'] = medicao['elementos'] / medicao['segundos']
+        resultados[motor] = medicao
+
+    referencia = resultados.get('dom')
+    for medicao in resultados.values():
+        if medicao is not None:
+            medicao['saida_identica'] = (referencia is not None and
+                                         medicao['resumo_saida'] == referencia['resumo_saida'])
+
+    return resultados
+
+
+# Teste do motor expat
+def teste_motor_expat():
+    """
+    Compara DOM, iterparse e expat nos arquivos de data\\input
+    """
+    print("🧪 BENCHMARK DO MOTOR EXPAT")
+    print("=" * 60)
+
+    pasta_entrada = "data\\input"
+    if not os.path.exists(pasta_entrada):
+        print(f"⚠️  Pasta de entrada não encontrada: {pasta_entrada}")
+        return
+
+    for arquivo in os.listdir(pasta_entrada):
+        if not arquivo.lower().endswith(('.xml', '.plmxml')):
+            continue
+
+        print(f"\n📂 {arquivo}")
+        for motor, medicao in comparar_motores(os.path.join(pasta_entrada, arquivo)).items():
+            if medicao is None:
+                print(f"   ❌ {motor}: falhou")
+                continue
+            print(f"   {'✅' if medicao['saida_identica'] else '❌'} {motor:<9} "
+                  f"⏱️  {medicao['segundos']:.2f}s ({medicao['mb_por_segundo']:.1f} MB/s, "
+                  f"{medicao['elementos_por_segundo']:,.0f} elementos/s) "
+                  f"🧠 pico {medicao['pico_rss_mb']:.0f} MB (início {medicao['rss_inicial_mb']:.0f} MB)")
+
+
+if __name__ == "__main__":
+    teste_motor_expat()
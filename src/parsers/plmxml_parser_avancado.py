@@ -5,10 +5,16 @@ Combina funcionalidades dos parsers básico e melhorado com recursos avançados
 """
 
 import xml.etree.ElementTree as ET
-import json
+import codecs
+import io
 import os
+import re
+import shutil
 import sys
+import tempfile
 import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
@@ -16,6 +22,92 @@ from typing import Dict, List, Optional, Any
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.utils.logger import configurar_logger
+from src.utils.cache_resultados import CacheResultados
+from src.utils.escritor_json import gravar_json, gravar_resultado_jsonl
+from src.utils.medidor_fases import MedidorFases
+from src.utils.prazo import Prazo, TempoEsgotadoError
+from src.parsers.arvore_ocorrencias import ArvoreOcorrencias
+from src.parsers.indice_onde_usado import IndiceOndeUsado
+from src.parsers.transformacoes import NUMPY_DISPONIVEL, TransformacoesOcorrencias
+from src.parsers.fatiamento_plmxml import LeitorFatia, dividir_em_fatias
+from src.parsers.indice_offsets import IndiceOffsets
+from src.parsers.motor_expat import ColetorExpat
+from src.parsers.backend_xml import ERROS_PARSING, obter_backend
+from src.parsers.registros_compactos import (
+    ItemCompacto, LinhaBOMCompacta, RegistroCompacto, achatar_atributos, serializar_registro
+)
+
+# Versão da lógica de extração; altere quando a saída mudar para invalidar o cache
+VERSAO_PARSER = "2.2"
+
+# Opções que alteram o resultado e por isso entram na chave do cache; as
+# demais (motor, backend, prazo, medição, formato de gravação...) só mudam
+# como o arquivo é processado ou salvo
+CONFIG_CHAVE_CACHE = (
+    'incluir_propriedades_detalhadas',
+    'incluir_relacionamentos',
+    'incluir_metadados',
+    'remover_duplicatas',
+    'incluir_indice_ids',
+    'incluir_arvore_ocorrencias',
+    'incluir_consolidacao_quantidades',
+    'incluir_indice_user_values',
+    'extrair_transformacoes',
+    'registros_compactos'
+)
+
+# Padrões de busca: (tipo_busca, tag local exigida, atributo exigido)
+# Uma tag None equivale a 'plm:*', ou seja, qualquer elemento PLMXML que
+# possua o atributo indicado. A ordem define a ordem de saída.
+PADROES_ITEM = [
+    ('ProductRevision', 'ProductRevision', None),
+    ('Product', 'Product', None),
+    ('Part', 'Part', None),
+    ('Item', 'Item', None),
+    ('Design', 'Design', None),
+    ('DesignRevision', 'DesignRevision', None),
+    ('ElementoComID', None, 'id')  # Qualquer elemento com ID
+]
+
+PADROES_BOM = [
+    ('ProductInstance', 'ProductInstance', None),
+    ('PartInstance', 'PartInstance', None),
+    ('BOMLine', 'BOMLine', None),
+    ('Instance', 'Instance', None),
+    ('Occurrence', 'Occurrence', None),
+    ('RelacaoPai', None, 'parentRef'),
+    ('RelacaoFilho', None, 'instancedRef')
+]
+
+PADROES_RELACAO = [
+    ('GeneralRelation', 'GeneralRelation', None),
+    ('Relation', 'Relation', None),
+    ('relatedRefs', None, 'relatedRefs')
+]
+
+# Bytes iniciais inspecionados para detectar o encoding (também usado como
+# tamanho do buffer de leitura, para que a amostra não seja lida duas vezes)
+TAMANHO_AMOSTRA_ENCODING = 64 * 1024
+
+_RE_DECLARACAO_ENCODING = re.compile(rb'^<\?xml[^>]*?encoding\s*=\s*["\']([A-Za-z0-9._-]+)["\']')
+
+# Estatísticas que guardam o maior valor visto (não são somadas entre arquivos/workers)
+ESTATISTICAS_PICO = ('memoria_utilizada', 'memoria_mb_por_mb_entrada', 'memoria_por_fase')
+
+def combinar_estatisticas_pico(destino: Dict[str, Any], origem: Dict[str, Any]):
+    """
+    Mantém em destino o maior valor de cada estatística de pico de origem
+    """
+    for chave in ('memoria_utilizada', 'memoria_mb_por_mb_entrada'):
+        valor = origem.get(chave)
+        if valor is not None:
+            destino[chave] = max(destino.get(chave) or 0, valor)
+    
+    for fase, medicao in origem.get('memoria_por_fase', {}).items():
+        atual = destino.setdefault('memoria_por_fase', {}).setdefault(fase, {})
+        for campo, valor in medicao.items():
+            if valor is not None and campo.endswith('pico_mb'):
+                atual[campo] = max(atual.get(campo, 0), valor)
 
 class PLMXMLParserAvancado:
     def __init__(self, arquivo_log=None, modo_verbose=True):
@@ -38,9 +130,13 @@ class PLMXMLParserAvancado:
             'arquivos_processados': 0,
             'itens_extraidos': 0,
             'linhas_bom_extraidas': 0,
+            'linhas_bom_duplicadas_removidas': 0,
             'erros': 0,
             'tempo_processamento': 0,
-            'memoria_utilizada': 0,
+            'memoria_utilizada': 0,  # Pico de RSS em MB
+            'memoria_mb_por_mb_entrada': 0,  # Maior pico tracemalloc / tamanho do arquivo
+            'memoria_por_fase': {},
+            'tempo_por_fase': {},  # {fase: {'segundos', 'elementos'}} somados entre arquivos
             'elementos_processados': 0
         }
         
@@ -51,13 +147,91 @@ class PLMXMLParserAvancado:
             'incluir_propriedades_detalhadas': True,
             'incluir_relacionamentos': True,
             'incluir_metadados': True,
-            'remover_duplicatas': True
+            'remover_duplicatas': True,
+            # None = automático (streaming acima de max_tamanho_arquivo_mb)
+            'modo_streaming': None,
+            # Processos para um único arquivo grande, dividido nos filhos da raiz
+            # (ver _parsear_xml_fatiado); 1 = um processo só
+            'processos_por_arquivo': 1,
+            'tamanho_min_fatiamento_mb': 64,
+            # Registros criados direto dos eventos do expat, sem Elements (ver
+            # motor_expat); substitui o DOM e o iterparse dos modos streaming e fatias
+            'motor_expat': False,
+            'incluir_indice_ids': True,
+            # Árvore ProductView -> Occurrence resolvida (ver ArvoreOcorrencias)
+            'incluir_arvore_ocorrencias': True,
+            # Quantidade total por revisão em todos os níveis da árvore
+            'incluir_consolidacao_quantidades': True,
+            # Índice título -> [(id do dono, valor, tipo)] dos UserValue
+            'incluir_indice_user_values': True,
+            # Decodifica os <Transform> e exporta a posição absoluta de cada
+            # ocorrência (usa NumPy quando instalado)
+            'extrair_transformacoes': False,
+            # resolver_elemento() sem a árvore em memória (modo streaming/fatias/cache)
+            # lê só o trecho do elemento, pelo índice de posições .idx.json
+            'usar_indice_offsets': False,
+            # JSON de saída sem indentação (menor e mais rápido de gravar)
+            'json_compacto': False,
+            # 'json' (um arquivo) ou 'jsonl' (pasta com itens.jsonl, bom.jsonl,
+            # relacionamentos.jsonl... e manifesto.json; ver gravar_resultado_jsonl)
+            'formato_saida': 'json',
+            # Itens e linhas BOM como objetos com __slots__ (ver registros_compactos)
+            'registros_compactos': False,
+            # Cache em disco de resultados (ver CacheResultados)
+            'usar_cache': False,
+            'pasta_cache': "data\\cache",
+            'tamanho_max_cache_mb': 1024,
+            # 'auto' usa lxml quando instalado, senão xml.etree.ElementTree
+            'backend_xml': 'auto',
+            # Pico de alocações por fase com tracemalloc; o pico de RSS é sempre
+            # medido, mas o tracemalloc deixa o parsing várias vezes mais lento
+            'medir_alocacoes': False
         }
+        
+        # Índices do último arquivo processado (ver resolver())
+        self.indice_ids = {}
+        self.indice_elementos = {}
+        
+        # Último arquivo processado e seu índice de posições, carregado na
+        # primeira busca de resolver_elemento() que não estiver em memória
+        # (False se não pôde ser montado para este arquivo)
+        self.arquivo_atual = None
+        self._indice_offsets = None
+        
+        # JSON (ou pasta JSON Lines) gravado para o último arquivo; None se
+        # o resultado não foi salvo
+        self.arquivo_saida = None
+        
+        # Árvore de ocorrências do último arquivo processado
+        self.arvore_ocorrencias = None
+        
+        # UserValues do último arquivo processado por título (ver valores_campo())
+        self.indice_user_values = {}
+        
+        # Transformações de mundo do último arquivo processado (se extrair_transformacoes)
+        self.transformacoes = None
+        
+        # Índice onde-usado do último arquivo processado (ver onde_usado())
+        self.indice_onde_usado = IndiceOndeUsado()
+        
+        # Casamentos repetidos de BOM descartados no último arquivo (ver _tabela_roteamento)
+        self.duplicatas_bom_removidas = 0
+        
+        # Medidor de tempo e memória por fase do arquivo em processamento
+        self._medidor = None
+        
+        # Encoding forçado na nova tentativa de um arquivo declarado UTF-8 com
+        # bytes inválidos (ver _utf8_invalido)
+        self._encoding_recuperacao = None
+        
+        # Prazo do arquivo em processamento (sem limite fora de processar_arquivo_completo)
+        self._prazo = Prazo()
     
     def processar_arquivo_completo(self, caminho_arquivo: str, 
                                   salvar_json: bool = True, 
                                   pasta_saida: str = None,
-                                  incluir_estatisticas: bool = True) -> Optional[Dict[str, Any]]:
+                                  incluir_estatisticas: bool = True,
+                                  prazo: Prazo = None) -> Optional[Dict[str, Any]]:
         """
         Processa um arquivo PLMXML com todas as funcionalidades
         
@@ -66,9 +240,11 @@ class PLMXMLParserAvancado:
             salvar_json: Se deve salvar resultado em JSON
             pasta_saida: Pasta onde salvar os resultados
             incluir_estatisticas: Se deve incluir estatísticas no resultado
+            prazo: Prazo compartilhado com as etapas seguintes (padrão: um
+                   novo prazo de config['timeout_processamento'] segundos)
         
         Returns:
-            Dicionário com dados extraídos ou None se houver erro
+            Dicionário com dados extraídos ou None se houver erro ou o prazo acabar
         """
         inicio_processamento = time.time()
         self.logger.info(f"🎯 Iniciando processamento completo: {caminho_arquivo}")
@@ -77,31 +253,128 @@ class PLMXMLParserAvancado:
         if not self._validar_arquivo_avancado(caminho_arquivo):
             return None
         
+        self._prazo = prazo if prazo is not None else Prazo(self.config['timeout_processamento'])
+        self._medidor = MedidorFases(self.config['medir_alocacoes'])
+        self.arquivo_atual = caminho_arquivo
+        self._indice_offsets = None
+        self.arquivo_saida = None
+        # Os elementos do índice mantêm viva a árvore do arquivo anterior:
+        # liberada antes do parsing, o pico não soma duas árvores
+        self.indice_ids = {}
+        self.indice_elementos = {}
+        self._medidor.iniciar()
+        
         try:
+            dados = None
+            chave_cache = None
+            
+            if self.config['usar_cache']:
+                with self._medir_fase('leitura'):
+                    chave_cache = self._gerar_chave_cache(caminho_arquivo)
+                    dados = self._obter_cache().obter(chave_cache)
+                if dados is not None:
+                    self.logger.info("♻️  Resultado obtido do cache (XML não foi relido)")
+                    # A chave vem só do conteúdo: o resultado pode ser de uma
+                    # cópia do arquivo em outro caminho
+                    dados['metadados']['arquivo'] = self._extrair_metadados_arquivo(caminho_arquivo)
+                    dados['metadados']['xml']['data_processamento'] = datetime.now().isoformat()
+                    self._restaurar_cache(dados)
+                    self._indexar_ids(dados)
+                    self.indice_user_values = dados.get('indice_user_values', {})
+                    self._montar_arvore_ocorrencias(dados)
+            
             # Carrega e parseia o XML
-            dados = self._parsear_xml_avancado(caminho_arquivo)
+            if dados is None:
+                dados = self._parsear_xml(caminho_arquivo)
+                
+                if dados is None and self._utf8_invalido(caminho_arquivo):
+                    # Exportações declaradas UTF-8 mas gravadas em latin-1
+                    self.logger.warning("⚠️  Arquivo declarado UTF-8 com bytes inválidos - reprocessando como latin-1")
+                    self._encoding_recuperacao = 'iso-8859-1'
+                    try:
+                        dados = self._parsear_xml(caminho_arquivo)
+                    finally:
+                        self._encoding_recuperacao = None
+                
+                if dados and chave_cache is not None:
+                    self._guardar_cache(chave_cache, dados)
             
             if dados:
+                tamanho_mb = os.path.getsize(caminho_arquivo) / (1024 * 1024)
+                tempo_processamento = time.time() - inicio_processamento
+                
+                elementos_fases = self._elementos_por_fase(dados)
+                
                 # Adiciona estatísticas se solicitado
                 if incluir_estatisticas:
-                    dados['estatisticas'] = self._gerar_estatisticas_detalhadas(inicio_processamento)
-                
-                # Atualiza estatísticas globais
-                self._atualizar_estatisticas_globais(dados, time.time() - inicio_processamento)
+                    dados['estatisticas'] = self._gerar_estatisticas_detalhadas(
+                        inicio_processamento, tamanho_mb, elementos_fases)
                 
                 # Salva resultado se solicitado
                 if salvar_json:
-                    self._salvar_resultado_avancado(dados, caminho_arquivo, pasta_saida)
+                    with self._medir_fase('serializacao'):
+                        self.arquivo_saida = self._salvar_resultado_avancado(dados, caminho_arquivo, pasta_saida)
+                    
+                    # A serialização só é medida depois de gravada: entra no
+                    # resultado retornado e nas estatísticas globais, não no JSON
+                    if incluir_estatisticas:
+                        dados['estatisticas']['memoria'] = self._medidor.resumo(tamanho_mb)
+                        dados['estatisticas']['tempos_fases'] = self._medidor.resumo_tempos(elementos_fases)
+                
+                memoria = self._medidor.resumo(tamanho_mb)
+                tempos = self._medidor.resumo_tempos(elementos_fases)
+                self._registrar_tempos_log(tempos)
+                self._registrar_memoria_log(memoria)
+                
+                # Atualiza estatísticas globais
+                self._atualizar_estatisticas_globais(dados, tempo_processamento, memoria, tempos)
                 
                 self.logger.info("✅ Processamento completo concluído com sucesso")
                 return dados
             else:
                 return None
                 
+        except TempoEsgotadoError as e:
+            self.stats['erros'] += 1
+            self.logger.error(f"⏱️  {str(e)} - processamento de {caminho_arquivo} abortado")
+            return None
         except Exception as e:
             self.stats['erros'] += 1
             self.logger.error(f"❌ Erro durante processamento completo: {str(e)}")
             return None
+        finally:
+            self._medidor.finalizar()
+            self._medidor = None
+            self._prazo = Prazo()
+    
+    def _parsear_xml(self, caminho_arquivo: str) -> Optional[Dict[str, Any]]:
+        """
+        Faz o parsing no modo adequado ao arquivo e à configuração
+        """
+        if self._usar_modo_fatiado(caminho_arquivo):
+            return self._parsear_xml_fatiado(caminho_arquivo)
+        if self.config['motor_expat'] or self._usar_modo_streaming(caminho_arquivo):
+            return self._parsear_xml_streaming(caminho_arquivo)
+        return self._parsear_xml_avancado(caminho_arquivo)
+    
+    def _utf8_invalido(self, caminho_arquivo: str) -> bool:
+        """
+        True se o arquivo é lido como UTF-8 (declarado ou por padrão, sem BOM)
+        mas contém bytes que não são UTF-8 válido
+        """
+        with open(caminho_arquivo, 'rb', buffering=TAMANHO_AMOSTRA_ENCODING) as f:
+            encoding_forcado, encoding_usado = self._detectar_encoding(f)
+            if encoding_forcado is not None or encoding_usado not in ('utf-8', 'utf8'):
+                return False
+            
+            decodificador = codecs.getincrementaldecoder('utf-8')()
+            try:
+                for bloco in iter(lambda: f.read(TAMANHO_AMOSTRA_ENCODING), b''):
+                    decodificador.decode(bloco)
+                decodificador.decode(b'', final=True)
+            except UnicodeDecodeError:
+                return True
+        return False
     
     def _validar_arquivo_avancado(self, caminho_arquivo: str) -> bool:
         """
@@ -120,8 +393,10 @@ class PLMXMLParserAvancado:
         self.logger.info(f"📏 Tamanho do arquivo: {tamanho_mb:.2f} MB")
         
         if tamanho_mb > self.config['max_tamanho_arquivo_mb']:
-            self.logger.error(f"❌ Arquivo muito grande: {tamanho_mb:.2f} MB (máximo: {self.config['max_tamanho_arquivo_mb']} MB)")
-            return False
+            if self.config['modo_streaming'] is False:
+                self.logger.error(f"❌ Arquivo muito grande: {tamanho_mb:.2f} MB (máximo: {self.config['max_tamanho_arquivo_mb']} MB)")
+                return False
+            self.logger.warning(f"⚠️  Arquivo acima de {self.config['max_tamanho_arquivo_mb']} MB - será processado em modo streaming")
         
         # Verifica extensão
         extensao = os.path.splitext(caminho_arquivo)[1].lower()
@@ -130,6 +405,179 @@ class PLMXMLParserAvancado:
         
         return True
     
+    def _obter_cache(self) -> CacheResultados:
+        """
+        Cria o acesso ao cache com a configuração atual
+        """
+        return CacheResultados(self.config['pasta_cache'], self.config['tamanho_max_cache_mb'], self.logger)
+    
+    def _gerar_chave_cache(self, caminho_arquivo: str) -> str:
+        """
+        Chave do cache: conteúdo do arquivo + versão do parser + opções que
+        alteram o resultado (CONFIG_CHAVE_CACHE)
+        """
+        config_resultado = {chave: self.config[chave] for chave in CONFIG_CHAVE_CACHE}
+        return self._obter_cache().gerar_chave(caminho_arquivo, VERSAO_PARSER, config_resultado)
+    
+    def _guardar_cache(self, chave_cache: str, dados: Dict[str, Any]):
+        """
+        Guarda o resultado no cache; falhas não interrompem o processamento
+        """
+        try:
+            self._obter_cache().guardar(chave_cache, dados, default=serializar_registro)
+            self.logger.info("💾 Resultado guardado no cache")
+        except Exception as e:
+            self.logger.warning(f"⚠️  Não foi possível guardar no cache: {str(e)}")
+    
+    def _restaurar_cache(self, dados: Dict[str, Any]):
+        """
+        Desfaz as conversões do JSON do cache: registros compactos voltam de
+        dict e os valores do índice de UserValues voltam a ser tuplas
+        """
+        if self.config['registros_compactos']:
+            dados['itens'] = [ItemCompacto.de_dict(item) for item in dados['itens']]
+            dados['bom'] = [LinhaBOMCompacta.de_dict(linha) for linha in dados['bom']]
+        
+        if 'indice_user_values' in dados:
+            dados['indice_user_values'] = {titulo: [tuple(valor) for valor in valores]
+                                           for titulo, valores in dados['indice_user_values'].items()}
+    
+    def invalidar_cache(self, caminho_arquivo: str = None) -> int:
+        """
+        Remove do cache o resultado de um arquivo ou, sem argumento, todo o cache
+        
+        Returns:
+            Número de entradas removidas
+        """
+        cache = self._obter_cache()
+        
+        if caminho_arquivo is None:
+            removidas = cache.invalidar()
+        else:
+            removidas = cache.invalidar(self._gerar_chave_cache(caminho_arquivo))
+        
+        self.logger.info(f"🧹 Cache invalidado: {removidas} entrada(s) removida(s)")
+        return removidas
+    
+    def _usar_modo_fatiado(self, caminho_arquivo: str) -> bool:
+        """
+        Decide se um único arquivo deve ser dividido entre vários processos
+        """
+        if self.config['processos_por_arquivo'] <= 1:
+            return False
+        
+        tamanho_mb = os.path.getsize(caminho_arquivo) / (1024 * 1024)
+        return tamanho_mb >= self.config['tamanho_min_fatiamento_mb']
+    
+    def _usar_modo_streaming(self, caminho_arquivo: str) -> bool:
+        """
+        Decide se o arquivo deve ser processado em modo streaming
+        """
+        if self.config['modo_streaming'] is not None:
+            return bool(self.config['modo_streaming'])
+        
+        tamanho_mb = os.path.getsize(caminho_arquivo) / (1024 * 1024)
+        return tamanho_mb > self.config['max_tamanho_arquivo_mb']
+    
+    def _nome_motor(self) -> str:
+        """
+        Motor que lê o XML nos modos streaming e fatias, para o log
+        """
+        if self.config['motor_expat']:
+            return 'expat'
+        return obter_backend(self.config['backend_xml']).nome
+    
+    def _medir_fase(self, nome: str):
+        """
+        Mede tempo e memória de uma fase do arquivo em processamento (ver MedidorFases)
+        """
+        if self._medidor is None:
+            return nullcontext()
+        return self._medidor.fase(nome)
+    
+    @staticmethod
+    def _elementos_por_fase(dados: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Quantidade tratada em cada fase, base da vazão em elementos/s: elementos
+        XML no parsing e registros gerados nas demais fases
+        """
+        total_registros = len(dados['itens']) + len(dados['bom']) + len(dados['relacionamentos'])
+        return {
+            'parsing': dados['metadados']['xml']['total_elementos'],
+            'itens': len(dados['itens']),
+            'bom': len(dados['bom']),
+            'relacionamentos': len(dados['relacionamentos']),
+            'arvore': len(dados['arvore_ocorrencias']) if 'arvore_ocorrencias' in dados else None,
+            'serializacao': total_registros
+        }
+    
+    def _registrar_tempos_log(self, tempos: Dict[str, Any]):
+        """
+        Registra no log a duração e a vazão de cada fase
+        """
+        for fase, medicao in tempos.items():
+            texto = f"   ⏱️  {fase}: {medicao['segundos'] * 1000:.1f} ms"
+            if medicao['elementos_por_segundo'] is not None:
+                texto += f" ({medicao['elementos']} elementos, {medicao['elementos_por_segundo']:,.0f}/s)"
+            self.logger.info(texto)
+    
+    def _registrar_memoria_log(self, memoria: Dict[str, Any]):
+        """
+        Registra no log a memória de cada fase
+        """
+        for fase, medicao in memoria['fases'].items():
+            rss = medicao['rss_pico_mb']
+            if rss is None:
+                texto = f"   🧠 {fase}: RSS indisponível"
+            else:
+                texto = f"   🧠 {fase}: RSS pico {rss:.1f} MB"
+                if medicao['rss_delta_mb'] is not None:
+                    texto += f" (variação {medicao['rss_delta_mb']:+.1f} MB)"
+            if 'tracemalloc_pico_mb' in medicao:
+                texto += (f", alocado pico {medicao['tracemalloc_pico_mb']:.1f} MB"
+                          f" (retido {medicao['tracemalloc_retido_mb']:+.1f} MB)")
+            self.logger.info(texto)
+    
+    def _detectar_encoding(self, arquivo) -> tuple:
+        """
+        Detecta o encoding pelos primeiros bytes do arquivo, sem consumi-los
+        
+        BOM e declaração XML são tratados pelo próprio expat; só é necessário
+        forçar um encoding quando o documento não declara nenhum e a amostra
+        não é UTF-8 válido.
+        
+        Args:
+            arquivo: Arquivo binário aberto com buffer de TAMANHO_AMOSTRA_ENCODING
+        
+        Returns:
+            Tupla (encoding a forçar no XMLParser ou None, descrição para o log)
+        """
+        if self._encoding_recuperacao:
+            return self._encoding_recuperacao, f"{self._encoding_recuperacao} (UTF-8 inválido)"
+        
+        amostra = arquivo.peek(TAMANHO_AMOSTRA_ENCODING)[:TAMANHO_AMOSTRA_ENCODING]
+        
+        if amostra.startswith(codecs.BOM_UTF8):
+            return None, 'utf-8 (BOM)'
+        if amostra.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return None, 'utf-16 (BOM)'
+        if amostra.startswith(b'<\x00?\x00'):
+            return 'utf-16-le', 'utf-16-le (sem BOM)'
+        if amostra.startswith(b'\x00<\x00?'):
+            return 'utf-16-be', 'utf-16-be (sem BOM)'
+        
+        declaracao = _RE_DECLARACAO_ENCODING.match(amostra)
+        if declaracao:
+            return None, declaracao.group(1).decode('ascii').lower()
+        
+        # Sem declaração o padrão XML é UTF-8; o decoder incremental tolera
+        # um caractere multibyte cortado no fim da amostra
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(amostra, final=False)
+            return None, 'utf-8'
+        except UnicodeDecodeError:
+            return 'iso-8859-1', 'iso-8859-1 (detectado)'
+    
     def _parsear_xml_avancado(self, caminho_arquivo: str) -> Optional[Dict[str, Any]]:
         """
         Parsing avançado do XML
@@ -137,112 +585,395 @@ class PLMXMLParserAvancado:
         self.logger.info("🔍 Iniciando parsing XML avançado...")
         
         try:
-            # Tenta diferentes encodings
-            encodings = ['utf-8', 'utf-16', 'latin-1', 'cp1252']
-            
-            tree = None
-            encoding_usado = None
+            backend = obter_backend(self.config['backend_xml'])
             
-            for encoding in encodings:
-                try:
-                    with open(caminho_arquivo, 'r', encoding=encoding) as f:
-                        conteudo = f.read()
+            # Bytes vão direto para o parser XML, que respeita BOM e declaração;
+            # o arquivo é lido uma única vez
+            with open(caminho_arquivo, 'rb', buffering=TAMANHO_AMOSTRA_ENCODING) as f:
+                with self._medir_fase('leitura'):
+                    encoding_forcado, encoding_usado = self._detectar_encoding(f)
+                
+                with self._medir_fase('parsing'):
+                    root = backend.parse(f, encoding_forcado).getroot()
+                    self._prazo.verificar('parsing')
                     
-                    tree = ET.fromstring(conteudo)
-                    encoding_usado = encoding
-                    break
+                    self.logger.info(f"✅ XML parseado com sucesso (encoding: {encoding_usado}, backend: {backend.nome})")
+                    self.logger.info(f"📊 Elemento raiz: {root.tag}")
                     
-                except (UnicodeDecodeError, ET.ParseError):
-                    continue
-            
-            if tree is None:
-                # Tenta parsing direto
-                tree = ET.parse(caminho_arquivo)
-                root = tree.getroot()
-            else:
-                root = tree
-            
-            self.logger.info(f"✅ XML parseado com sucesso (encoding: {encoding_usado})")
-            self.logger.info(f"📊 Elemento raiz: {root.tag}")
+                    # Uma única travessia alimenta todos os extratores
+                    roteados = self._rotear_elementos(root)
+                    
+                    acumulador = self._coletar_metadados_arvore(root)
             
-            # Extrai informações completas
+            # Extrai informações completas (as listas são preenchidas fase a fase)
             dados = {
-                'metadados': self._extrair_metadados_avancados(root, caminho_arquivo),
-                'itens': self._extrair_itens_avancados(root),
-                'bom': self._extrair_bom_avancado(root),
-                'relacionamentos': self._extrair_relacionamentos(root),
+                'metadados': self._montar_metadados_acumulados(acumulador, caminho_arquivo),
+                'itens': [],
+                'bom': [],
+                'relacionamentos': [],
                 'namespaces': self._extrair_namespaces_avancados(root),
-                'aplicacao': self._extrair_info_aplicacao(root)
+                'aplicacao': acumulador['aplicacao'] or {}
             }
+            self._registrar_indice_user_values(dados, acumulador['user_values'])
+            
+            with self._medir_fase('itens'):
+                dados['itens'] = self._extrair_itens_avancados(root, roteados['itens'])
+                self._indexar_ids(dados, roteados['itens']['ElementoComID'])
+            
+            with self._medir_fase('bom'):
+                dados['bom'] = self._extrair_bom_avancado(root, roteados['bom'])
+            
+            with self._medir_fase('relacionamentos'):
+                dados['relacionamentos'] = self._extrair_relacionamentos(root, roteados.get('relacionamentos'))
+            
+            with self._medir_fase('arvore'):
+                self._montar_arvore_ocorrencias(dados, acumulador['transformacoes'])
             
             return dados
             
-        except ET.ParseError as e:
+        except ERROS_PARSING as e:
             self.logger.error(f"❌ Erro de parsing XML: {str(e)}")
             return None
+        except TempoEsgotadoError:
+            raise
         except Exception as e:
             self.logger.error(f"❌ Erro inesperado no parsing: {str(e)}")
             return None
     
-    def _extrair_metadados_avancados(self, root: ET.Element, caminho_arquivo: str) -> Dict[str, Any]:
-        """
-        Extrai metadados avançados
-        """
-        metadados = {
-            'arquivo': {
-                'nome': os.path.basename(caminho_arquivo),
-                'caminho_completo': os.path.abspath(caminho_arquivo),
-                'tamanho_bytes': os.path.getsize(caminho_arquivo),
-                'tamanho_mb': os.path.getsize(caminho_arquivo) / (1024 * 1024),
-                'data_modificacao': datetime.fromtimestamp(
-                    os.path.getmtime(caminho_arquivo)
-                ).isoformat(),
-                'data_criacao': datetime.fromtimestamp(
-                    os.path.getctime(caminho_arquivo)
-                ).isoformat()
-            },
-            'xml': {
-                'elemento_raiz': root.tag,
-                'total_elementos': len(list(root.iter())),
-                'profundidade_maxima': self._calcular_profundidade_maxima(root),
-                'data_processamento': datetime.now().isoformat()
-            },
-            'estrutura': {
-                'tipos_elementos': self._contar_tipos_elementos(root),
-                'atributos_unicos': self._extrair_atributos_unicos(root)
+    def _coletar_metadados_arvore(self, root: ET.Element) -> Dict[str, Any]:
+        """
+        Coleta em uma única travessia iterativa (sem recursão) a contagem de
+        elementos, profundidade máxima, histogramas de tags e atributos, a
+        informação da aplicação e o índice de UserValues
+        """
+        acumulador = self._novo_acumulador_metadados()
+        
+        verificar_prazo = self._prazo.verificar
+        tag_user_data = '{' + self.namespace['plm'] + '}UserData'
+        tag_transform = '{' + self.namespace['plm'] + '}Transform' if self.config['extrair_transformacoes'] else None
+        
+        # Pilha explícita em pré-ordem: mesma ordem de root.iter()
+        pilha = [(root, 0, None)]
+        while pilha:
+            verificar_prazo('parsing')
+            elem, profundidade, pai = pilha.pop()
+            self._acumular_metadados(acumulador, elem, profundidade)
+            if elem.tag == tag_user_data:
+                self._acumular_user_values(acumulador, elem, pai)
+            elif elem.tag == tag_transform and pai is not None:
+                acumulador['transformacoes'][pai.get('id')] = elem.text or ''
+            if len(elem):
+                pilha.extend((filho, profundidade + 1, elem) for filho in reversed(elem))
+        
+        return acumulador
+    
+    def _extrair_metadados_arquivo(self, caminho_arquivo: str) -> Dict[str, Any]:
+        """
+        Extrai metadados do arquivo em disco
+        """
+        return {
+            'nome': os.path.basename(caminho_arquivo),
+            'caminho_completo': os.path.abspath(caminho_arquivo),
+            'tamanho_bytes': os.path.getsize(caminho_arquivo),
+            'tamanho_mb': os.path.getsize(caminho_arquivo) / (1024 * 1024),
+            'data_modificacao': datetime.fromtimestamp(
+                os.path.getmtime(caminho_arquivo)
+            ).isoformat(),
+            'data_criacao': datetime.fromtimestamp(
+                os.path.getctime(caminho_arquivo)
+            ).isoformat()
+        }
+    
+    def _tabela_roteamento(self):
+        """
+        Monta as tabelas de roteamento dos padrões de busca
+        
+        Returns:
+            Tupla (grupos, por_tag, por_atributo, exclusivos): padrões ativos
+            por grupo, destinos (grupo, tipo_busca) indexados pela tag local,
+            lista de destinos (atributo, grupo, tipo_busca) que dependem de
+            atributo e padrões (tag, atributo, grupo, tipo_busca) em que cada
+            elemento entra apenas no primeiro que o aceita
+        """
+        grupos = {'itens': PADROES_ITEM, 'bom': PADROES_BOM}
+        if self.config['incluir_relacionamentos']:
+            grupos['relacionamentos'] = PADROES_RELACAO
+        
+        # Uma Occurrence com parentRef e instancedRef casa com três padrões de
+        # BOM; com remover_duplicatas ela gera uma única linha
+        grupos_exclusivos = ('bom',) if self.config['remover_duplicatas'] else ()
+        
+        por_tag = {}
+        por_atributo = []
+        exclusivos = []
+        
+        for grupo, padroes in grupos.items():
+            for tipo_busca, tag, atributo in padroes:
+                if grupo in grupos_exclusivos:
+                    exclusivos.append((tag, atributo, grupo, tipo_busca))
+                elif tag is not None:
+                    por_tag.setdefault(tag, []).append((grupo, tipo_busca))
+                else:
+                    por_atributo.append((atributo, grupo, tipo_busca))
+        
+        return grupos, por_tag, por_atributo, exclusivos
+    
+    @staticmethod
+    def _casar_exclusivos(exclusivos: List[tuple], tag_local: str, attrib) -> tuple:
+        """
+        Encontra o primeiro padrão exclusivo que aceita o elemento
+        
+        Returns:
+            Tupla ((grupo, tipo_busca) ou None, casamentos descartados)
+        """
+        primeiro = None
+        descartados = 0
+        
+        for tag, atributo, grupo, tipo_busca in exclusivos:
+            if tag is not None and tag != tag_local:
+                continue
+            if atributo is not None and atributo not in attrib:
+                continue
+            if primeiro is None:
+                primeiro = (grupo, tipo_busca)
+            else:
+                descartados += 1
+        
+        return primeiro, descartados
+    
+    def _rotear_elementos(self, root: ET.Element) -> Dict[str, Dict[str, List[ET.Element]]]:
+        """
+        Percorre a árvore uma única vez e distribui cada elemento para os
+        padrões de busca de itens, BOM e relacionamentos que o aceitam.
+
+        Equivale aos antigos ``root.findall('.//plm:...')`` de cada padrão,
+        preservando a ordem do documento dentro de cada padrão.
+        """
+        prefixo_ns = '{' + self.namespace['plm'] + '}'
+        grupos, por_tag, por_atributo, exclusivos = self._tabela_roteamento()
+        casar_exclusivos = self._casar_exclusivos
+        self.duplicatas_bom_removidas = 0
+        
+        roteados = {
+            grupo: {tipo_busca: [] for tipo_busca, _, _ in padroes}
+            for grupo, padroes in grupos.items()
+        }
+        destinos_por_tag = {
+            tag: [roteados[grupo][tipo_busca] for grupo, tipo_busca in destinos]
+            for tag, destinos in por_tag.items()
+        }
+        destinos_por_atributo = [
+            (atributo, roteados[grupo][tipo_busca])
+            for atributo, grupo, tipo_busca in por_atributo
+        ]
+        
+        verificar_prazo = self._prazo.verificar
+        
+        iterador = root.iter()
+        next(iterador)  # './/' não inclui o próprio elemento raiz
+        
+        for elem in iterador:
+            verificar_prazo('parsing')
+            tag = elem.tag
+            if not isinstance(tag, str) or not tag.startswith(prefixo_ns):
+                continue
+            
+            tag_local = tag[len(prefixo_ns):]
+            for destino in destinos_por_tag.get(tag_local, ()):
+                destino.append(elem)
+            
+            attrib = elem.attrib
+            if attrib:
+                for atributo, destino in destinos_por_atributo:
+                    if atributo in attrib:
+                        destino.append(elem)
+            
+            if exclusivos:
+                primeiro, descartados = casar_exclusivos(exclusivos, tag_local, attrib)
+                if primeiro is not None:
+                    grupo, tipo_busca = primeiro
+                    roteados[grupo][tipo_busca].append(elem)
+                    self.duplicatas_bom_removidas += descartados
+        
+        return roteados
+    
+    def _criar_roteador(self):
+        """
+        Prepara o roteamento elemento a elemento dos modos que criam os
+        registros durante o parsing (streaming, fatias e motor expat)
+        
+        Returns:
+            Tupla (grupos, rotear): padrões ativos por grupo e a função
+            rotear(tag_local, attrib) -> [(grupo, tipo_busca)] com os destinos
+            do elemento, na ordem de _rotear_elementos. Os casamentos de BOM
+            descartados são somados em self.duplicatas_bom_removidas.
+        """
+        grupos, por_tag, por_atributo, exclusivos = self._tabela_roteamento()
+        casar_exclusivos = self._casar_exclusivos
+        tags_item = {tag for _, tag, _ in PADROES_ITEM if tag is not None}
+        remover_duplicatas = self.config['remover_duplicatas']
+        self.duplicatas_bom_removidas = 0
+        
+        def rotear(tag_local: str, attrib) -> List[tuple]:
+            destinos = list(por_tag.get(tag_local, ()))
+            
+            if attrib:
+                for atributo, grupo, tipo_busca in por_atributo:
+                    if atributo not in attrib:
+                        continue
+                    # Já registrado pela busca por tag; seria descartado na deduplicação
+                    if grupo == 'itens' and tag_local in tags_item and remover_duplicatas:
+                        continue
+                    destinos.append((grupo, tipo_busca))
+            
+            if exclusivos:
+                primeiro, descartados = casar_exclusivos(exclusivos, tag_local, attrib)
+                if primeiro is not None:
+                    destinos.append(primeiro)
+                    self.duplicatas_bom_removidas += descartados
+            
+            return destinos
+        
+        return grupos, rotear
+    
+    def _construtores_registros(self) -> Dict[str, Any]:
+        """
+        Funções que montam o registro de cada grupo a partir do elemento
+        """
+        return {
+            'itens': self._criar_item,
+            'bom': self._criar_linha_bom,
+            'relacionamentos': self._criar_relacao
+        }
+    
+    def _criar_item(self, elem: ET.Element, tipo_busca: str,
+                    id_elemento: Optional[str], posicao: Optional[int]) -> Dict[str, Any]:
+        """
+        Monta o registro de um item a partir do elemento
+        """
+        # Propriedades filhas (se habilitado)
+        propriedades = {}
+        if self.config['incluir_propriedades_detalhadas']:
+            for child in elem:
+                if any(palavra in child.tag.lower() for palavra in ['property', 'prop', 'attribute', 'attr', 'uservalue']):
+                    nome_prop = child.get('title', child.get('name', child.get('propertyName', child.tag)))
+                    valor_prop = child.get('value', child.get('propertyValue', child.text or 'N/A'))
+                    propriedades[nome_prop] = valor_prop
+        
+        total_filhos = len(elem)
+        tipo_elemento = elem.tag.replace('{http://www.plmxml.org/Schemas/PLMXMLSchema}', '')
+        nome = elem.get('name', elem.get('itemId', 'N/A'))
+        
+        if self.config['registros_compactos']:
+            return ItemCompacto(id_elemento, nome, tipo_elemento, tipo_busca,
+                                achatar_atributos(elem.attrib), achatar_atributos(propriedades),
+                                posicao, total_filhos)
+        
+        return {
+            'id': id_elemento,
+            'nome': nome,
+            'tipo_elemento': tipo_elemento,
+            'tipo_busca': tipo_busca,
+            'atributos_basicos': dict(elem.attrib),
+            'propriedades': propriedades,
+            'relacionamentos': [],
+            'metadados': {
+                'posicao': posicao,
+                'tem_filhos': total_filhos > 0,
+                'total_filhos': total_filhos,
+                'tem_atributos': len(elem.attrib) > 0
+            }
+        }
+    
+    def _criar_linha_bom(self, elem: ET.Element, tipo_busca: str,
+                         id_linha: Optional[str], posicao: Optional[int]) -> Dict[str, Any]:
+        """
+        Monta o registro de uma linha BOM a partir do elemento
+        """
+        # Propriedades filhas
+        propriedades = {}
+        if self.config['incluir_propriedades_detalhadas']:
+            for child in elem:
+                if any(palavra in child.tag.lower() for palavra in ['property', 'prop']):
+                    nome_prop = child.get('name', child.tag)
+                    valor_prop = child.get('value', child.text or 'N/A')
+                    propriedades[nome_prop] = valor_prop
+        
+        total_filhos = len(elem)
+        tipo_elemento = elem.tag.replace('{http://www.plmxml.org/Schemas/PLMXMLSchema}', '')
+        
+        if self.config['registros_compactos']:
+            # pai, filho, quantidade e find_number são derivados dos atributos
+            return LinhaBOMCompacta(id_linha, tipo_elemento, tipo_busca,
+                                    achatar_atributos(elem.attrib), achatar_atributos(propriedades),
+                                    posicao, total_filhos)
+        
+        return {
+            'id': id_linha,
+            'pai': elem.get('parentRef', elem.get('partOf', 'N/A')),
+            'filho': elem.get('instancedRef', elem.get('ref', 'N/A')),
+            'quantidade': elem.get('quantity', '1'),
+            'find_number': elem.get('findNumber', 'N/A'),
+            'tipo_elemento': tipo_elemento,
+            'tipo_busca': tipo_busca,
+            'atributos': dict(elem.attrib),
+            'propriedades': propriedades,
+            'metadados': {
+                'posicao': posicao,
+                'tem_filhos': total_filhos > 0,
+                'total_filhos': total_filhos,
+                'tem_atributos': len(elem.attrib) > 0
             }
         }
+    
+    def _criar_relacao(self, elem: ET.Element, tipo_busca: str,
+                       id_relacao: Optional[str], posicao: Optional[int]) -> Dict[str, Any]:
+        """
+        Monta o registro de um relacionamento a partir do elemento
+        """
+        relacao = {
+            'id': id_relacao,
+            'tipo': elem.get('subType', elem.tag),
+            'elementos_relacionados': elem.get('relatedRefs', ''),
+            'atributos': {},
+            'metadados': {}
+        }
+        
+        # Atributos
+        for attr, valor in elem.attrib.items():
+            relacao['atributos'][attr] = valor
+        
+        # Metadados
+        relacao['metadados'] = {
+            'posicao': posicao,
+            'tem_filhos': len(elem) > 0
+        }
         
-        return metadados
+        return relacao
     
-    def _extrair_itens_avancados(self, root: ET.Element) -> List[Dict[str, Any]]:
+    def _extrair_itens_avancados(self, root: ET.Element,
+                                 roteados: Dict[str, List[ET.Element]] = None) -> List[Dict[str, Any]]:
         """
         Extrai itens com informações avançadas
         """
         self.logger.info("🔍 Extraindo itens avançados...")
         
+        if roteados is None:
+            roteados = self._rotear_elementos(root)['itens']
+        
         itens = []
         ids_processados = set()
         
-        # Padrões de busca mais abrangentes
-        padroes_item = [
-            ('.//plm:ProductRevision', 'ProductRevision'),
-            ('.//plm:Product', 'Product'),
-            ('.//plm:Part', 'Part'),
-            ('.//plm:Item', 'Item'),
-            ('.//plm:Design', 'Design'),
-            ('.//plm:DesignRevision', 'DesignRevision'),
-            ('.//plm:*[@id]', 'ElementoComID')  # Qualquer elemento com ID
-        ]
-        
-        for xpath, tipo_busca in padroes_item:
+        for tipo_busca, _, _ in PADROES_ITEM:
             try:
-                elementos = root.findall(xpath, self.namespace)
+                elementos = roteados.get(tipo_busca, [])
                 
                 if self.modo_verbose:
                     self.logger.info(f"   🔍 Busca '{tipo_busca}': {len(elementos)} elementos encontrados")
                 
                 for elem in elementos:
+                    self._prazo.verificar('itens')
+                    
                     # Cria ID único para evitar duplicatas
                     id_elemento = elem.get('id', elem.get('itemId', f"{elem.tag}_{len(itens)}"))
                     
@@ -250,40 +981,10 @@ class PLMXMLParserAvancado:
                         continue
                     
                     ids_processados.add(id_elemento)
+                    itens.append(self._criar_item(elem, tipo_busca, id_elemento, len(itens)))
                     
-                    item = {
-                        'id': id_elemento,
-                        'nome': elem.get('name', elem.get('itemId', 'N/A')),
-                        'tipo_elemento': elem.tag.replace('{http://www.plmxml.org/Schemas/PLMXMLSchema}', ''),
-                        'tipo_busca': tipo_busca,
-                        'atributos_basicos': {},
-                        'propriedades': {},
-                        'relacionamentos': [],
-                        'metadados': {}
-                    }
-                    
-                    # Atributos básicos
-                    for attr, valor in elem.attrib.items():
-                        item['atributos_basicos'][attr] = valor
-                    
-                    # Propriedades filhas (se habilitado)
-                    if self.config['incluir_propriedades_detalhadas']:
-                        for child in elem:
-                            if any(palavra in child.tag.lower() for palavra in ['property', 'prop', 'attribute', 'attr', 'uservalue']):
-                                nome_prop = child.get('title', child.get('name', child.get('propertyName', child.tag)))
-                                valor_prop = child.get('value', child.get('propertyValue', child.text or 'N/A'))
-                                item['propriedades'][nome_prop] = valor_prop
-                    
-                    # Metadados do elemento
-                    item['metadados'] = {
-                        'posicao': len(itens),
-                        'tem_filhos': len(list(elem)) > 0,
-                        'total_filhos': len(list(elem)),
-                        'tem_atributos': len(elem.attrib) > 0
-                    }
-                    
-                    itens.append(item)
-                    
+            except TempoEsgotadoError:
+                raise
             except Exception as e:
                 self.logger.warning(f"⚠️  Erro ao processar elementos '{tipo_busca}': {str(e)}")
                 continue
@@ -291,68 +992,32 @@ class PLMXMLParserAvancado:
         self.logger.info(f"✅ Total de itens únicos extraídos: {len(itens)}")
         return itens
     
-    def _extrair_bom_avancado(self, root: ET.Element) -> List[Dict[str, Any]]:
+    def _extrair_bom_avancado(self, root: ET.Element,
+                              roteados: Dict[str, List[ET.Element]] = None) -> List[Dict[str, Any]]:
         """
         Extrai estrutura BOM com informações avançadas
         """
         self.logger.info("🔍 Extraindo estrutura BOM avançada...")
         
-        linhas_bom = []
+        if roteados is None:
+            roteados = self._rotear_elementos(root)['bom']
         
-        # Padrões para relações BOM
-        padroes_bom = [
-            ('.//plm:ProductInstance', 'ProductInstance'),
-            ('.//plm:PartInstance', 'PartInstance'),
-            ('.//plm:BOMLine', 'BOMLine'),
-            ('.//plm:Instance', 'Instance'),
-            ('.//plm:Occurrence', 'Occurrence'),
-            ('.//plm:*[@parentRef]', 'RelacaoPai'),
-            ('.//plm:*[@instancedRef]', 'RelacaoFilho')
-        ]
+        linhas_bom = []
         
-        for xpath, tipo_busca in padroes_bom:
+        for tipo_busca, _, _ in PADROES_BOM:
             try:
-                elementos = root.findall(xpath, self.namespace)
+                elementos = roteados.get(tipo_busca, [])
                 
                 if self.modo_verbose:
                     self.logger.info(f"   🔍 Busca BOM '{tipo_busca}': {len(elementos)} elementos encontrados")
                 
                 for elem in elementos:
-                    linha = {
-                        'id': elem.get('id', f"bom_{len(linhas_bom)}"),
-                        'pai': elem.get('parentRef', elem.get('partOf', 'N/A')),
-                        'filho': elem.get('instancedRef', elem.get('ref', 'N/A')),
-                        'quantidade': elem.get('quantity', '1'),
-                        'find_number': elem.get('findNumber', 'N/A'),
-                        'tipo_elemento': elem.tag.replace('{http://www.plmxml.org/Schemas/PLMXMLSchema}', ''),
-                        'tipo_busca': tipo_busca,
-                        'atributos': {},
-                        'propriedades': {},
-                        'metadados': {}
-                    }
-                    
-                    # Todos os atributos
-                    for attr, valor in elem.attrib.items():
-                        linha['atributos'][attr] = valor
-                    
-                    # Propriedades filhas
-                    if self.config['incluir_propriedades_detalhadas']:
-                        for child in elem:
-                            if any(palavra in child.tag.lower() for palavra in ['property', 'prop']):
-                                nome_prop = child.get('name', child.tag)
-                                valor_prop = child.get('value', child.text or 'N/A')
-                                linha['propriedades'][nome_prop] = valor_prop
-                    
-                    # Metadados da linha BOM
-                    linha['metadados'] = {
-                        'posicao': len(linhas_bom),
-                        'tem_filhos': len(list(elem)) > 0,
-                        'total_filhos': len(list(elem)),
-                        'tem_atributos': len(elem.attrib) > 0
-                    }
-                    
-                    linhas_bom.append(linha)
+                    self._prazo.verificar('BOM')
+                    id_linha = elem.get('id', f"bom_{len(linhas_bom)}")
+                    linhas_bom.append(self._criar_linha_bom(elem, tipo_busca, id_linha, len(linhas_bom)))
                     
+            except TempoEsgotadoError:
+                raise
             except Exception as e:
                 self.logger.warning(f"⚠️  Erro ao processar BOM '{tipo_busca}': {str(e)}")
                 continue
@@ -360,7 +1025,8 @@ class PLMXMLParserAvancado:
         self.logger.info(f"✅ Total de linhas BOM extraídas: {len(linhas_bom)}")
         return linhas_bom
     
-    def _extrair_relacionamentos(self, root: ET.Element) -> List[Dict[str, Any]]:
+    def _extrair_relacionamentos(self, root: ET.Element,
+                                 roteados: Dict[str, List[ET.Element]] = None) -> List[Dict[str, Any]]:
         """
         Extrai relacionamentos entre elementos
         """
@@ -369,40 +1035,22 @@ class PLMXMLParserAvancado:
         
         self.logger.info("🔍 Extraindo relacionamentos...")
         
-        relacionamentos = []
+        if roteados is None:
+            roteados = self._rotear_elementos(root)['relacionamentos']
         
-        # Procura por elementos de relacionamento
-        padroes_relacao = [
-            './/plm:GeneralRelation',
-            './/plm:Relation',
-            './/plm:*[@relatedRefs]'
-        ]
+        relacionamentos = []
         
-        for xpath in padroes_relacao:
+        for tipo_busca, _, _ in PADROES_RELACAO:
             try:
-                elementos = root.findall(xpath, self.namespace)
+                elementos = roteados.get(tipo_busca, [])
                 
                 for elem in elementos:
-                    relacao = {
-                        'id': elem.get('id', f"rel_{len(relacionamentos)}"),
-                        'tipo': elem.get('subType', elem.tag),
-                        'elementos_relacionados': elem.get('relatedRefs', ''),
-                        'atributos': {},
-                        'metadados': {}
-                    }
-                    
-                    # Atributos
-                    for attr, valor in elem.attrib.items():
-                        relacao['atributos'][attr] = valor
-                    
-                    # Metadados
-                    relacao['metadados'] = {
-                        'posicao': len(relacionamentos),
-                        'tem_filhos': len(list(elem)) > 0
-                    }
-                    
-                    relacionamentos.append(relacao)
+                    self._prazo.verificar('relacionamentos')
+                    id_relacao = elem.get('id', f"rel_{len(relacionamentos)}")
+                    relacionamentos.append(self._criar_relacao(elem, tipo_busca, id_relacao, len(relacionamentos)))
                     
+            except TempoEsgotadoError:
+                raise
             except Exception as e:
                 self.logger.warning(f"⚠️  Erro ao processar relacionamentos: {str(e)}")
                 continue
@@ -410,99 +1058,552 @@ class PLMXMLParserAvancado:
         self.logger.info(f"✅ Total de relacionamentos extraídos: {len(relacionamentos)}")
         return relacionamentos
     
-    def _extrair_namespaces_avancados(self, root: ET.Element) -> Dict[str, str]:
-        """
-        Extrai namespaces do XML
+    def _parsear_xml_streaming(self, caminho_arquivo: str) -> Optional[Dict[str, Any]]:
         """
-        namespaces = {}
+        Parsing incremental com iterparse para arquivos maiores que a memória
         
-        # Namespaces no elemento raiz
-        for prefixo, uri in root.attrib.items():
-            if prefixo.startswith('xmlns'):
-                if ':' in prefixo:
-                    nome_ns = prefixo.split(':')[1]
-                else:
-                    nome_ns = 'default'
-                namespaces[nome_ns] = uri
+        Cada elemento vira registro no seu evento 'end' e em seguida perde os
+        filhos, que já foram consumidos. Assim a memória fica limitada aos
+        elementos abertos (e seus filhos diretos), não ao tamanho do arquivo.
+        O resultado tem a mesma estrutura de _parsear_xml_avancado.
+        """
+        self.logger.info("🌊 Iniciando parsing XML em modo streaming...")
         
-        return namespaces
+        try:
+            with open(caminho_arquivo, 'rb', buffering=TAMANHO_AMOSTRA_ENCODING) as arquivo:
+                with self._medir_fase('leitura'):
+                    encoding_forcado, encoding_usado = self._detectar_encoding(arquivo)
+                self.logger.info(f"🔤 Encoding: {encoding_usado} (backend: {self._nome_motor()})")
+                
+                # Os registros são criados durante o parsing; as fases de itens,
+                # BOM e relacionamentos medem apenas a consolidação
+                with self._medir_fase('parsing'):
+                    registros, acumulador, root = self._coletar_registros_streaming(arquivo, encoding_forcado)
+            
+            self.logger.info(f"✅ XML parseado em modo streaming ({acumulador['total_elementos']} elementos)")
+            self.logger.info(f"📊 Elemento raiz: {root.tag}")
+            
+            dados = self._consolidar_streaming(caminho_arquivo, registros, acumulador,
+                                               self._extrair_namespaces_avancados(root))
+            
+            self.logger.info(f"✅ Streaming: {len(dados['itens'])} itens, {len(dados['bom'])} linhas BOM, "
+                             f"{len(dados['relacionamentos'])} relacionamentos")
+            return dados
+            
+        except ERROS_PARSING as e:
+            self.logger.error(f"❌ Erro de parsing XML (streaming): {str(e)}")
+            return None
+        except TempoEsgotadoError:
+            raise
+        except Exception as e:
+            self.logger.error(f"❌ Erro inesperado no parsing streaming: {str(e)}")
+            return None
     
-    def _extrair_info_aplicacao(self, root: ET.Element) -> Dict[str, Any]:
+    def _coletar_registros_streaming(self, arquivo, encoding_forcado: Optional[str]) -> tuple:
         """
-        Extrai informações da aplicação (Teamcenter)
+        Percorre o documento com iterparse (ou com o expat, se motor_expat)
+        criando os registros de cada padrão de busca, na ordem do documento,
+        ainda sem IDs ausentes e posições
+        
+        Args:
+            arquivo: Arquivo binário (o original ou uma fatia, ver LeitorFatia)
+            encoding_forcado: Encoding a forçar no parser XML (ver _detectar_encoding)
+        
+        Returns:
+            Tupla (registros por grupo e tipo de busca, acumulador de metadados, raiz)
         """
-        info_aplicacao = {}
+        if self.config['motor_expat']:
+            return ColetorExpat(self).coletar(arquivo, encoding_forcado)
+        
+        prefixo_ns = '{' + self.namespace['plm'] + '}'
+        grupos, rotear = self._criar_roteador()
+        construtores = self._construtores_registros()
+        tag_user_data = prefixo_ns + 'UserData'
+        tag_transform = prefixo_ns + 'Transform' if self.config['extrair_transformacoes'] else None
+        
+        registros = {
+            grupo: {tipo_busca: [] for tipo_busca, _, _ in padroes}
+            for grupo, padroes in grupos.items()
+        }
+        acumulador = self._novo_acumulador_metadados()
+        
+        root = None
+        pilha = []
         
-        # Procura por elementos de aplicação
-        for elem in root.iter():
-            if 'Application' in elem.tag:
-                for attr, valor in elem.attrib.items():
-                    info_aplicacao[attr] = valor
+        eventos = obter_backend(self.config['backend_xml']).iterparse(arquivo, ('start', 'end'), encoding_forcado)
+        verificar_prazo = self._prazo.verificar
+        
+        for evento, elem in eventos:
+            verificar_prazo('parsing')
+            
+            if evento == 'start':
+                self._acumular_metadados(acumulador, elem, len(pilha))
+                
+                if root is None:
+                    root = elem
+                    pilha.append((elem, ()))
+                    continue
+                
+                # Tag e atributos já são conhecidos no 'start': reserva as
+                # posições nos padrões para manter a ordem do documento
+                vagas = []
+                tag = elem.tag
+                if tag.startswith(prefixo_ns):
+                    for grupo, tipo_busca in rotear(tag[len(prefixo_ns):], elem.attrib):
+                        lista = registros[grupo][tipo_busca]
+                        vagas.append((grupo, tipo_busca, lista, len(lista)))
+                        lista.append(None)
+                
+                pilha.append((elem, vagas))
+                continue
+            
+            _, vagas = pilha.pop()
+            if elem is root:
                 break
+            
+            # UserValues ainda estão presentes; o dono é o elemento aberto acima
+            if elem.tag == tag_user_data:
+                self._acumular_user_values(acumulador, elem, pilha[-1][0])
+            elif elem.tag == tag_transform:
+                acumulador['transformacoes'][pilha[-1][0].get('id')] = elem.text or ''
+            
+            if vagas:
+                # IDs ausentes e posições são preenchidos na consolidação
+                ids_registro = {
+                    'itens': elem.get('id', elem.get('itemId')),
+                    'bom': elem.get('id'),
+                    'relacionamentos': elem.get('id')
+                }
+                for grupo, tipo_busca, lista, indice in vagas:
+                    lista[indice] = construtores[grupo](elem, tipo_busca, ids_registro[grupo], None)
+            
+            # Os filhos já foram consumidos pelos registros deste elemento
+            del elem[:]
+            if len(pilha) == 1:
+                del root[:]
         
-        return info_aplicacao
+        return registros, acumulador, root
     
-    def _calcular_profundidade_maxima(self, root: ET.Element) -> int:
+    def _consolidar_streaming(self, caminho_arquivo: str, registros: Dict[str, Dict[str, List[Any]]],
+                              acumulador: Dict[str, Any], namespaces: Dict[str, str]) -> Dict[str, Any]:
         """
-        Calcula a profundidade máxima da árvore XML
+        Monta o resultado a partir dos registros coletados em streaming (de
+        um arquivo inteiro ou das fatias já mescladas)
         """
-        def profundidade_recursiva(elem, nivel_atual):
-            max_profundidade = nivel_atual
-            for child in elem:
-                profundidade = profundidade_recursiva(child, nivel_atual + 1)
-                max_profundidade = max(max_profundidade, profundidade)
-            return max_profundidade
+        prefixo_ns = '{' + self.namespace['plm'] + '}'
+        
+        dados = {
+            'metadados': self._montar_metadados_acumulados(acumulador, caminho_arquivo),
+            'itens': [],
+            'bom': [],
+            'relacionamentos': [],
+            'namespaces': namespaces,
+            'aplicacao': acumulador['aplicacao'] or {}
+        }
+        self._registrar_indice_user_values(dados, acumulador['user_values'])
         
-        return profundidade_recursiva(root, 0)
+        with self._medir_fase('itens'):
+            dados['itens'] = self._consolidar_itens_streaming(registros['itens'], prefixo_ns)
+            # Os elementos já foram descartados: só o índice de registros existe
+            self._indexar_ids(dados)
+        
+        with self._medir_fase('bom'):
+            dados['bom'] = self._consolidar_registros_streaming(registros['bom'], PADROES_BOM, 'bom')
+        
+        with self._medir_fase('relacionamentos'):
+            dados['relacionamentos'] = self._consolidar_registros_streaming(
+                registros.get('relacionamentos', {}), PADROES_RELACAO, 'rel')
+        
+        with self._medir_fase('arvore'):
+            self._montar_arvore_ocorrencias(dados, acumulador['transformacoes'])
+        
+        return dados
     
-    def _contar_tipos_elementos(self, root: ET.Element) -> Dict[str, int]:
+    def _parsear_xml_fatiado(self, caminho_arquivo: str) -> Optional[Dict[str, Any]]:
         """
-        Conta tipos de elementos no XML
+        Parsing de um único arquivo grande em vários processos
+        
+        O arquivo é dividido nas fronteiras entre os filhos da raiz (ver
+        dividir_em_fatias); cada processo coleta os registros da sua fatia com
+        _coletar_registros_streaming e a consolidação, feita aqui sobre as
+        listas concatenadas na ordem das fatias, é a mesma do modo streaming.
+        Se o arquivo não puder ser fatiado, usa o modo streaming; se alguma
+        fatia for inválida, retorna None.
         """
-        tipos = {}
-        for elem in root.iter():
-            tipo = elem.tag.replace('{http://www.plmxml.org/Schemas/PLMXMLSchema}', '')
-            tipos[tipo] = tipos.get(tipo, 0) + 1
-        return tipos
+        processos = self.config['processos_por_arquivo']
+        self.logger.info(f"🧩 Iniciando parsing XML em fatias ({processos} processos)...")
+        
+        try:
+            with self._medir_fase('leitura'):
+                plano = dividir_em_fatias(caminho_arquivo, processos)
+                with open(caminho_arquivo, 'rb', buffering=TAMANHO_AMOSTRA_ENCODING) as arquivo:
+                    encoding_forcado, encoding_usado = self._detectar_encoding(arquivo)
+            
+            if plano is None or len(plano) < 2:
+                self.logger.warning("⚠️  Arquivo não pôde ser dividido nos filhos da raiz - usando modo streaming")
+                return self._parsear_xml_streaming(caminho_arquivo)
+            
+            self.logger.info(f"🔤 Encoding: {encoding_usado} (backend: {self._nome_motor()})")
+            self.logger.info(f"🧩 {len(plano)} fatias: " +
+                             ", ".join(f"{(fim - inicio) / (1024 * 1024):.1f}MB" for inicio, fim in plano.intervalos))
+            
+            with self._medir_fase('parsing'):
+                self._prazo.verificar('parsing')
+                with ProcessPoolExecutor(max_workers=min(processos, len(plano)),
+                                         initializer=_inicializar_worker_fatias,
+                                         initargs=(self.config,)) as executor:
+                    futuros = [
+                        executor.submit(_parsear_fatia_worker, plano, indice, encoding_forcado, self._prazo.restante())
+                        for indice in range(len(plano))
+                    ]
+                    resultados = [futuro.result() for futuro in futuros]
+            
+            if any(resultado is None for resultado in resultados):
+                # Sem repetir o arquivo inteiro em um processo: quem chamou
+                # decide se vale a nova tentativa como latin-1
+                self.logger.error("❌ Fatia com XML inválido")
+                return None
+            
+            registros, acumulador = self._mesclar_fatias(resultados)
+            
+            self.logger.info(f"✅ XML parseado em fatias ({acumulador['total_elementos']} elementos)")
+            self.logger.info(f"📊 Elemento raiz: {acumulador['elemento_raiz']}")
+            
+            dados = self._consolidar_streaming(caminho_arquivo, registros, acumulador, resultados[0]['namespaces'])
+            
+            self.logger.info(f"✅ Fatias: {len(dados['itens'])} itens, {len(dados['bom'])} linhas BOM, "
+                             f"{len(dados['relacionamentos'])} relacionamentos")
+            return dados
+            
+        except TempoEsgotadoError:
+            raise
+        except Exception as e:
+            self.logger.error(f"❌ Erro inesperado no parsing em fatias: {str(e)}")
+            return None
+    
+    def _mesclar_fatias(self, resultados: List[Dict[str, Any]]) -> tuple:
+        """
+        Junta registros e acumuladores das fatias, na ordem do arquivo
+        
+        Cada fatia é um documento com a raiz original, então a raiz e seus
+        atributos foram contados uma vez por fatia e são descontados aqui.
+        
+        Returns:
+            Tupla (registros, acumulador) equivalente à de um único streaming
+        """
+        registros = resultados[0]['registros']
+        acumulador = resultados[0]['acumulador']
+        self.duplicatas_bom_removidas = resultados[0]['duplicatas_bom_removidas']
+        
+        for resultado in resultados[1:]:
+            for grupo, por_tipo in resultado['registros'].items():
+                for tipo_busca, lista in por_tipo.items():
+                    registros[grupo][tipo_busca].extend(lista)
+            
+            parcial = resultado['acumulador']
+            acumulador['total_elementos'] += parcial['total_elementos'] - 1
+            acumulador['profundidade_maxima'] = max(acumulador['profundidade_maxima'], parcial['profundidade_maxima'])
+            for chave in ('tipos_elementos', 'atributos_unicos'):
+                contagens = acumulador[chave]
+                for nome, total in parcial[chave].items():
+                    contagens[nome] = contagens.get(nome, 0) + total
+            if acumulador['aplicacao'] is None:
+                acumulador['aplicacao'] = parcial['aplicacao']
+            for titulo, valores in parcial['user_values'].items():
+                acumulador['user_values'].setdefault(titulo, []).extend(valores)
+            acumulador['transformacoes'].update(parcial['transformacoes'])
+            self.duplicatas_bom_removidas += resultado['duplicatas_bom_removidas']
+        
+        repeticoes_raiz = len(resultados) - 1
+        tipo_raiz = acumulador['elemento_raiz'].replace('{http://www.plmxml.org/Schemas/PLMXMLSchema}', '')
+        acumulador['tipos_elementos'][tipo_raiz] -= repeticoes_raiz
+        for atributo in resultados[0]['atributos_raiz']:
+            acumulador['atributos_unicos'][atributo] -= repeticoes_raiz
+        
+        return registros, acumulador
+    
+    def _consolidar_itens_streaming(self, registros: Dict[str, List[Dict[str, Any]]],
+                                    prefixo_ns: str) -> List[Dict[str, Any]]:
+        """
+        Ordena os itens do modo streaming por padrão de busca e aplica a mesma
+        deduplicação e numeração de _extrair_itens_avancados
+        """
+        itens = []
+        ids_processados = set()
+        
+        for tipo_busca, _, _ in PADROES_ITEM:
+            for item in registros.get(tipo_busca, []):
+                id_elemento = item['id']
+                if id_elemento is None:
+                    id_elemento = f"{prefixo_ns}{item['tipo_elemento']}_{len(itens)}"
+                
+                if id_elemento in ids_processados and self.config['remover_duplicatas']:
+                    continue
+                
+                ids_processados.add(id_elemento)
+                self._definir_id_posicao(item, id_elemento, len(itens))
+                itens.append(item)
+        
+        return itens
     
-    def _extrair_atributos_unicos(self, root: ET.Element) -> Dict[str, int]:
+    def _consolidar_registros_streaming(self, registros: Dict[str, List[Dict[str, Any]]],
+                                        padroes: List[tuple], prefixo_id: str) -> List[Dict[str, Any]]:
         """
-        Extrai atributos únicos e suas frequências
+        Ordena registros de BOM/relacionamentos do modo streaming por padrão
+        de busca e preenche IDs ausentes e posições
         """
-        atributos = {}
-        for elem in root.iter():
-            for attr in elem.attrib:
-                atributos[attr] = atributos.get(attr, 0) + 1
-        return atributos
+        resultado = []
+        
+        for tipo_busca, _, _ in padroes:
+            for registro in registros.get(tipo_busca, []):
+                id_registro = registro['id']
+                if id_registro is None:
+                    id_registro = f"{prefixo_id}_{len(resultado)}"
+                self._definir_id_posicao(registro, id_registro, len(resultado))
+                resultado.append(registro)
+        
+        return resultado
+    
+    @staticmethod
+    def _definir_id_posicao(registro, id_registro: str, posicao: int):
+        """
+        Preenche ID e posição de um registro (dict ou compacto)
+        """
+        if isinstance(registro, RegistroCompacto):
+            registro.id = id_registro
+            registro.posicao = posicao
+        else:
+            registro['id'] = id_registro
+            registro['metadados']['posicao'] = posicao
+    
+    def _novo_acumulador_metadados(self) -> Dict[str, Any]:
+        """
+        Cria o acumulador de metadados estruturais do XML
+        """
+        return {
+            'elemento_raiz': None,
+            'total_elementos': 0,
+            'profundidade_maxima': 0,
+            'tipos_elementos': {},
+            'atributos_unicos': {},
+            'aplicacao': None,
+            'user_values': {},
+            # ID do elemento dono -> texto do <Transform> (se extrair_transformacoes)
+            'transformacoes': {}
+        }
     
-    def _gerar_estatisticas_detalhadas(self, inicio_processamento: float) -> Dict[str, Any]:
+    def _acumular_metadados(self, acumulador: Dict[str, Any], elem: ET.Element, profundidade: int):
+        """
+        Contabiliza um elemento no acumulador de metadados
+        """
+        if acumulador['elemento_raiz'] is None:
+            acumulador['elemento_raiz'] = elem.tag
+        
+        acumulador['total_elementos'] += 1
+        if profundidade > acumulador['profundidade_maxima']:
+            acumulador['profundidade_maxima'] = profundidade
+        
+        tipos = acumulador['tipos_elementos']
+        tipo = elem.tag.replace('{http://www.plmxml.org/Schemas/PLMXMLSchema}', '')
+        tipos[tipo] = tipos.get(tipo, 0) + 1
+        
+        atributos = acumulador['atributos_unicos']
+        for attr in elem.attrib:
+            atributos[attr] = atributos.get(attr, 0) + 1
+        
+        if acumulador['aplicacao'] is None and 'Application' in elem.tag:
+            acumulador['aplicacao'] = dict(elem.attrib)
+    
+    @staticmethod
+    def _acumular_user_values(acumulador: Dict[str, Any], user_data: ET.Element, dono: Optional[ET.Element]):
+        """
+        Indexa os UserValue de um bloco UserData pelo título
+        
+        O dono é o elemento que contém o UserData (ProductRevision, Form...).
+        Sem o atributo type o valor é do tipo 'string', o padrão do schema PLMXML.
+        """
+        id_dono = dono.get('id') if dono is not None else None
+        indice = acumulador['user_values']
+        for user_value in user_data:
+            titulo = user_value.get('title')
+            if titulo:
+                indice.setdefault(titulo, []).append(
+                    (id_dono, user_value.get('value', ''), user_value.get('type', 'string')))
+    
+    def _registrar_indice_user_values(self, dados: Dict[str, Any], indice: Dict[str, List[tuple]]):
+        """
+        Publica o índice de UserValues na API (valores_campo) e, se habilitado, na saída
+        """
+        self.indice_user_values = indice
+        if self.config['incluir_indice_user_values']:
+            dados['indice_user_values'] = indice
+        
+        total_valores = sum(len(valores) for valores in indice.values())
+        self.logger.info(f"🏷️  Índice de UserValues: {len(indice)} título(s), {total_valores} valor(es)")
+    
+    def _montar_metadados_acumulados(self, acumulador: Dict[str, Any], caminho_arquivo: str) -> Dict[str, Any]:
+        """
+        Monta o bloco de metadados a partir do acumulador
+        """
+        return {
+            'arquivo': self._extrair_metadados_arquivo(caminho_arquivo),
+            'xml': {
+                'elemento_raiz': acumulador['elemento_raiz'],
+                'total_elementos': acumulador['total_elementos'],
+                'profundidade_maxima': acumulador['profundidade_maxima'],
+                'linhas_bom_duplicadas_removidas': self.duplicatas_bom_removidas,
+                'data_processamento': datetime.now().isoformat()
+            },
+            'estrutura': {
+                'tipos_elementos': acumulador['tipos_elementos'],
+                'atributos_unicos': acumulador['atributos_unicos']
+            }
+        }
+    
+    def _indexar_ids(self, dados: Dict[str, Any], elementos_com_id: List[ET.Element] = None):
+        """
+        Monta os índices id -> registro e id -> elemento usados por resolver()
+        """
+        self.indice_ids = {}
+        for item in dados['itens']:
+            self.indice_ids.setdefault(item['id'], item)
+        
+        self.indice_elementos = {}
+        for elem in elementos_com_id or ():
+            self.indice_elementos.setdefault(elem.get('id'), elem)
+        
+        if self.config['incluir_indice_ids']:
+            # Posição de cada ID na lista 'itens', para junções no JSON
+            indice_posicoes = {}
+            for posicao, item in enumerate(dados['itens']):
+                indice_posicoes.setdefault(item['id'], posicao)
+            dados['indice_ids'] = indice_posicoes
+        
+        self.logger.info(f"🗂️  Índice de IDs: {len(self.indice_ids)} registros")
+    
+    def _montar_arvore_ocorrencias(self, dados: Dict[str, Any], transformacoes: Dict[str, str] = None):
+        """
+        Monta a árvore de ocorrências a partir das linhas BOM já indexadas
+        
+        Args:
+            dados: Resultado do parsing com 'itens' e 'bom'
+            transformacoes: ID da ocorrência -> texto do <Transform>. None quando
+                os dados vêm do cache, que já traz as posições absolutas
+        """
+        self.transformacoes = None
+        self.arvore_ocorrencias = ArvoreOcorrencias.construir(
+            dados['bom'], dados['itens'], self.resolver, self._normalizar_referencia)
+        
+        arvore = self.arvore_ocorrencias
+        self.logger.info(f"🌳 Árvore de ocorrências: {len(arvore)} nós, {len(arvore.raizes())} raiz(es), "
+                         f"profundidade máxima {arvore.profundidade_maxima()}")
+        if arvore.referencias_ignoradas:
+            self.logger.warning(f"⚠️  {arvore.referencias_ignoradas} referência(s) de ocorrência "
+                                f"inexistente(s) ou repetida(s) ignorada(s)")
+        
+        if self.config['incluir_arvore_ocorrencias']:
+            dados['arvore_ocorrencias'] = arvore.para_lista()
+        
+        self.indice_onde_usado = IndiceOndeUsado()
+        nome_arquivo = dados.get('metadados', {}).get('arquivo', {}).get('nome')
+        self.indice_onde_usado.adicionar(nome_arquivo, arvore, self.resolver)
+        self.logger.info(f"🔎 Índice onde-usado: {len(self.indice_onde_usado)} item(ns) distinto(s)")
+        
+        if self.config['incluir_consolidacao_quantidades']:
+            dados['consolidacao_quantidades'] = arvore.consolidar_quantidades()
+            self.logger.info(f"🧮 Quantidades consolidadas: {len(dados['consolidacao_quantidades'])} revisão(ões) distinta(s)")
+            if arvore.quantidades_invalidas:
+                self.logger.warning(f"⚠️  {arvore.quantidades_invalidas} quantidade(s) inválida(s) consideradas como 1")
+        
+        if self.config['extrair_transformacoes'] and transformacoes is not None:
+            self._extrair_posicoes_absolutas(dados, arvore, transformacoes)
+    
+    def _extrair_posicoes_absolutas(self, dados: Dict[str, Any], arvore: ArvoreOcorrencias,
+                                    transformacoes: Dict[str, str]):
+        """
+        Compõe as transformações de mundo e exporta a posição absoluta de cada ocorrência
+        """
+        if not NUMPY_DISPONIVEL:
+            self.logger.warning("⚠️  NumPy não instalado - transformações compostas em Python puro")
+        
+        self.transformacoes = TransformacoesOcorrencias(arvore, transformacoes)
+        dados['posicoes_absolutas'] = self.transformacoes.para_lista()
+        
+        self.logger.info(f"📐 Transformações: {self.transformacoes.total_transformacoes} decodificada(s), "
+                         f"{len(arvore)} posição(ões) absoluta(s)")
+        if self.transformacoes.transformacoes_invalidas:
+            self.logger.warning(f"⚠️  {self.transformacoes.transformacoes_invalidas} <Transform> inválido(s) "
+                                f"considerado(s) como identidade")
+    
+    def _extrair_namespaces_avancados(self, root: ET.Element) -> Dict[str, str]:
+        """
+        Extrai namespaces do XML
+        """
+        namespaces = {}
+        
+        # Namespaces no elemento raiz
+        for prefixo, uri in root.attrib.items():
+            if prefixo.startswith('xmlns'):
+                if ':' in prefixo:
+                    nome_ns = prefixo.split(':')[1]
+                else:
+                    nome_ns = 'default'
+                namespaces[nome_ns] = uri
+        
+        return namespaces
+    
+    def _gerar_estatisticas_detalhadas(self, inicio_processamento: float,
+                                       tamanho_mb: float = None,
+                                       elementos_fases: Dict[str, int] = None) -> Dict[str, Any]:
         """
         Gera estatísticas detalhadas do processamento
         """
         tempo_processamento = time.time() - inicio_processamento
+        memoria = self._medidor.resumo(tamanho_mb) if self._medidor else {'pico_rss_mb': None, 'fases': {}}
+        tempos = self._medidor.resumo_tempos(elementos_fases) if self._medidor else {}
         
         return {
             'tempo_processamento_segundos': tempo_processamento,
             'tempo_processamento_formatado': f"{tempo_processamento:.2f}s",
-            'memoria_utilizada_mb': self.stats.get('memoria_utilizada', 0),
+            'tempos_fases': tempos,
+            'memoria_utilizada_mb': memoria['pico_rss_mb'],
+            'memoria': memoria,
             'elementos_processados': self.stats.get('elementos_processados', 0),
             'timestamp_inicio': datetime.fromtimestamp(inicio_processamento).isoformat(),
             'timestamp_fim': datetime.now().isoformat()
         }
     
-    def _atualizar_estatisticas_globais(self, dados: Dict[str, Any], tempo_processamento: float):
+    def _atualizar_estatisticas_globais(self, dados: Dict[str, Any], tempo_processamento: float,
+                                        memoria: Dict[str, Any] = None, tempos: Dict[str, Any] = None):
         """
         Atualiza estatísticas globais
         """
+        for fase, medicao in (tempos or {}).items():
+            total = self.stats['tempo_por_fase'].setdefault(fase, {'segundos': 0, 'elementos': 0})
+            total['segundos'] += medicao['segundos']
+            total['elementos'] += medicao['elementos'] or 0
+        
+        if memoria:
+            combinar_estatisticas_pico(self.stats, {
+                'memoria_utilizada': memoria['pico_rss_mb'],
+                'memoria_mb_por_mb_entrada': memoria.get('tracemalloc_mb_por_mb_entrada'),
+                'memoria_por_fase': memoria['fases']
+            })
+        
         self.stats['arquivos_processados'] += 1
         self.stats['itens_extraidos'] += len(dados.get('itens', []))
         self.stats['linhas_bom_extraidas'] += len(dados.get('bom', []))
+        self.stats['linhas_bom_duplicadas_removidas'] += dados.get('metadados', {}).get('xml', {}).get('linhas_bom_duplicadas_removidas', 0)
         self.stats['tempo_processamento'] += tempo_processamento
         self.stats['elementos_processados'] += dados.get('metadados', {}).get('xml', {}).get('total_elementos', 0)
     
-    def _salvar_resultado_avancado(self, dados: Dict[str, Any], arquivo_original: str, pasta_saida: str = None):
+    def _salvar_resultado_avancado(self, dados: Dict[str, Any], arquivo_original: str,
+                                   pasta_saida: str = None) -> Optional[str]:
         """
         Salva resultado em JSON com nome avançado
+        
+        Returns:
+            Caminho do JSON (ou da pasta JSON Lines) gravado, ou None se houver erro
         """
         if pasta_saida is None:
             pasta_saida = "data\\output"
@@ -511,20 +1612,144 @@ class PLMXMLParserAvancado:
         if not os.path.exists(pasta_saida):
             os.makedirs(pasta_saida)
         
-        # Nome do arquivo de saída
+        # Nome do arquivo (ou da pasta JSON Lines) de saída
         nome_base = os.path.splitext(os.path.basename(arquivo_original))[0]
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        nome_saida = f"{nome_base}_avancado_{timestamp}.json"
+        jsonl = self.config['formato_saida'] == 'jsonl'
+        nome_saida = f"{nome_base}_avancado_{timestamp}" + ("" if jsonl else ".json")
         caminho_saida = os.path.join(pasta_saida, nome_saida)
         
+        # Gravado registro a registro (ver EscritorJSON): a memória não cresce
+        # com a saída e o prazo pode interromper a gravação de resultados grandes
         try:
-            with open(caminho_saida, 'w', encoding='utf-8') as f:
-                json.dump(dados, f, indent=2, ensure_ascii=False)
+            if jsonl:
+                # O índice de IDs não é gravado: a posição de cada item é a
+                # linha dele em itens.jsonl
+                manifesto = gravar_resultado_jsonl(dados, caminho_saida, default=serializar_registro,
+                                                   prazo=self._prazo, omitir=('indice_ids',))
+                registros = sum(secao['registros'] for secao in manifesto['secoes'].values())
+            else:
+                registros = gravar_json(dados, caminho_saida, compacto=self.config['json_compacto'],
+                                        default=serializar_registro, prazo=self._prazo)
             
-            self.logger.info(f"💾 Resultado avançado salvo em: {caminho_saida}")
+            self.logger.info(f"💾 Resultado avançado salvo em: {caminho_saida} ({registros} registros)")
+            return caminho_saida
             
+        except TempoEsgotadoError:
+            # Não deixa uma saída incompleta na pasta de saída
+            if jsonl:
+                shutil.rmtree(caminho_saida, ignore_errors=True)
+            else:
+                os.remove(caminho_saida)
+            raise
         except Exception as e:
             self.logger.error(f"❌ Erro ao salvar resultado avançado: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _normalizar_referencia(ref: str) -> Optional[str]:
+        """
+        Converte uma referência PLMXML ('#id336' ou 'id336') no ID puro
+        
+        Referências externas ('outro.plmxml#id3') não são resolvidas.
+        """
+        ref = ref.strip()
+        if ref.startswith('#'):
+            ref = ref[1:]
+        if not ref or '#' in ref:
+            return None
+        return ref
+    
+    def resolver(self, ref: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve uma referência do último arquivo processado em tempo constante
+        
+        Args:
+            ref: Referência como aparece no PLMXML (instancedRef="#id336",
+                 parentRef, masterRef, formRef...) ou o ID puro
+        
+        Returns:
+            Registro extraído (item) com esse ID ou None se não existir
+        """
+        id_ref = self._normalizar_referencia(ref)
+        if id_ref is None:
+            return None
+        return self.indice_ids.get(id_ref)
+    
+    def resolver_elemento(self, ref: str) -> Optional[ET.Element]:
+        """
+        Resolve uma referência para o elemento XML
+        
+        Sem a árvore em memória (modo streaming, fatias ou cache) só funciona
+        com config['usar_indice_offsets']: o elemento é parseado isoladamente
+        a partir da sua posição no arquivo (ver IndiceOffsets).
+        """
+        id_ref = self._normalizar_referencia(ref)
+        if id_ref is None:
+            return None
+        
+        elemento = self.indice_elementos.get(id_ref)
+        if elemento is None and self.config['usar_indice_offsets'] and self.arquivo_atual:
+            if self._indice_offsets is None:
+                try:
+                    self._indice_offsets = IndiceOffsets.obter(self.arquivo_atual)
+                    self.logger.info(f"📍 Índice de posições: {len(self._indice_offsets)} elementos "
+                                     f"({IndiceOffsets.caminho_indice(self.arquivo_atual)})")
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"⚠️  Índice de posições indisponível: {str(e)}")
+                    # Não tenta de novo neste arquivo; o próximo recomeça com None
+                    self._indice_offsets = False
+            if self._indice_offsets is False:
+                return None
+            elemento = self._indice_offsets.parsear_elemento(id_ref, self.config['backend_xml'])
+        return elemento
+    
+    def onde_usado(self, item_id: str) -> List[Dict[str, Any]]:
+        """
+        Montagens que usam um item no último arquivo processado
+        
+        Args:
+            item_id: productId/itemId do item ou referência da revisão ('#id13')
+        
+        Returns:
+            Ocorrências que instanciam o item com a cadeia de pais de cada uma
+            (ver IndiceOndeUsado.onde_usado)
+        """
+        return self.indice_onde_usado.onde_usado(item_id)
+    
+    def valores_campo(self, titulo: str) -> List[tuple]:
+        """
+        Todos os UserValue com o título no último arquivo processado
+        
+        Args:
+            titulo: Título do campo (ex.: 'wt9_Cliente')
+        
+        Returns:
+            Lista de (id do elemento dono, valor, tipo) na ordem do documento
+        """
+        return self.indice_user_values.get(titulo, [])
+    
+    def valor_campo(self, titulo: str, dono: str = None, padrao: Optional[str] = None) -> Optional[str]:
+        """
+        Valor de um campo de usuário, equivalente a //UserValue[@title=titulo]/@value
+        
+        Args:
+            titulo: Título do campo
+            dono: Referência do elemento dono ('#id13' ou 'id13'); None = primeiro do documento
+            padrao: Valor retornado se o campo não existir
+        """
+        id_dono = self._normalizar_referencia(dono) if dono is not None else None
+        for id_valor_dono, valor, _ in self.valores_campo(titulo):
+            if id_dono is None or id_valor_dono == id_dono:
+                return valor
+        return padrao
+    
+    def resolver_lista(self, refs: str) -> List[Optional[Dict[str, Any]]]:
+        """
+        Resolve atributos com várias referências separadas por espaço
+        (accessRefs, occurrenceRefs="id10 id39 ...", relatedRefs)
+        """
+        return [self.resolver(ref) for ref in refs.split()]
     
     def imprimir_estatisticas_avancadas(self):
         """
@@ -537,11 +1762,68 @@ class PLMXMLParserAvancado:
             if chave == 'tempo_processamento':
                 print(f"{chave.replace('_', ' ').title()}: {valor:.2f} segundos")
             elif chave == 'memoria_utilizada':
-                print(f"{chave.replace('_', ' ').title()}: {valor:.2f} MB")
+                print(f"{chave.replace('_', ' ').title()}: {valor:.2f} MB (pico de RSS)")
+            elif chave == 'memoria_mb_por_mb_entrada':
+                # Só medido com tracemalloc (config['medir_alocacoes'])
+                if valor:
+                    print(f"Memória Por MB De Entrada: {valor:.2f} MB (pico tracemalloc / tamanho do arquivo)")
+            elif chave == 'tempo_por_fase':
+                print("Tempo Por Fase (soma entre os arquivos):")
+                for fase, total in valor.items():
+                    texto = f"   {fase}: {total['segundos']:.3f} s"
+                    if total['elementos'] and total['segundos'] > 0:
+                        texto += f" ({total['elementos']} elementos, {total['elementos'] / total['segundos']:,.0f}/s)"
+                    print(texto)
+            elif chave == 'memoria_por_fase':
+                print("Memória Por Fase (maior pico entre os arquivos):")
+                for fase, medicao in valor.items():
+                    rss = medicao.get('rss_pico_mb')
+                    alocado = medicao.get('tracemalloc_pico_mb')
+                    texto = f"   {fase}: RSS {rss:.1f} MB" if rss is not None else f"   {fase}: RSS indisponível"
+                    if alocado is not None:
+                        texto += f", alocado {alocado:.1f} MB"
+                    print(texto)
             else:
                 print(f"{chave.replace('_', ' ').title()}: {valor}")
         print("="*60)
 
+# Parser do processo worker do parsing em fatias, criado por _inicializar_worker_fatias
+_parser_fatias = None
+
+def _inicializar_worker_fatias(config: Dict[str, Any]):
+    """
+    Inicializador do ProcessPoolExecutor do parsing em fatias
+    """
+    global _parser_fatias
+    _parser_fatias = PLMXMLParserAvancado(modo_verbose=False)
+    _parser_fatias.config.update(config)
+
+def _parsear_fatia_worker(plano, indice: int, encoding_forcado: Optional[str],
+                          segundos_restantes: Optional[float]) -> Optional[Dict[str, Any]]:
+    """
+    Coleta os registros de uma fatia no worker
+    
+    Returns:
+        Registros, acumulador e dados da raiz da fatia, ou None se o XML da
+        fatia for inválido
+    """
+    _parser_fatias._prazo = Prazo(segundos_restantes)
+    leitor = io.BufferedReader(LeitorFatia(plano, indice), TAMANHO_AMOSTRA_ENCODING)
+    try:
+        with leitor:
+            registros, acumulador, root = _parser_fatias._coletar_registros_streaming(leitor, encoding_forcado)
+    except ERROS_PARSING as e:
+        _parser_fatias.logger.error(f"❌ Erro de parsing XML na fatia {indice}: {str(e)}")
+        return None
+    
+    return {
+        'registros': registros,
+        'acumulador': acumulador,
+        'duplicatas_bom_removidas': _parser_fatias.duplicatas_bom_removidas,
+        'namespaces': _parser_fatias._extrair_namespaces_avancados(root),
+        'atributos_raiz': list(root.attrib)
+    }
+
 # Função de teste avançada
 def teste_avancado():
     """
@@ -593,5 +1875,40 @@ def teste_avancado():
     else:
         print("\n⚠️  Nenhum arquivo foi processado com sucesso")
 
+def teste_recuperacao_latin1():
+    """
+    Arquivo declarado UTF-8 mas gravado em latin-1: cada modo de parsing deve
+    recuperar os nomes com acento pela nova tentativa em latin-1
+    """
+    print("🧪 TESTE DE RECUPERAÇÃO DE LATIN-1 DECLARADO COMO UTF-8")
+    print("=" * 60)
+    
+    conteudo = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<PLMXML xmlns="http://www.plmxml.org/Schemas/PLMXMLSchema">\n'
+                '<ProductRevision id="id1" name="PEÇA AÇO" subType="ItemRevision"/>\n'
+                '<ProductRevision id="id2" name="PARAFUSO" subType="ItemRevision"/>\n'
+                '</PLMXML>\n')
+    modos = {
+        'dom': {},
+        'streaming': {'modo_streaming': True},
+        'expat': {'motor_expat': True},
+        'fatias': {'processos_por_arquivo': 2, 'tamanho_min_fatiamento_mb': 0}
+    }
+    
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "latin1.plmxml")
+        with open(caminho, 'wb') as f:
+            f.write(conteudo.encode('latin-1'))
+        
+        for modo, config in modos.items():
+            parser = PLMXMLParserAvancado(modo_verbose=False)
+            parser.config.update(config)
+            resultado = parser.processar_arquivo_completo(caminho, salvar_json=False)
+            
+            assert resultado is not None, modo
+            assert [item['nome'] for item in resultado['itens']] == ['PEÇA AÇO', 'PARAFUSO'], modo
+            print(f"✅ {modo}: {resultado['itens'][0]['nome']}")
+
 if __name__ == "__main__":
+    teste_recuperacao_latin1()
     teste_avancado() 
\ No newline at end of file
@@ -4,7 +4,6 @@ Parser Básico para PLMXML - Versão Melhorada
 Este arquivo lê um arquivo PLMXML e extrai informações básicas com logs e tratamento de erros
 """
 
-import xml.etree.ElementTree as ET
 import json
 import os
 import sys
@@ -14,11 +13,35 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.utils.logger import configurar_logger
+from src.parsers.backend_xml import ERROS_PARSING, obter_backend
+from src.parsers.triagem_plmxml import triar_arquivo
+
+# Buscas por elementos que representam itens e relações BOM
+XPATHS_ITEM = [
+    './/plm:ProductRevision',
+    './/plm:Product', 
+    './/plm:Part',
+    './/plm:Item',
+    './/plm:Design',
+    './/plm:DesignRevision'
+]
+
+XPATHS_BOM = [
+    './/plm:ProductInstance',
+    './/plm:PartInstance',
+    './/plm:BOMLine',
+    './/plm:Instance',
+    './/plm:Occurrence'
+]
 
 class PLMXMLParserBasico:
-    def __init__(self, arquivo_log=None):
+    def __init__(self, arquivo_log=None, backend_xml='auto'):
         """
         Inicializa o parser com sistema de logs
+        
+        Args:
+            arquivo_log (str): Caminho para arquivo de log
+            backend_xml (str): 'auto' (lxml se instalado), 'lxml' ou 'etree'
         """
         self.logger = configurar_logger(arquivo_log)
         self.logger.info("✅ Parser PLMXML inicializado")
@@ -26,6 +49,11 @@ class PLMXMLParserBasico:
         # Namespace do PLMXML
         self.namespace = {'plm': 'http://www.plmxml.org/Schemas/PLMXMLSchema'}
         
+        # Backend XML e buscas compiladas uma única vez
+        self.backend = obter_backend(backend_xml)
+        self.buscas_item = [(xpath, self.backend.compilar_xpath(xpath, self.namespace)) for xpath in XPATHS_ITEM]
+        self.buscas_bom = [(xpath, self.backend.compilar_xpath(xpath, self.namespace)) for xpath in XPATHS_BOM]
+        
         # Estatísticas
         self.stats = {
             'arquivos_processados': 0,
@@ -35,16 +63,21 @@ class PLMXMLParserBasico:
             'tempo_processamento': 0
         }
     
-    def ler_arquivo_plmxml(self, caminho_arquivo):
+    def ler_arquivo_plmxml(self, caminho_arquivo, somente_triagem=False):
         """
         Lê o arquivo PLMXML e retorna informações básicas
         
         Args:
             caminho_arquivo (str): Caminho completo para o arquivo PLMXML
+            somente_triagem (bool): Lê só o cabeçalho e estima as contagens
+                (ver triar_arquivo), sem montar a árvore
         
         Returns:
             dict: Dicionário com os dados extraídos
         """
+        if somente_triagem:
+            return self.triar_arquivo(caminho_arquivo)
+        
         inicio_processamento = datetime.now()
         self.logger.info(f"📂 Iniciando processamento: {caminho_arquivo}")
         
@@ -54,10 +87,10 @@ class PLMXMLParserBasico:
         
         try:
             # Lê o arquivo XML
-            tree = ET.parse(caminho_arquivo)
+            tree = self.backend.parse(caminho_arquivo)
             root = tree.getroot()
             
-            self.logger.info(f"✅ Arquivo lido com sucesso!")
+            self.logger.info(f"✅ Arquivo lido com sucesso! (backend: {self.backend.nome})")
             self.logger.info(f"📊 Elemento raiz: {root.tag}")
             
             # Estrutura para armazenar os dados
@@ -96,7 +129,7 @@ class PLMXMLParserBasico:
             
             return dados_extraidos
             
-        except ET.ParseError as e:
+        except ERROS_PARSING as e:
             self.stats['erros'] += 1
             self.logger.error(f"❌ ERRO de parsing XML: {str(e)}")
             return None
@@ -105,6 +138,42 @@ class PLMXMLParserBasico:
             self.logger.error(f"❌ ERRO inesperado ao ler arquivo: {str(e)}")
             return None
     
+    def triar_arquivo(self, caminho_arquivo):
+        """
+        Caminho rápido: Header, data/autor da exportação e contagem aproximada
+        de elementos lendo só o início do arquivo e amostras dos bytes
+        
+        Args:
+            caminho_arquivo (str): Caminho completo para o arquivo PLMXML
+        
+        Returns:
+            dict: Resultado de triagem_plmxml.triar_arquivo ou None em caso de erro
+        """
+        self.logger.info(f"🔎 Triagem: {caminho_arquivo}")
+        
+        if not self._validar_arquivo(caminho_arquivo):
+            return None
+        
+        try:
+            triagem = triar_arquivo(caminho_arquivo, self.backend.nome)
+        except ERROS_PARSING as e:
+            self.stats['erros'] += 1
+            self.logger.error(f"❌ ERRO de parsing no cabeçalho: {str(e)}")
+            return None
+        except OSError as e:
+            self.stats['erros'] += 1
+            self.logger.error(f"❌ ERRO ao ler arquivo: {str(e)}")
+            return None
+        
+        self.stats['arquivos_processados'] += 1
+        self.stats['tempo_processamento'] += triagem['tempo_triagem']
+        
+        estimado = " (estimativa)" if triagem['contagem_estimada'] else ""
+        self.logger.info(f"✅ Triagem em {triagem['tempo_triagem'] * 1000:.1f} ms: "
+                         f"{triagem['total_elementos']} elementos{estimado}, "
+                         f"contexto {triagem['transfer_context']}")
+        return triagem
+    
     def _validar_arquivo(self, caminho_arquivo):
         """
         Valida se o arquivo existe e pode ser lido
@@ -182,18 +251,9 @@ class PLMXMLParserBasico:
         ids_processados = set()  # Para evitar duplicatas
         
         # Procura por diferentes tipos de elementos que representam itens
-        elementos_item = [
-            './/plm:ProductRevision',
-            './/plm:Product', 
-            './/plm:Part',
-            './/plm:Item',
-            './/plm:Design',
-            './/plm:DesignRevision'
-        ]
-        
-        for elemento_xpath in elementos_item:
+        for elemento_xpath, buscar in self.buscas_item:
             try:
-                elementos_encontrados = root.findall(elemento_xpath, self.namespace)
+                elementos_encontrados = buscar(root)
                 self.logger.info(f"   🔍 Busca '{elemento_xpath}': {len(elementos_encontrados)} elementos")
                 
                 for elemento in elementos_encontrados:
@@ -240,17 +300,9 @@ class PLMXMLParserBasico:
         linhas_bom = []
         
         # Procura por elementos que representam relações BOM
-        elementos_bom = [
-            './/plm:ProductInstance',
-            './/plm:PartInstance',
-            './/plm:BOMLine',
-            './/plm:Instance',
-            './/plm:Occurrence'
-        ]
-        
-        for elemento_xpath in elementos_bom:
+        for elemento_xpath, buscar in self.buscas_bom:
             try:
-                elementos_encontrados = root.findall(elemento_xpath, self.namespace)
+                elementos_encontrados = buscar(root)
                 self.logger.info(f"   🔍 Busca BOM '{elemento_xpath}': {len(elementos_encontrados)} elementos")
                 
                 for elemento in elementos_encontrados:
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Registros Compactos para o Parser PLMXML Avançado
+Representação de itens e linhas BOM com __slots__ e strings internadas,
+convertida para o formato de dicionário apenas na serialização
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Optional
+
+
+def achatar_atributos(atributos: Dict[str, str]) -> tuple:
+    """
+    Converte um dicionário em uma tupla plana (chave, valor, chave, valor...)
+    com as chaves internadas, bem menor que um dict por registro
+    """
+    plano = []
+    for chave, valor in atributos.items():
+        plano.append(sys.intern(chave))
+        plano.append(valor)
+    return tuple(plano)
+
+
+def _para_dict(plano: tuple) -> Dict[str, str]:
+    """
+    Reconstrói o dicionário a partir da tupla plana
+    """
+    return dict(zip(plano[::2], plano[1::2]))
+
+
+def _buscar(plano: tuple, chave: str, padrao: Optional[str] = None) -> Optional[str]:
+    """
+    Busca uma chave na tupla plana
+    """
+    for i in range(0, len(plano), 2):
+        if plano[i] == chave:
+            return plano[i + 1]
+    return padrao
+
+
+class RegistroCompacto(Mapping):
+    """
+    Base dos registros compactos
+
+    Implementa a interface de leitura de dicionário (registro['id'],
+    registro.get('nome'), 'propriedades' in registro), de modo que o código
+    que consome a saída do parser funciona com as duas representações.
+    """
+    __slots__ = ()
+    CHAVES = ()
+
+    def _valor(self, chave: str) -> Any:
+        return getattr(self, chave)
+
+    def para_dict(self) -> Dict[str, Any]:
+        """
+        Converte para o formato de dicionário do parser
+        """
+        return {chave: self._valor(chave) for chave in self.CHAVES}
+
+    def __getitem__(self, chave: str) -> Any:
+        if chave not in self.CHAVES:
+            raise KeyError(chave)
+        return self._valor(chave)
+
+    def __iter__(self):
+        return iter(self.CHAVES)
+
+    def __len__(self) -> int:
+        return len(self.CHAVES)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={self.id!r}, tipo_elemento={self.tipo_elemento!r})"
+
+
+class ItemCompacto(RegistroCompacto):
+    """
+    Item extraído (ProductRevision, Design, elemento com ID...)
+    """
+    __slots__ = ('id', 'nome', 'tipo_elemento', 'tipo_busca',
+                 'atributos', 'propriedades', 'posicao', 'total_filhos')
+    CHAVES = ('id', 'nome', 'tipo_elemento', 'tipo_busca', 'atributos_basicos',
+              'propriedades', 'relacionamentos', 'metadados')
+
+    def __init__(self, id, nome, tipo_elemento, tipo_busca, atributos, propriedades, posicao, total_filhos):
+        self.id = id
+        self.nome = nome
+        self.tipo_elemento = sys.intern(tipo_elemento)
+        self.tipo_busca = sys.intern(tipo_busca)
+        self.atributos = atributos
+        self.propriedades = propriedades
+        self.posicao = posicao
+        self.total_filhos = total_filhos
+
+    @classmethod
+    def de_dict(cls, registro: Dict[str, Any]) -> 'ItemCompacto':
+        """
+        Reconstrói o item a partir do formato de dicionário (ver para_dict)
+        """
+        return cls(registro['id'], registro['nome'], registro['tipo_elemento'], registro['tipo_busca'],
+                   achatar_atributos(registro['atributos_basicos']), achatar_atributos(registro['propriedades']),
+                   registro['metadados']['posicao'], registro['metadados']['total_filhos'])
+
+    def _valor(self, chave: str) -> Any:
+        if chave == 'atributos_basicos':
+            return _para_dict(self.atributos)
+        if chave == 'propriedades':
+            return _para_dict(self.propriedades)
+        if chave == 'relacionamentos':
+            return []
+        if chave == 'metadados':
+            return {
+                'posicao': self.posicao,
+                'tem_filhos': self.total_filhos > 0,
+                'total_filhos': self.total_filhos,
+                'tem_atributos': len(self.atributos) > 0
+            }
+        return getattr(self, chave)
+
+
+class LinhaBOMCompacta(RegistroCompacto):
+    """
+    Linha BOM extraída (Occurrence, Instance, BOMLine...)
+
+    pai, filho, quantidade e find_number são derivados dos atributos.
+    """
+    __slots__ = ('id', 'tipo_elemento', 'tipo_busca', 'atributos',
+                 'propriedades', 'posicao', 'total_filhos')
+    CHAVES = ('id', 'pai', 'filho', 'quantidade', 'find_number', 'tipo_elemento',
+              'tipo_busca', 'atributos', 'propriedades', 'metadados')
+
+    def __init__(self, id, tipo_elemento, tipo_busca, atributos, propriedades, posicao, total_filhos):
+        self.id = id
+        self.tipo_elemento = sys.intern(tipo_elemento)
+        self.tipo_busca = sys.intern(tipo_busca)
+        self.atributos = atributos
+        self.propriedades = propriedades
+        self.posicao = posicao
+        self.total_filhos = total_filhos
+
+    @classmethod
+    def de_dict(cls, registro: Dict[str, Any]) -> 'LinhaBOMCompacta':
+        """
+        Reconstrói a linha a partir do formato de dicionário (ver para_dict)
+        """
+        return cls(registro['id'], registro['tipo_elemento'], registro['tipo_busca'],
+                   achatar_atributos(registro['atributos']), achatar_atributos(registro['propriedades']),
+                   registro['metadados']['posicao'], registro['metadados']['total_filhos'])
+
+    @property
+    def pai(self) -> str:
+        valor = _buscar(self.atributos, 'parentRef')
+        return valor if valor is not None else _buscar(self.atributos, 'partOf', 'N/A')
+
+    @property
+    def filho(self) -> str:
+        valor = _buscar(self.atributos, 'instancedRef')
+        return valor if valor is not None else _buscar(self.atributos, 'ref', 'N/A')
+
+    @property
+    def quantidade(self) -> str:
+        return _buscar(self.atributos, 'quantity', '1')
+
+    @property
+    def find_number(self) -> str:
+        return _buscar(self.atributos, 'findNumber', 'N/A')
+
+    def _valor(self, chave: str) -> Any:
+        if chave == 'atributos':
+            return _para_dict(self.atributos)
+        if chave == 'propriedades':
+            return _para_dict(self.propriedades)
+        if chave == 'metadados':
+            return {
+                'posicao': self.posicao,
+                'tem_filhos': self.total_filhos > 0,
+                'total_filhos': self.total_filhos,
+                'tem_atributos': len(self.atributos) > 0
+            }
+        return getattr(self, chave)
+
+
+def serializar_registro(obj: Any) -> Dict[str, Any]:
+    """
+    Função 'default' para json.dump: converte registros compactos em dict
+    """
+    if isinstance(obj, RegistroCompacto):
+        return obj.para_dict()
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
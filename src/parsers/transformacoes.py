@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Transformações das Ocorrências do PLMXML
+Decodifica os elementos <Transform> (16 números, matriz 4x4 por linhas com a
+translação na última linha) e compõe a transformação de mundo de cada nó da
+árvore de ocorrências: mundo[no] = local[no] · mundo[pai[no]].
+
+Com NumPy as matrizes ficam em um único array float64 (n, 4, 4) contíguo e a
+composição é feita nível a nível com matmul em lote; sem NumPy o mesmo
+cálculo é feito nó a nó em Python puro.
+"""
+
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+    NUMPY_DISPONIVEL = True
+except ImportError:
+    np = None
+    NUMPY_DISPONIVEL = False
+
+IDENTIDADE = (1.0, 0.0, 0.0, 0.0,
+              0.0, 1.0, 0.0, 0.0,
+              0.0, 0.0, 1.0, 0.0,
+              0.0, 0.0, 0.0, 1.0)
+
+
+class TransformacoesOcorrencias:
+    """
+    Transformações locais e de mundo dos nós de uma ArvoreOcorrencias
+
+    Nós sem <Transform> (ou com texto inválido) usam a identidade.
+    Com NumPy, locais e mundo são arrays (n, 4, 4); sem NumPy, listas de
+    tuplas com 16 valores.
+    """
+
+    def __init__(self, arvore, textos: Dict[str, str], usar_numpy: bool = True):
+        """
+        Args:
+            arvore: ArvoreOcorrencias já montada
+            textos: ID da ocorrência -> texto do seu <Transform>
+            usar_numpy: Se False, força a implementação em Python puro
+        """
+        self.arvore = arvore
+        self.usar_numpy = usar_numpy and NUMPY_DISPONIVEL
+        self.transformacoes_invalidas = 0
+        self.total_transformacoes = 0
+
+        if self.usar_numpy:
+            self.locais = self._decodificar_numpy(textos)
+            self.mundo = self._compor_numpy()
+        else:
+            self.locais = self._decodificar_python(textos)
+            self.mundo = self._compor_python()
+
+    def _valores_do_no(self, textos: Dict[str, str], no: int) -> Optional[List[str]]:
+        """
+        Os 16 números do <Transform> de um nó, ou None se não houver/for inválido
+        """
+        texto = textos.get(self.arvore.ocorrencias[no])
+        if texto is None:
+            return None
+
+        self.total_transformacoes += 1
+        valores = texto.split()
+        if len(valores) != 16:
+            self.transformacoes_invalidas += 1
+            return None
+        return valores
+
+    def _decodificar_numpy(self, textos: Dict[str, str]):
+        """
+        Decodifica todas as transformações de uma vez em um array (n, 4, 4)
+        """
+        total = len(self.arvore)
+        locais = np.empty((total, 4, 4), dtype=np.float64)
+        locais[:] = np.eye(4)
+
+        nos = []
+        valores = []
+        for no in self.arvore:
+            valores_no = self._valores_do_no(textos, no)
+            if valores_no is not None:
+                nos.append(no)
+                valores.extend(valores_no)
+
+        if nos:
+            try:
+                decodificados = np.array(valores, dtype=np.float64).reshape(len(nos), 4, 4)
+            except ValueError:
+                # Algum número ilegível: decodifica nó a nó para isolar o inválido
+                return self._decodificar_numpy_por_no(textos, locais)
+            locais[nos] = decodificados
+
+        return locais
+
+    def _decodificar_numpy_por_no(self, textos: Dict[str, str], locais):
+        self.total_transformacoes = 0
+        self.transformacoes_invalidas = 0
+        for no in self.arvore:
+            valores_no = self._valores_do_no(textos, no)
+            if valores_no is None:
+                continue
+            try:
+                locais[no] = np.array(valores_no, dtype=np.float64).reshape(4, 4)
+            except ValueError:
+                self.transformacoes_invalidas += 1
+        return locais
+
+    def _compor_numpy(self):
+        """
+        Compõe as transformações de mundo com um matmul em lote por nível
+        """
+        mundo = self.locais.copy()
+        if not len(self.arvore):
+            return mundo
+
+        pais = np.frombuffer(self.arvore.pais, dtype=np.int32)
+        profundidades = np.frombuffer(self.arvore.profundidades, dtype=np.int32)
+
+        # Nós agrupados por profundidade: o nível anterior já está composto
+        ordem = np.argsort(profundidades, kind='stable')
+        limites = np.searchsorted(profundidades[ordem], np.arange(1, profundidades.max() + 2))
+        for inicio, fim in zip(limites[:-1], limites[1:]):
+            nos = ordem[inicio:fim]
+            mundo[nos] = np.matmul(self.locais[nos], mundo[pais[nos]])
+
+        return mundo
+
+    def _decodificar_python(self, textos: Dict[str, str]) -> List[tuple]:
+        locais = []
+        for no in self.arvore:
+            valores_no = self._valores_do_no(textos, no)
+            matriz = IDENTIDADE
+            if valores_no is not None:
+                try:
+                    matriz = tuple(float(valor) for valor in valores_no)
+                except ValueError:
+                    self.transformacoes_invalidas += 1
+            locais.append(matriz)
+        return locais
+
+    @staticmethod
+    def _multiplicar(a: tuple, b: tuple) -> tuple:
+        """
+        Produto de duas matrizes 4x4 guardadas por linhas em tuplas de 16
+        """
+        return tuple(
+            a[linha] * b[coluna] + a[linha + 1] * b[coluna + 4] +
+            a[linha + 2] * b[coluna + 8] + a[linha + 3] * b[coluna + 12]
+            for linha in (0, 4, 8, 12) for coluna in range(4)
+        )
+
+    def _compor_python(self) -> List[tuple]:
+        """
+        Em pré-ordem o pai vem antes do filho: uma passada compõe tudo
+        """
+        mundo = []
+        for no in self.arvore:
+            pai = self.arvore.pais[no]
+            local = self.locais[no]
+            mundo.append(local if pai < 0 else self._multiplicar(local, mundo[pai]))
+        return mundo
+
+    def matriz_mundo(self, no: int) -> List[float]:
+        """
+        Transformação de mundo do nó como lista de 16 valores (por linhas)
+        """
+        if self.usar_numpy:
+            return self.mundo[no].ravel().tolist()
+        return list(self.mundo[no])
+
+    def posicao(self, no: int) -> List[float]:
+        """
+        Posição absoluta (x, y, z) da origem do nó: translação da matriz de mundo
+        """
+        if self.usar_numpy:
+            return self.mundo[no, 3, :3].tolist()
+        return list(self.mundo[no][12:15])
+
+    def para_lista(self) -> List[Dict[str, Any]]:
+        """
+        Posições absolutas em pré-ordem no formato do JSON de saída
+        """
+        if self.usar_numpy:
+            posicoes = self.mundo[:, 3, :3].tolist()
+            matrizes = self.mundo.reshape(len(self.arvore), 16).tolist()
+        else:
+            posicoes = [list(matriz[12:15]) for matriz in self.mundo]
+            matrizes = [list(matriz) for matriz in self.mundo]
+
+        return [
+            {
+                'ocorrencia': self.arvore.ocorrencias[no],
+                'posicao': posicoes[no],
+                'transformacao_mundo': matrizes[no]
+            }
+            for no in self.arvore
+        ]
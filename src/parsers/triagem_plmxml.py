@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Triagem Rápida de Arquivos PLMXML (somente cabeçalho)
+Lê só o início do arquivo para obter os atributos do elemento PLMXML (date,
+author, schemaVersion...) e do Header (traverseRootRefs, transferContext) e
+estima quantos elementos de cada tipo o arquivo tem contando as tags de
+abertura nos bytes, sem montar árvore.
+
+Arquivos pequenos são contados por inteiro; nos grandes a contagem é feita
+em janelas espalhadas pelo arquivo e extrapolada, o que mantém o tempo da
+triagem praticamente constante (milissegundos) mesmo para arquivos de GB.
+"""
+
+import mmap
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Adiciona path para imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.parsers.backend_xml import ERROS_PARSING, obter_backend
+from src.parsers.fatiamento_plmxml import BOMS_NAO_ASCII
+
+# Janelas da contagem por amostragem
+TOTAL_JANELAS = 16
+TAMANHO_JANELA = 256 * 1024
+
+# Tag de abertura, com o prefixo de namespace (se houver) fora do grupo
+_RE_NOME_TAG = re.compile(rb'<(?:[A-Za-z_][\w.-]*:)?([A-Za-z_][\w.-]*)')
+
+
+def _nome_local(tag: str) -> str:
+    return tag.split('}')[-1]
+
+
+def ler_cabecalho(caminho: str, backend_xml: str = 'auto') -> Dict[str, Any]:
+    """
+    Atributos da raiz e do Header, parando no primeiro filho da raiz que não
+    seja o Header (só o início do arquivo é lido)
+
+    Raises:
+        Erros de parsing do backend (ERROS_PARSING) se o início for inválido
+    """
+    cabecalho = {'elemento_raiz': None, 'plmxml': {}, 'header': None}
+    profundidade = 0
+
+    with open(caminho, 'rb') as arquivo:
+        for evento, elem in obter_backend(backend_xml).iterparse(arquivo, ('start', 'end')):
+            if evento == 'start':
+                profundidade += 1
+                if profundidade == 1:
+                    cabecalho['elemento_raiz'] = _nome_local(elem.tag)
+                    cabecalho['plmxml'] = dict(elem.attrib)
+                elif profundidade == 2 and _nome_local(elem.tag) != 'Header':
+                    break
+            else:
+                profundidade -= 1
+                if profundidade == 1:
+                    # Header completo (atributos e filhos já lidos)
+                    cabecalho['header'] = dict(elem.attrib)
+                    break
+
+    return cabecalho
+
+
+def contar_tags(caminho: str, total_janelas: int = TOTAL_JANELAS,
+                tamanho_janela: int = TAMANHO_JANELA) -> Optional[Dict[str, Any]]:
+    """
+    Conta as tags de abertura por nome local direto nos bytes do arquivo
+
+    Tags dentro de comentários ou CDATA também são contadas: o resultado é
+    uma estimativa para triagem, não substitui o parsing.
+
+    Returns:
+        {'contagem_tags', 'total_elementos', 'contagem_estimada', 'bytes_varridos'}
+        ou None se o arquivo não usar um encoding compatível com ASCII (UTF-16)
+    """
+    tamanho = os.path.getsize(caminho)
+    contagem = Counter()
+    if not tamanho:
+        return {'contagem_tags': {}, 'total_elementos': 0, 'contagem_estimada': False, 'bytes_varridos': 0}
+
+    with open(caminho, 'rb') as arquivo:
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+            if dados[:4].startswith(BOMS_NAO_ASCII):
+                return None
+
+            if tamanho <= total_janelas * tamanho_janela:
+                inicios = [0]
+                tamanho_janela = tamanho
+            else:
+                passo = (tamanho - tamanho_janela) // (total_janelas - 1)
+                inicios = [passo * i for i in range(total_janelas)]
+
+            for inicio in inicios:
+                contagem.update(_RE_NOME_TAG.findall(dados, inicio, inicio + tamanho_janela))
+
+    bytes_varridos = len(inicios) * tamanho_janela
+    fator = tamanho / bytes_varridos
+    contagem_tags = {
+        nome.decode('ascii', 'replace'): round(total * fator)
+        for nome, total in contagem.most_common()
+    }
+
+    return {
+        'contagem_tags': contagem_tags,
+        'total_elementos': sum(contagem_tags.values()),
+        'contagem_estimada': fator > 1,
+        'bytes_varridos': bytes_varridos
+    }
+
+
+def triar_arquivo(caminho: str, backend_xml: str = 'auto', total_janelas: int = TOTAL_JANELAS,
+                  tamanho_janela: int = TAMANHO_JANELA) -> Dict[str, Any]:
+    """
+    Triagem de um arquivo: cabeçalho, data/autor da exportação e contagem
+    aproximada de elementos, sem o processamento completo
+
+    Raises:
+        OSError: Arquivo inacessível
+        Erros de parsing do backend (ERROS_PARSING) se o início for inválido
+    """
+    inicio = time.perf_counter()
+    estado = os.stat(caminho)
+
+    cabecalho = ler_cabecalho(caminho, backend_xml)
+    header = cabecalho['header'] or {}
+    contagem = contar_tags(caminho, total_janelas, tamanho_janela)
+
+    triagem = {
+        'nome_arquivo': os.path.basename(caminho),
+        'caminho_completo': os.path.abspath(caminho),
+        'tamanho_bytes': estado.st_size,
+        'data_modificacao': datetime.fromtimestamp(estado.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+        'elemento_raiz': cabecalho['elemento_raiz'],
+        'data_exportacao': cabecalho['plmxml'].get('date'),
+        'autor': cabecalho['plmxml'].get('author'),
+        'versao_schema': cabecalho['plmxml'].get('schemaVersion'),
+        'plmxml': cabecalho['plmxml'],
+        'header': cabecalho['header'],
+        'traverse_root_refs': header.get('traverseRootRefs', '').split(),
+        'transfer_context': header.get('transferContext'),
+        'contagem_tags': None,
+        'total_elementos': None,
+        'contagem_estimada': None,
+        'bytes_varridos': 0
+    }
+    if contagem is not None:
+        triagem.update(contagem)
+
+    triagem['tempo_triagem'] = time.perf_counter() - inicio
+    return triagem
+
+
+# Teste da triagem
+def teste_triagem():
+    """
+    Faz a triagem dos arquivos de data\\input
+    """
+    print("🧪 TESTE DA TRIAGEM RÁPIDA")
+    print("=" * 60)
+
+    pasta_entrada = "data\\input"
+    if not os.path.exists(pasta_entrada):
+        print(f"⚠️  Pasta de entrada não encontrada: {pasta_entrada}")
+        return
+
+    for arquivo in os.listdir(pasta_entrada):
+        if not arquivo.lower().endswith(('.xml', '.plmxml')):
+            continue
+
+        try:
+            triagem = triar_arquivo(os.path.join(pasta_entrada, arquivo))
+        except ERROS_PARSING as e:
+            print(f"\n❌ {arquivo}: cabeçalho inválido ({e})")
+            continue
+
+        estimado = " (estimado)" if triagem['contagem_estimada'] else ""
+        print(f"\n📂 {arquivo} ({triagem['tempo_triagem'] * 1000:.1f} ms)")
+        print(f"   📅 {triagem['data_exportacao']} | 👤 {triagem['autor']}")
+        print(f"   🌳 Raízes: {', '.join(triagem['traverse_root_refs']) or 'nenhuma'} | "
+              f"Contexto: {triagem['transfer_context']}")
+        print(f"   🧮 {triagem['total_elementos']} elementos{estimado}")
+
+
+if __name__ == "__main__":
+    teste_triagem()
@@ -9,13 +9,13 @@ import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 from datetime import datetime
-import xml.etree.ElementTree as ET
 
 # Adiciona path para imports
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from src.utils.logger import configurar_logger
 from src.parsers.plmxml_parser_avancado import PLMXMLParserAvancado
+from src.parsers.backend_xml import obter_backend
 
 class EstruturaPLMXMLViewer:
     def __init__(self, root):
@@ -209,7 +209,7 @@ class EstruturaPLMXMLViewer:
             self.log("🔍 Analisando estrutura do arquivo...")
             
             # Parse do XML
-            tree = ET.parse(self.arquivo_plmxml)
+            tree = obter_backend().parse(self.arquivo_plmxml)
             root = tree.getroot()
             
             # Analisa estrutura
@@ -298,7 +298,7 @@ class EstruturaPLMXMLViewer:
             return []
             
         try:
-            tree = ET.parse(self.arquivo_plmxml)
+            tree = obter_backend().parse(self.arquivo_plmxml)
             root = tree.getroot()
             
             resultados = []
@@ -356,7 +356,7 @@ class EstruturaPLMXMLViewer:
             return []
             
         try:
-            tree = ET.parse(self.arquivo_plmxml)
+            tree = obter_backend().parse(self.arquivo_plmxml)
             root = tree.getroot()
             
             campos = []
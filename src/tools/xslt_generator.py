@@ -9,13 +9,13 @@ import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 from datetime import datetime
-import xml.etree.ElementTree as ET
 import re
 
 # Adiciona path para imports
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from src.utils.logger import configurar_logger
+from src.parsers.backend_xml import obter_backend
 
 class XSLTGenerator:
     def __init__(self, root):
@@ -235,7 +235,7 @@ class XSLTGenerator:
             self.log("🔍 Extraindo campos do arquivo PLMXML...")
             
             # Parse do XML
-            tree = ET.parse(self.arquivo_plmxml)
+            tree = obter_backend().parse(self.arquivo_plmxml)
             root = tree.getroot()
             
             # Extrai campos
@@ -400,7 +400,7 @@ class XSLTGenerator:
 <!-- Alternativas baseadas no seu padrão: -->
 <xsl:value-of select="$frascoDesign/plm:UserData/plm:UserValue[@title='{nome_campo}']/@value"/>
 <xsl:value-of select="$rootMasterForm/plm:UserData/plm:UserValue[@title='{nome_campo}']/@value"/>
-<xsl:value-of select="//plm:UserValue[@title='{nome_campo}']/@value"/>
+<xsl:value-of select="key('userValueByTitle', '{nome_campo}')/@value"/>
 
 <!-- Para uso em condições (como no seu XSL): -->
 <xsl:when test="$rootProductRevision/plm:UserData/plm:UserValue[@title='{nome_campo}']/@value != ''">
@@ -529,6 +529,7 @@ class XSLTGenerator:
     <xsl:key name="formById" match="plm:Form" use="@id"/>
     <xsl:key name="occurrenceById" match="plm:Occurrence" use="@id"/>
     <xsl:key name="siteById" match="plm:Site" use="@id"/>
+    <xsl:key name="userValueByTitle" match="plm:UserValue" use="@title"/>
 
     <xsl:template match="/">
         <!-- Identificar a ficha de equipamento principal -->
@@ -13,6 +13,10 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.utils.logger import configurar_logger
+from src.utils.prazo import Prazo, TempoEsgotadoError
+
+# Template do relatório HTML usado quando nenhum outro é escolhido
+ARQUIVO_XSLT_PADRAO = "templates\\xslt\\exemplo_relatorio.xslt"
 
 class XSLTProcessor:
     def __init__(self):
@@ -22,7 +26,7 @@ class XSLTProcessor:
         self.logger = configurar_logger()
         self.logger.info("Processador XSLT inicializado")
     
-    def aplicar_xslt(self, arquivo_xml, arquivo_xslt, arquivo_saida=None):
+    def aplicar_xslt(self, arquivo_xml, arquivo_xslt, arquivo_saida=None, prazo=None):
         """
         Aplica transformação XSLT em um arquivo XML
         
@@ -30,12 +34,17 @@ class XSLTProcessor:
             arquivo_xml (str): Caminho do arquivo XML
             arquivo_xslt (str): Caminho do arquivo XSLT
             arquivo_saida (str): Caminho do arquivo de saída (opcional)
+            prazo (Prazo): Prazo do processamento (opcional, padrão sem limite);
+                           processos externos são encerrados quando ele acaba
         
         Returns:
             str: Caminho do arquivo HTML gerado
         """
         self.logger.info(f"Aplicando XSLT: {arquivo_xml} -> {arquivo_xslt}")
         
+        if prazo is None:
+            prazo = Prazo()
+        
         # Verifica se os arquivos existem
         if not os.path.exists(arquivo_xml):
             self.logger.error(f"Arquivo XML não encontrado: {arquivo_xml}")
@@ -52,35 +61,41 @@ class XSLTProcessor:
         
         try:
             # Tenta usar xsltproc (Linux/Mac)
-            resultado = self._usar_xsltproc(arquivo_xml, arquivo_xslt, arquivo_saida)
+            resultado = self._usar_xsltproc(arquivo_xml, arquivo_xslt, arquivo_saida, prazo)
             if resultado:
                 return arquivo_saida
             
             # Se xsltproc falhar, tenta usar saxon (Java)
-            resultado = self._usar_saxon(arquivo_xml, arquivo_xslt, arquivo_saida)
+            resultado = self._usar_saxon(arquivo_xml, arquivo_xslt, arquivo_saida, prazo)
             if resultado:
                 return arquivo_saida
             
             # Se ambos falharem, usa método Python
-            resultado = self._usar_python_xslt(arquivo_xml, arquivo_xslt, arquivo_saida)
+            resultado = self._usar_python_xslt(arquivo_xml, arquivo_xslt, arquivo_saida, prazo)
             if resultado:
                 return arquivo_saida
             
             self.logger.error("Nenhum método XSLT funcionou")
             return None
             
+        except TempoEsgotadoError as e:
+            self.logger.error(f"{str(e)} - transformação abortada")
+            return None
         except Exception as e:
             self.logger.error(f"Erro ao aplicar XSLT: {str(e)}")
             return None
     
-    def _usar_xsltproc(self, xml_file, xslt_file, output_file):
+    def _usar_xsltproc(self, xml_file, xslt_file, output_file, prazo):
         """
         Usa xsltproc para transformação XSLT
         """
+        prazo.verificar('XSLT')
+        
         try:
             cmd = ['xsltproc', xslt_file, xml_file]
             with open(output_file, 'w', encoding='utf-8') as f:
-                result = subprocess.run(cmd, stdout=f, stderr=subprocess.PIPE, text=True)
+                result = subprocess.run(cmd, stdout=f, stderr=subprocess.PIPE, text=True,
+                                        timeout=prazo.restante())
             
             if result.returncode == 0:
                 self.logger.info(f"XSLT aplicado com xsltproc: {output_file}")
@@ -89,6 +104,8 @@ class XSLTProcessor:
                 self.logger.warning(f"xsltproc falhou: {result.stderr}")
                 return False
                 
+        except subprocess.TimeoutExpired:
+            raise TempoEsgotadoError(prazo.descrever('xsltproc'))
         except FileNotFoundError:
             self.logger.info("xsltproc não encontrado, tentando outros métodos")
             return False
@@ -96,13 +113,15 @@ class XSLTProcessor:
             self.logger.warning(f"Erro com xsltproc: {str(e)}")
             return False
     
-    def _usar_saxon(self, xml_file, xslt_file, output_file):
+    def _usar_saxon(self, xml_file, xslt_file, output_file, prazo):
         """
         Usa Saxon para transformação XSLT
         """
+        prazo.verificar('XSLT')
+        
         try:
             cmd = ['java', '-jar', 'saxon-he.jar', xml_file, xslt_file, f'-o:{output_file}']
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=prazo.restante())
             
             if result.returncode == 0:
                 self.logger.info(f"XSLT aplicado com Saxon: {output_file}")
@@ -111,6 +130,8 @@ class XSLTProcessor:
                 self.logger.warning(f"Saxon falhou: {result.stderr}")
                 return False
                 
+        except subprocess.TimeoutExpired:
+            raise TempoEsgotadoError(prazo.descrever('Saxon'))
         except FileNotFoundError:
             self.logger.info("Saxon não encontrado, tentando método Python")
             return False
@@ -118,7 +139,7 @@ class XSLTProcessor:
             self.logger.warning(f"Erro com Saxon: {str(e)}")
             return False
     
-    def _usar_python_xslt(self, xml_file, xslt_file, output_file):
+    def _usar_python_xslt(self, xml_file, xslt_file, output_file, prazo):
         """
         Usa lxml para transformação XSLT em Python
         """
@@ -126,12 +147,15 @@ class XSLTProcessor:
             from lxml import etree
             
             # Carrega XML e XSLT
+            prazo.verificar('XSLT')
             xml_doc = etree.parse(xml_file)
             xslt_doc = etree.parse(xslt_file)
             
-            # Aplica transformação
+            # Aplica transformação (executada em C, o prazo é conferido antes e depois)
+            prazo.verificar('XSLT')
             transform = etree.XSLT(xslt_doc)
             result = transform(xml_doc)
+            prazo.verificar('XSLT')
             
             # Salva resultado
             with open(output_file, 'w', encoding='utf-8') as f:
@@ -142,15 +166,20 @@ class XSLTProcessor:
             
         except ImportError:
             self.logger.warning("lxml não instalado, criando HTML básico")
-            return self._criar_html_basico(xml_file, output_file)
+            return self._criar_html_basico(xml_file, output_file, prazo)
+        except TempoEsgotadoError:
+            raise
         except Exception as e:
             self.logger.warning(f"Erro com lxml: {str(e)}")
-            return self._criar_html_basico(xml_file, output_file)
+            return self._criar_html_basico(xml_file, output_file, prazo)
     
-    def _criar_html_basico(self, xml_file, output_file):
+    def _criar_html_basico(self, xml_file, output_file, prazo=None):
         """
         Cria HTML básico quando XSLT não está disponível
         """
+        if prazo is None:
+            prazo = Prazo()
+        
         try:
             import xml.etree.ElementTree as ET
             
@@ -195,6 +224,7 @@ class XSLTProcessor:
             # Lista elementos únicos
             elementos = set()
             for elem in root.iter():
+                prazo.verificar('HTML básico')
                 elementos.add(elem.tag)
             
             for elem in sorted(elementos):
@@ -214,6 +244,8 @@ class XSLTProcessor:
             self.logger.info(f"HTML básico criado: {output_file}")
             return True
             
+        except TempoEsgotadoError:
+            raise
         except Exception as e:
             self.logger.error(f"Erro ao criar HTML básico: {str(e)}")
             return False
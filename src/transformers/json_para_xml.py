@@ -13,6 +13,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.utils.logger import configurar_logger
+from src.utils.prazo import Prazo, TempoEsgotadoError
 
 class JSONParaXMLConverter:
     def __init__(self):
@@ -22,13 +23,14 @@ class JSONParaXMLConverter:
         self.logger = configurar_logger()
         self.logger.info("Conversor JSON para XML inicializado")
     
-    def converter_arquivo_json(self, caminho_json, caminho_xml_saida=None):
+    def converter_arquivo_json(self, caminho_json, caminho_xml_saida=None, prazo=None):
         """
         Converte arquivo JSON para XML
         
         Args:
             caminho_json (str): Caminho do arquivo JSON
             caminho_xml_saida (str): Caminho do XML de saída (opcional)
+            prazo (Prazo): Prazo do processamento (opcional, padrão sem limite)
         
         Returns:
             str: Caminho do arquivo XML criado
@@ -43,25 +45,51 @@ class JSONParaXMLConverter:
             self.logger.error(f"Erro ao carregar JSON: {str(e)}")
             return None
         
-        # Converte para XML
-        xml_root = self._criar_xml_estruturado(dados)
-        
         # Define arquivo de saída se não fornecido
         if caminho_xml_saida is None:
             nome_base = os.path.splitext(caminho_json)[0]
             caminho_xml_saida = f"{nome_base}_para_xslt.xml"
         
-        # Salva XML
-        if self._salvar_xml(xml_root, caminho_xml_saida):
-            self.logger.info(f"XML salvo: {caminho_xml_saida}")
-            return caminho_xml_saida
-        else:
+        return self.converter_dados(dados, caminho_xml_saida, prazo)
+    
+    def converter_dados(self, dados, caminho_xml_saida, prazo=None):
+        """
+        Converte o resultado do parser já em memória para XML, sem gravar e
+        reler o JSON intermediário
+        
+        Args:
+            dados (dict): Resultado de processar_arquivo_completo (aceita
+                registros compactos)
+            caminho_xml_saida (str): Caminho do XML de saída
+            prazo (Prazo): Prazo do processamento (opcional, padrão sem limite)
+        
+        Returns:
+            str: Caminho do arquivo XML criado
+        """
+        if prazo is None:
+            prazo = Prazo()
+        
+        try:
+            # Converte para XML
+            xml_root = self._criar_xml_estruturado(dados, prazo)
+            
+            # Salva XML
+            if self._salvar_xml(xml_root, caminho_xml_saida, prazo):
+                self.logger.info(f"XML salvo: {caminho_xml_saida}")
+                return caminho_xml_saida
+            else:
+                return None
+        except TempoEsgotadoError as e:
+            self.logger.error(f"{str(e)} - conversão abortada")
             return None
     
-    def _criar_xml_estruturado(self, dados):
+    def _criar_xml_estruturado(self, dados, prazo=None):
         """
         Cria estrutura XML otimizada para XSLT
         """
+        if prazo is None:
+            prazo = Prazo()
+        
         # Elemento raiz
         root = ET.Element("TeamcenterData")
         
@@ -76,6 +104,7 @@ class JSONParaXMLConverter:
             itens_elem.set("total", str(len(dados['itens'])))
             
             for item in dados['itens']:
+                prazo.verificar('conversão dos itens')
                 item_elem = ET.SubElement(itens_elem, "Item")
                 
                 # Atributos principais como attributes do XML
@@ -105,6 +134,7 @@ class JSONParaXMLConverter:
             bom_elem.set("total", str(len(dados['bom'])))
             
             for linha in dados['bom']:
+                prazo.verificar('conversão da BOM')
                 linha_elem = ET.SubElement(bom_elem, "LinhaBOM")
                 
                 # Atributos principais
@@ -122,6 +152,53 @@ class JSONParaXMLConverter:
                         attr_elem.set("nome", str(attr))
                         attr_elem.set("valor", str(valor))
         
+        # Quantidades consolidadas por revisão (todos os níveis)
+        if dados.get('consolidacao_quantidades'):
+            consolidacao_elem = ET.SubElement(root, "ConsolidacaoQuantidades")
+            consolidacao_elem.set("total", str(len(dados['consolidacao_quantidades'])))
+            
+            for consolidado in dados['consolidacao_quantidades']:
+                prazo.verificar('conversão das quantidades')
+                consolidado_elem = ET.SubElement(consolidacao_elem, "ItemConsolidado")
+                consolidado_elem.set("revisao", str(consolidado['revisao']))
+                consolidado_elem.set("nome", str(consolidado.get('nome') or 'N/A'))
+                consolidado_elem.set("tipo", str(consolidado.get('tipo_revisao') or 'N/A'))
+                consolidado_elem.set("quantidadeTotal", self._formatar_numero(consolidado['quantidade_total']))
+                consolidado_elem.set("ocorrencias", str(consolidado['ocorrencias']))
+                consolidado_elem.set("nivelMinimo", str(consolidado['nivel_minimo']))
+                consolidado_elem.set("nivelMaximo", str(consolidado['nivel_maximo']))
+        
+        # Posição absoluta de cada ocorrência (transformações compostas até a raiz)
+        if dados.get('posicoes_absolutas'):
+            posicoes_elem = ET.SubElement(root, "PosicoesAbsolutas")
+            posicoes_elem.set("total", str(len(dados['posicoes_absolutas'])))
+            
+            for posicao in dados['posicoes_absolutas']:
+                prazo.verificar('conversão das posições')
+                posicao_elem = ET.SubElement(posicoes_elem, "Posicao")
+                posicao_elem.set("ocorrencia", str(posicao['ocorrencia']))
+                for eixo, valor in zip(('x', 'y', 'z'), posicao['posicao']):
+                    posicao_elem.set(eixo, self._formatar_numero(valor))
+                posicao_elem.set("transformacaoMundo", " ".join(
+                    self._formatar_numero(valor) for valor in posicao['transformacao_mundo']))
+        
+        # UserValues agrupados por título: o template de relatório
+        # (exemplo_relatorio.xslt) acha um campo com
+        # key('campoPorTitulo', 'wt9_Cliente') em vez de varrer o documento
+        if dados.get('indice_user_values'):
+            campos_elem = ET.SubElement(root, "CamposUsuario")
+            campos_elem.set("total", str(len(dados['indice_user_values'])))
+            
+            for titulo, valores in dados['indice_user_values'].items():
+                prazo.verificar('conversão dos campos de usuário')
+                campo_elem = ET.SubElement(campos_elem, "Campo")
+                campo_elem.set("titulo", str(titulo))
+                for id_dono, valor, tipo in valores:
+                    valor_elem = ET.SubElement(campo_elem, "Valor")
+                    valor_elem.set("dono", str(id_dono or 'N/A'))
+                    valor_elem.set("tipo", str(tipo))
+                    valor_elem.text = str(valor)
+        
         # Estatísticas resumo
         resumo_elem = ET.SubElement(root, "Resumo")
         resumo_elem.set("totalItens", str(len(dados.get('itens', []))))
@@ -129,6 +206,15 @@ class JSONParaXMLConverter:
         
         return root
     
+    @staticmethod
+    def _formatar_numero(valor):
+        """
+        Número com precisão total: inteiro sem '.0' ou o repr do float
+        ('{:g}' guardaria só 6 dígitos: 1234567 -> '1.23457e+06')
+        """
+        valor = float(valor)
+        return str(int(valor)) if valor.is_integer() else repr(valor)
+    
     def _adicionar_dados_recursivo(self, parent_elem, dados):
         """
         Adiciona dados de forma recursiva ao XML
@@ -161,10 +247,13 @@ class JSONParaXMLConverter:
         
         return nome_limpo or 'elemento'
     
-    def _salvar_xml(self, root, caminho_saida):
+    def _salvar_xml(self, root, caminho_saida, prazo=None):
         """
         Salva XML formatado
         """
+        if prazo is None:
+            prazo = Prazo()
+        
         try:
             # Cria pasta se não existir
             pasta = os.path.dirname(caminho_saida)
@@ -173,8 +262,11 @@ class JSONParaXMLConverter:
             
             # Converte para string formatada
             rough_string = ET.tostring(root, encoding='utf-8')
+            prazo.verificar('formatação do XML')
             reparsed = minidom.parseString(rough_string)
+            prazo.verificar('formatação do XML')
             pretty_xml = reparsed.toprettyxml(indent="  ", encoding='utf-8')
+            prazo.verificar('gravação do XML')
             
             # Salva arquivo
             with open(caminho_saida, 'wb') as f:
@@ -182,6 +274,8 @@ class JSONParaXMLConverter:
             
             return True
             
+        except TempoEsgotadoError:
+            raise
         except Exception as e:
             self.logger.error(f"Erro ao salvar XML: {str(e)}")
             return False
@@ -226,5 +320,42 @@ def teste_conversao():
     
     print("\n🎉 CONVERSÃO CONCLUÍDA!")
 
+def teste_precisao_posicoes():
+    """
+    Coordenadas grandes (mm de uma planta inteira) e quantidades acima de
+    um milhão devem chegar ao XML sem arredondamento
+    """
+    print("🧪 TESTE DE PRECISÃO DAS POSIÇÕES")
+    print("=" * 50)
+    
+    posicao = [12345.678, -98765.4321, 1234567.125]
+    transformacao = [1.0, 0.0, 0.0, 0.0,
+                     0.0, 1.0, 0.0, 0.0,
+                     0.0, 0.0, 1.0, 0.0] + posicao + [1.0]
+    dados = {
+        'posicoes_absolutas': [
+            {'ocorrencia': 'id6', 'posicao': posicao, 'transformacao_mundo': transformacao}
+        ],
+        'consolidacao_quantidades': [
+            {'revisao': 'id336', 'nome': 'PARAFUSO', 'tipo_revisao': 'ProductRevision',
+             'quantidade_total': 1234567.0, 'ocorrencias': 1, 'nivel_minimo': 1, 'nivel_maximo': 1}
+        ]
+    }
+    
+    root = JSONParaXMLConverter()._criar_xml_estruturado(dados)
+    posicao_elem = root.find('PosicoesAbsolutas/Posicao')
+    consolidado_elem = root.find('ConsolidacaoQuantidades/ItemConsolidado')
+    
+    lidos = [float(posicao_elem.get(eixo)) for eixo in ('x', 'y', 'z')]
+    mundo = [float(valor) for valor in posicao_elem.get('transformacaoMundo').split()]
+    
+    assert lidos == posicao, lidos
+    assert mundo == transformacao, mundo
+    assert consolidado_elem.get('quantidadeTotal') == '1234567', consolidado_elem.get('quantidadeTotal')
+    
+    print(f"✅ Posição: {posicao_elem.get('x')}, {posicao_elem.get('y')}, {posicao_elem.get('z')}")
+    print(f"✅ Quantidade total: {consolidado_elem.get('quantidadeTotal')}")
+
 if __name__ == "__main__":
+    teste_precisao_posicoes()
     teste_conversao() 
\ No newline at end of file
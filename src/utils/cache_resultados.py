@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Cache persistente de resultados do parser
+Guarda o resultado do parsing em disco, indexado pelo hash do conteúdo do
+arquivo de entrada, pela versão do parser e pela configuração usada
+
+As entradas são JSON, como as demais saídas do projeto: ler uma entrada
+nunca executa código, mesmo se a pasta do cache for compartilhada.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from src.utils.escritor_json import gravar_json
+
+# Tamanho dos blocos lidos para calcular o hash do arquivo
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+EXTENSAO_CACHE = '.cache'
+
+class CacheResultados:
+    def __init__(self, pasta_cache="data\\cache", tamanho_max_mb=1024, logger=None):
+        """
+        Inicializa o cache
+
+        Args:
+            pasta_cache (str): Pasta onde os resultados são guardados
+            tamanho_max_mb (float): Tamanho máximo da pasta; ao exceder, as
+                entradas usadas há mais tempo são removidas (LRU)
+            logger: Logger para mensagens (opcional)
+        """
+        self.pasta_cache = pasta_cache
+        self.tamanho_max_bytes = int(tamanho_max_mb * 1024 * 1024)
+        self.logger = logger
+
+    def gerar_chave(self, caminho_arquivo, versao_parser, config):
+        """
+        Gera a chave do cache para um arquivo
+
+        Args:
+            caminho_arquivo (str): Arquivo de entrada
+            versao_parser (str): Versão da lógica de extração
+            config (dict): Configuração que influencia o resultado
+
+        Returns:
+            str: Hash SHA-256 (hex) do conteúdo + versão + configuração
+        """
+        hash_chave = hashlib.sha256()
+
+        with open(caminho_arquivo, 'rb') as f:
+            for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b''):
+                hash_chave.update(bloco)
+
+        hash_chave.update(versao_parser.encode('utf-8'))
+        hash_chave.update(json.dumps(config, sort_keys=True, default=str).encode('utf-8'))
+
+        return hash_chave.hexdigest()
+
+    def obter(self, chave):
+        """
+        Retorna o resultado guardado para a chave ou None se não existir
+
+        Registros gravados com a função 'default' voltam como dict e tuplas
+        como listas; reconstruí-los cabe a quem guardou.
+        """
+        caminho = self._caminho_entrada(chave)
+
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Entrada corrompida (ex.: gravação interrompida): descarta
+            self._log('warning', f"⚠️  Entrada de cache inválida removida: {str(e)}")
+            self.invalidar(chave)
+            return None
+
+        # Marca como usada recentemente para a política LRU
+        try:
+            os.utime(caminho)
+        except OSError:
+            pass
+
+        return dados
+
+    def guardar(self, chave, dados, default=None):
+        """
+        Guarda um resultado e aplica o limite de tamanho do cache
+
+        Args:
+            chave (str): Chave gerada por gerar_chave
+            dados (dict): Resultado do parser
+            default: Função 'default' do json (ex.: serializar_registro)
+        """
+        if not os.path.exists(self.pasta_cache):
+            os.makedirs(self.pasta_cache)
+
+        # Grava em arquivo temporário e renomeia: leitores nunca veem entrada parcial
+        descritor, caminho_temp = tempfile.mkstemp(dir=self.pasta_cache, suffix='.tmp')
+        os.close(descritor)
+        try:
+            gravar_json(dados, caminho_temp, compacto=True, default=default)
+            os.replace(caminho_temp, self._caminho_entrada(chave))
+        except Exception:
+            if os.path.exists(caminho_temp):
+                os.remove(caminho_temp)
+            raise
+
+        self._aplicar_limite()
+
+    def invalidar(self, chave=None):
+        """
+        Remove uma entrada do cache ou, sem chave, todas as entradas
+
+        Returns:
+            int: Número de entradas removidas
+        """
+        if chave is not None:
+            caminhos = [self._caminho_entrada(chave)]
+        else:
+            caminhos = [caminho for caminho, _, _ in self._listar_entradas()]
+
+        removidas = 0
+        for caminho in caminhos:
+            try:
+                os.remove(caminho)
+                removidas += 1
+            except FileNotFoundError:
+                continue
+
+        return removidas
+
+    def tamanho_atual(self):
+        """
+        Retorna o tamanho total do cache em bytes
+        """
+        return sum(tamanho for _, tamanho, _ in self._listar_entradas())
+
+    def _caminho_entrada(self, chave):
+        return os.path.join(self.pasta_cache, chave + EXTENSAO_CACHE)
+
+    def _listar_entradas(self):
+        """
+        Lista as entradas como (caminho, tamanho, último uso)
+        """
+        if not os.path.exists(self.pasta_cache):
+            return []
+
+        entradas = []
+        for entrada in os.scandir(self.pasta_cache):
+            if entrada.is_file() and entrada.name.endswith(EXTENSAO_CACHE):
+                info = entrada.stat()
+                entradas.append((entrada.path, info.st_size, info.st_mtime))
+        return entradas
+
+    def _aplicar_limite(self):
+        """
+        Remove as entradas usadas há mais tempo até caber no tamanho máximo
+        """
+        entradas = self._listar_entradas()
+        total = sum(tamanho for _, tamanho, _ in entradas)
+
+        if total <= self.tamanho_max_bytes:
+            return
+
+        for caminho, tamanho, _ in sorted(entradas, key=lambda entrada: entrada[2]):
+            if total <= self.tamanho_max_bytes:
+                break
+            try:
+                os.remove(caminho)
+                total -= tamanho
+                self._log('info', f"🧹 Cache: entrada removida por limite de tamanho ({os.path.basename(caminho)})")
+            except FileNotFoundError:
+                continue
+
+    def _log(self, nivel, mensagem):
+        if self.logger is not None:
+            getattr(self.logger, nivel)(mensagem)
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Gravação de JSON em fluxo contínuo
+Grava o resultado do parser registro a registro: os contêineres dos primeiros
+níveis (o resultado, suas listas de itens/BOM e seus índices) são abertos e
+fechados pelo escritor, e cada registro é codificado sozinho, pelo
+codificador em C no modo compacto. Nenhum texto do documento inteiro é
+montado, então a memória da gravação não cresce com o tamanho da saída.
+
+Com indentação o texto é idêntico ao de json.dump(dados, indent=2).
+
+No formato JSON Lines cada seção de registros (itens, bom, relacionamentos...)
+vai para um arquivo próprio, um registro por linha, e o restante do resultado
+para um manifesto pequeno: os consumidores leem só a seção de que precisam,
+linha a linha, e podem dividir o arquivo entre processos.
+"""
+
+import json
+import os
+import types
+
+# Registros gravados entre duas verificações do prazo
+INTERVALO_VERIFICACAO = 1000
+
+# Níveis de contêineres abertos pelo escritor; abaixo deles cada valor é
+# codificado inteiro (resultado -> 'itens' -> item)
+NIVEIS_FLUXO = 2
+
+# Pasta JSON Lines: manifesto e extensão dos arquivos das seções
+ARQUIVO_MANIFESTO = 'manifesto.json'
+EXTENSAO_JSONL = '.jsonl'
+
+# Altere quando o formato da pasta JSON Lines mudar
+VERSAO_JSONL = 1
+
+class EscritorJSON:
+    def __init__(self, arquivo, compacto=False, default=None, prazo=None,
+                 niveis_fluxo=NIVEIS_FLUXO):
+        """
+        Inicializa o escritor
+
+        Args:
+            arquivo: Arquivo texto aberto para escrita
+            compacto (bool): Sem indentação nem espaços (saída menor e gravação
+                mais rápida); senão, indentação de 2 espaços
+            default: Função 'default' do json (ex.: serializar_registro)
+            prazo (Prazo): Verificado a cada INTERVALO_VERIFICACAO registros
+            niveis_fluxo (int): Níveis de dict/lista gravados membro a membro
+        """
+        self.arquivo = arquivo
+        self.compacto = compacto
+        self.prazo = prazo
+        self.niveis_fluxo = niveis_fluxo
+        self.registros_gravados = 0
+
+        # Sem indentação o json usa o codificador em C; com indentação, o de
+        # Python, por isso números e strings sempre passam pelo compacto
+        self._codificador_compacto = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=default)
+        if compacto:
+            self._codificador = self._codificador_compacto
+            self._separador_chave = ':'
+        else:
+            self._codificador = json.JSONEncoder(indent=2, ensure_ascii=False, default=default)
+            self._separador_chave = ': '
+
+    def escrever(self, valor):
+        """
+        Grava um documento JSON completo
+
+        Listas, tuplas e geradores nos níveis de fluxo são consumidos um
+        registro por vez: um gerador de registros nunca é materializado.
+        """
+        self._escrever_valor(valor, 0)
+
+    def _recuo(self, nivel):
+        if self.compacto:
+            return ''
+        return '\n' + '  ' * nivel
+
+    def _escrever_valor(self, valor, nivel):
+        if nivel < self.niveis_fluxo:
+            if isinstance(valor, dict):
+                self._escrever_membros('{', '}', ((self._chave(chave), item) for chave, item in valor.items()), nivel)
+                return
+            if isinstance(valor, (list, tuple, types.GeneratorType)):
+                self._escrever_membros('[', ']', ((None, item) for item in valor), nivel)
+                return
+
+        if isinstance(valor, (str, int, float)) or valor is None:
+            texto = self._codificador_compacto.encode(valor)
+        else:
+            texto = self._codificador.encode(valor)
+        if not self.compacto and nivel:
+            # Strings JSON não têm quebras de linha literais: só as da indentação
+            texto = texto.replace('\n', self._recuo(nivel))
+        self.arquivo.write(texto)
+
+        self.registros_gravados += 1
+        if self.prazo is not None and self.registros_gravados % INTERVALO_VERIFICACAO == 0:
+            self.prazo.verificar('gravação do JSON')
+
+    def _escrever_membros(self, abertura, fechamento, membros, nivel):
+        """
+        Grava um dict (membros (chave, valor)) ou lista (membros (None, valor))
+        """
+        recuo_membro = self._recuo(nivel + 1)
+        vazio = True
+
+        for chave, item in membros:
+            self.arquivo.write(abertura + recuo_membro if vazio else ',' + recuo_membro)
+            vazio = False
+            if chave is not None:
+                self.arquivo.write(chave + self._separador_chave)
+            self._escrever_valor(item, nivel + 1)
+
+        if vazio:
+            self.arquivo.write(abertura + fechamento)
+        else:
+            self.arquivo.write(self._recuo(nivel) + fechamento)
+
+    def _chave(self, chave):
+        """
+        Chave do dict como string JSON, com as conversões de json.dump
+        """
+        if not isinstance(chave, str):
+            if chave is True:
+                chave = 'true'
+            elif chave is False:
+                chave = 'false'
+            elif chave is None:
+                chave = 'null'
+            elif isinstance(chave, (int, float)):
+                chave = self._codificador_compacto.encode(chave)
+            else:
+                raise TypeError(f"Chave do tipo {type(chave).__name__} não é serializável em JSON")
+        return self._codificador_compacto.encode(chave)
+
+def gravar_json(dados, caminho_saida, compacto=False, default=None, prazo=None):
+    """
+    Grava dados em um arquivo JSON com o EscritorJSON
+
+    Returns:
+        int: Registros gravados
+    """
+    with open(caminho_saida, 'w', encoding='utf-8') as f:
+        escritor = EscritorJSON(f, compacto=compacto, default=default, prazo=prazo)
+        escritor.escrever(dados)
+    return escritor.registros_gravados
+
+def gravar_jsonl(registros, caminho_saida, default=None, prazo=None):
+    """
+    Grava um registro JSON compacto por linha (JSON Lines)
+
+    Strings JSON não têm quebras de linha literais, então cada linha é
+    sempre um registro completo.
+
+    Returns:
+        int: Linhas gravadas
+    """
+    codificar = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=default).encode
+    linhas = 0
+    with open(caminho_saida, 'w', encoding='utf-8', newline='\n') as f:
+        escrever = f.write
+        for registro in registros:
+            escrever(codificar(registro) + '\n')
+            linhas += 1
+            if prazo is not None and linhas % INTERVALO_VERIFICACAO == 0:
+                prazo.verificar('gravação do JSON Lines')
+    return linhas
+
+def gravar_resultado_jsonl(dados, pasta_saida, default=None, prazo=None, omitir=()):
+    """
+    Grava o resultado do parser em uma pasta JSON Lines
+
+    Cada seção que é uma lista de registros vira '<seção>.jsonl'; as demais
+    (metadados, aplicacao, estatisticas...) vão para o manifesto, junto com
+    o arquivo, o número de registros e o tamanho de cada seção. O manifesto
+    é gravado por último: se ele existe, a pasta está completa.
+
+    Args:
+        omitir: Seções que não são gravadas
+
+    Returns:
+        dict: Manifesto gravado
+    """
+    if not os.path.exists(pasta_saida):
+        os.makedirs(pasta_saida)
+
+    secoes = {}
+    manifesto = {'formato': 'jsonl', 'versao': VERSAO_JSONL, 'secoes': secoes}
+    for secao, valor in dados.items():
+        if secao in omitir:
+            continue
+        if isinstance(valor, (list, tuple, types.GeneratorType)):
+            nome_arquivo = secao + EXTENSAO_JSONL
+            caminho_secao = os.path.join(pasta_saida, nome_arquivo)
+            registros = gravar_jsonl(valor, caminho_secao, default=default, prazo=prazo)
+            secoes[secao] = {
+                'arquivo': nome_arquivo,
+                'registros': registros,
+                'tamanho_bytes': os.path.getsize(caminho_secao)
+            }
+        else:
+            manifesto[secao] = valor
+
+    gravar_json(manifesto, os.path.join(pasta_saida, ARQUIVO_MANIFESTO), default=default)
+    return manifesto
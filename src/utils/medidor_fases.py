@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Medição por fase do processamento
+Registra o tempo (perf_counter), o RSS e o pico de alocações Python
+(tracemalloc) de cada fase: leitura, parsing, itens, BOM, relacionamentos e
+serialização
+
+O RSS de cada fase é medido no início e no fim da própria fase (RSS atual,
+não o pico da vida do processo), então em workers reaproveitados por vários
+arquivos os valores não herdam os picos de arquivos anteriores.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+BYTES_POR_MB = 1024 * 1024
+
+def pico_rss_mb():
+    """
+    Retorna o maior RSS já atingido pelo processo desde que ele começou, em MB
+    (não é o pico do arquivo ou da fase atual; ver rss_atual_mb)
+
+    Usa resource (Linux/macOS) ou psutil (Windows). Retorna None se nenhum
+    dos dois estiver disponível.
+    """
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss é em bytes no macOS e em KB no Linux
+        return pico / BYTES_POR_MB if sys.platform == 'darwin' else pico / 1024
+
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / BYTES_POR_MB
+
+    return None
+
+def rss_atual_mb():
+    """
+    Retorna o RSS atual do processo, em MB
+
+    Lê /proc/self/statm (Linux) ou usa psutil. Retorna None se nenhum dos
+    dois estiver disponível.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            paginas_residentes = int(f.read().split()[1])
+        return paginas_residentes * os.sysconf('SC_PAGE_SIZE') / BYTES_POR_MB
+    except (OSError, ValueError, AttributeError, IndexError):
+        pass
+
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / BYTES_POR_MB
+
+    return None
+
+class MedidorFases:
+    def __init__(self, rastrear_alocacoes=True):
+        """
+        Inicializa o medidor
+
+        Args:
+            rastrear_alocacoes (bool): Se deve usar tracemalloc. Dá o pico real de
+                cada fase, mas deixa as alocações Python mais lentas
+        """
+        self.rastrear_alocacoes = rastrear_alocacoes
+        self.fases = {}
+        self.tempos = {}
+        self._iniciou_tracemalloc = False
+
+    def iniciar(self):
+        """
+        Liga o tracemalloc (se ainda não estiver ligado por quem chamou)
+        """
+        if self.rastrear_alocacoes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._iniciou_tracemalloc = True
+
+    def finalizar(self):
+        """
+        Desliga o tracemalloc se foi ligado por este medidor
+        """
+        if self._iniciou_tracemalloc:
+            tracemalloc.stop()
+            self._iniciou_tracemalloc = False
+
+    @contextmanager
+    def fase(self, nome):
+        """
+        Mede uma fase: with medidor.fase('parsing'): ...
+
+        Por fase são registrados a duração em segundos (em tempos) e, em fases:
+            rss_inicio_mb, rss_fim_mb: RSS atual no início e no fim da fase
+            rss_delta_mb: quanto o RSS cresceu (ou diminuiu) na fase
+            rss_pico_mb: pico de RSS da fase. Exato (rss_pico_exato) quando a
+                fase elevou o pico do processo; senão a fase ficou abaixo de
+                um pico anterior e vale o maior RSS medido (início ou fim)
+            tracemalloc_pico_mb: maior volume alocado durante a fase
+            tracemalloc_retido_mb: quanto a fase deixou alocado ao terminar
+        """
+        rastreando = self.rastrear_alocacoes and tracemalloc.is_tracing()
+        if rastreando:
+            atual_inicio, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+
+        rss_inicio = rss_atual_mb()
+        pico_processo_inicio = pico_rss_mb()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tempos[nome] = time.perf_counter() - inicio
+            medicao = self._medir_rss(rss_inicio, pico_processo_inicio)
+            if rastreando:
+                atual_fim, pico = tracemalloc.get_traced_memory()
+                medicao['tracemalloc_pico_mb'] = pico / BYTES_POR_MB
+                medicao['tracemalloc_retido_mb'] = (atual_fim - atual_inicio) / BYTES_POR_MB
+            self.fases[nome] = medicao
+
+    @staticmethod
+    def _medir_rss(rss_inicio, pico_processo_inicio):
+        """
+        Medições de RSS de uma fase (ver fase)
+        """
+        rss_fim = rss_atual_mb()
+        pico_processo_fim = pico_rss_mb()
+        medicao = {
+            'rss_inicio_mb': rss_inicio,
+            'rss_fim_mb': rss_fim,
+            'rss_delta_mb': rss_fim - rss_inicio if rss_inicio is not None and rss_fim is not None else None,
+            'rss_pico_mb': None,
+            'rss_pico_exato': False
+        }
+
+        if pico_processo_inicio is not None and pico_processo_fim is not None and pico_processo_fim > pico_processo_inicio:
+            medicao['rss_pico_mb'] = pico_processo_fim
+            medicao['rss_pico_exato'] = True
+        else:
+            amostras = [rss for rss in (rss_inicio, rss_fim) if rss is not None]
+            medicao['rss_pico_mb'] = max(amostras) if amostras else None
+
+        return medicao
+
+    def resumo(self, tamanho_entrada_mb=None):
+        """
+        Resume as fases medidas
+
+        Args:
+            tamanho_entrada_mb (float): Tamanho do arquivo de entrada, para a
+                razão memória / MB de entrada
+
+        Returns:
+            dict: Picos gerais e medições por fase
+        """
+        picos_rss = [m['rss_pico_mb'] for m in self.fases.values() if m['rss_pico_mb'] is not None]
+        picos_alocacao = [m['tracemalloc_pico_mb'] for m in self.fases.values() if 'tracemalloc_pico_mb' in m]
+
+        resumo = {
+            'pico_rss_mb': max(picos_rss) if picos_rss else None,
+            'pico_tracemalloc_mb': max(picos_alocacao) if picos_alocacao else None,
+            'fases': self.fases
+        }
+
+        if tamanho_entrada_mb and resumo['pico_tracemalloc_mb'] is not None:
+            resumo['tracemalloc_mb_por_mb_entrada'] = resumo['pico_tracemalloc_mb'] / tamanho_entrada_mb
+
+        return resumo
+
+    def resumo_tempos(self, elementos_por_fase=None):
+        """
+        Resume a duração das fases medidas
+
+        Args:
+            elementos_por_fase (dict): Elementos/registros tratados em cada fase,
+                para a vazão em elementos por segundo
+
+        Returns:
+            dict: {fase: {'segundos', 'elementos', 'elementos_por_segundo'}}
+        """
+        elementos_por_fase = elementos_por_fase or {}
+        resumo = {}
+
+        for fase, segundos in self.tempos.items():
+            elementos = elementos_por_fase.get(fase)
+            resumo[fase] = {
+                'segundos': segundos,
+                'elementos': elementos,
+                'elementos_por_segundo': elementos / segundos if elementos is not None and segundos > 0 else None
+            }
+
+        return resumo
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Prazo de processamento com cancelamento cooperativo
+O mesmo objeto Prazo é passado para parser, conversor e processador XSLT,
+que chamam verificar() nos seus laços e abortam quando o tempo acaba
+"""
+
+import time
+
+class TempoEsgotadoError(Exception):
+    """
+    O processamento passou do prazo ou foi cancelado
+    """
+
+class Prazo:
+    def __init__(self, segundos=None):
+        """
+        Inicializa o prazo
+
+        Args:
+            segundos (float): Tempo máximo a partir de agora (None ou 0 = sem limite)
+        """
+        self.segundos = segundos
+        self.limite = time.monotonic() + segundos if segundos else None
+        self.cancelado = False
+
+    def cancelar(self):
+        """
+        Cancela o processamento: a próxima verificação interrompe
+        """
+        self.cancelado = True
+
+    @property
+    def esgotado(self):
+        """
+        True se o prazo acabou ou o processamento foi cancelado
+        """
+        if self.cancelado:
+            return True
+        return self.limite is not None and time.monotonic() > self.limite
+
+    def restante(self):
+        """
+        Segundos restantes (None = sem limite), útil como timeout de subprocessos
+        """
+        if self.limite is None:
+            return None
+        return max(0.0, self.limite - time.monotonic())
+
+    def verificar(self, etapa=None):
+        """
+        Lança TempoEsgotadoError se o prazo acabou
+
+        Args:
+            etapa (str): Etapa em andamento, usada na mensagem de erro
+        """
+        if self.cancelado or (self.limite is not None and time.monotonic() > self.limite):
+            raise TempoEsgotadoError(self.descrever(etapa))
+
+    def descrever(self, etapa=None):
+        """
+        Mensagem para log e relatório
+        """
+        if self.cancelado:
+            mensagem = "Processamento cancelado"
+        else:
+            mensagem = f"Tempo limite de {self.segundos}s excedido"
+        return f"{mensagem} ({etapa})" if etapa else mensagem
@@ -16,6 +16,7 @@
     <xsl:key name="formById" match="plm:Form" use="@id"/>
     <xsl:key name="occurrenceById" match="plm:Occurrence" use="@id"/>
     <xsl:key name="siteById" match="plm:Site" use="@id"/>
+    <xsl:key name="userValueByTitle" match="plm:UserValue" use="@title"/>
 
     <xsl:template match="/">
         <!-- Identificar a ficha de equipamento principal -->
@@ -190,8 +191,8 @@
                         <td><span class="label">CLIENTE:</span></td>
                         <td>
                             <xsl:choose>
-							<xsl:when test="//plm:UserValue[@title='wt9_Cliente']/@value != ''">
-								<xsl:value-of select="//plm:UserValue[@title='wt9_Cliente']/@value"/>
+							<xsl:when test="key('userValueByTitle', 'wt9_Cliente')/@value != ''">
+								<xsl:value-of select="key('userValueByTitle', 'wt9_Cliente')/@value"/>
 							</xsl:when>
                                 <xsl:otherwise><xsl:value-of select="$rootMasterForm/plm:UserData/plm:UserValue[@title='project_id']/@value"/></xsl:otherwise>
                             </xsl:choose>